@@ -0,0 +1,3 @@
+"""
+Analysis package - تحليل لوجات البناء
+"""
@@ -0,0 +1,45 @@
+"""
+بصمة الفشل - تمثيل ثابت للخطأ بدون الأجزاء المتغيرة (التواريخ، المسارات، الأرقام)
+"""
+import hashlib
+import re
+from typing import Any, Dict
+
+# الأجزاء المتغيرة بين عمليات البناء، بالترتيب (التواريخ قبل الأرقام)
+_NORMALIZERS = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<ts>"),
+    (re.compile(r"\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"), "<ts>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "<hex>"),
+    (re.compile(r"\b[0-9a-f]{12,64}\b"), "<hash>"),
+    # المسارات: يبقى اسم الملف فقط
+    (re.compile(r"(?:[A-Za-z]:)?(?:[\\/][\w.\-@+~]+)+[\\/]([\w.\-@+~]+)"), r"\1"),
+    (re.compile(r":\d+(?::\d+)?\b"), ""),
+    (re.compile(r"\b\d+\b"), "<n>"),
+    (re.compile(r"\s+"), " "),
+]
+
+MAX_TOKEN_LENGTH = 200
+
+
+def normalize_error_text(text: str) -> str:
+    """إزالة الأجزاء المتغيرة من نص الخطأ"""
+    text = text or ""
+    for regex, replacement in _NORMALIZERS:
+        text = regex.sub(replacement, text)
+    return text.strip().lower()[:MAX_TOKEN_LENGTH]
+
+
+def fingerprint_pattern(pattern: Dict[str, Any]) -> Dict[str, str]:
+    """بصمة خطأ مكتشف: (اسم القاعدة، النص المطابق، بيئة البناء)
+
+    النص المطابق هو مجموعة الالتقاط إن وجدت (مثل اسم الحزمة)، وإلا رسالة الخطأ.
+    """
+    token = normalize_error_text(pattern.get("matched_text") or pattern.get("error_message", ""))
+    toolchain = pattern.get("toolchain") or "generic"
+    digest = hashlib.sha256(f"{pattern['rule_name']}\x00{token}\x00{toolchain}".encode("utf-8")).hexdigest()
+    return {
+        "fingerprint": digest,
+        "rule_name": pattern["rule_name"],
+        "token": token,
+        "toolchain": toolchain
+    }
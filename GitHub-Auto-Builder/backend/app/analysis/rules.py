@@ -0,0 +1,155 @@
+"""
+كتالوج قواعد الأخطاء - ملف JSON بإصدار، يُترجم مرة واحدة لكل إصدار ويُعاد تحميله بدون إعادة تشغيل
+"""
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .scanner import ErrorScanner
+from ..config import settings
+from ..redis_client import get_redis, get_async_redis
+
+DEFAULT_RULES_PATH = Path(__file__).with_name("error_rules.json")
+
+REQUIRED_RULE_FIELDS = ("name", "pattern", "fix_type", "confidence", "description")
+
+# عدد الإصدارات المترجمة المحفوظة (للرجوع السريع إلى إصدار سابق)
+MAX_CACHED_VERSIONS = 3
+
+METRICS_KEY_PREFIX = "error_rules:metrics"
+
+
+def load_rule_catalog(path: Path) -> Dict[str, Any]:
+    """قراءة الكتالوج والتحقق منه، يرفع ValueError إذا كان غير صالح"""
+    with open(path, encoding="utf-8") as f:
+        catalog = json.load(f)
+
+    if "version" not in catalog or not isinstance(catalog.get("rules"), list):
+        raise ValueError(f"كتالوج القواعد {path} يجب أن يحتوي على version و rules")
+
+    names = set()
+    for rule in catalog["rules"]:
+        missing = [field for field in REQUIRED_RULE_FIELDS if field not in rule]
+        if missing:
+            raise ValueError(f"القاعدة {rule.get('name')} ينقصها: {', '.join(missing)}")
+        if rule["name"] in names:
+            raise ValueError(f"اسم قاعدة مكرر: {rule['name']}")
+        names.add(rule["name"])
+        try:
+            re.compile(rule["pattern"])
+        except re.error as e:
+            raise ValueError(f"نمط غير صالح في القاعدة {rule['name']}: {e}")
+
+    catalog["version"] = str(catalog["version"])
+    return catalog
+
+
+class RuleCatalog:
+    """الكتالوج الحالي والماسح المترجم له
+
+    يُفحص تاريخ تعديل الملف كل reload_interval ثانية على الأكثر، ويُترجم الماسح
+    فقط عند تغير الإصدار. إذا كان الملف الجديد غير صالح يبقى الإصدار السابق.
+    """
+
+    def __init__(self, path: Optional[str] = None, reload_interval: Optional[float] = None):
+        self.path = Path(path or settings.error_rules_path or DEFAULT_RULES_PATH)
+        self.reload_interval = (
+            reload_interval if reload_interval is not None else settings.error_rules_reload_interval_seconds
+        )
+        self._scanners: Dict[str, ErrorScanner] = {}
+        self._scanner: Optional[ErrorScanner] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.get_scanner().version
+
+    def get_scanner(self) -> ErrorScanner:
+        """الماسح للإصدار الحالي (مع إعادة التحميل إذا تغير الملف)"""
+        now = time.monotonic()
+        if self._scanner is None or now - self._checked_at >= self.reload_interval:
+            with self._lock:
+                self._checked_at = now
+                self._reload()
+        return self._scanner
+
+    def _reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if self._scanner is not None and mtime == self._mtime:
+                return
+
+            catalog = load_rule_catalog(self.path)
+            version = catalog["version"]
+            scanner = self._scanners.get(version)
+            if scanner is None:
+                scanner = ErrorScanner(catalog["rules"], settings.error_scan_max_matches_per_rule, version=version)
+                self._scanners[version] = scanner
+                while len(self._scanners) > MAX_CACHED_VERSIONS:
+                    self._scanners.pop(next(iter(self._scanners)))
+
+            if self._scanner is not None and self._scanner.version != version:
+                print(f"تم تحميل قواعد الأخطاء الإصدار {version} (السابق {self._scanner.version})")
+            self._scanner = scanner
+            self._mtime = mtime
+
+        except (OSError, ValueError) as e:
+            if self._scanner is None:
+                raise
+            print(f"خطأ في إعادة تحميل قواعد الأخطاء، الاستمرار بالإصدار {self._scanner.version}: {e}")
+
+
+def flush_rule_metrics(scanner: ErrorScanner):
+    """إضافة عدادات الماسح إلى Redis (مجمّعة من كل الـ workers حسب الإصدار)"""
+    stats = scanner.pop_stats()
+    if not stats["scans"]:
+        return
+
+    try:
+        key = f"{METRICS_KEY_PREFIX}:{stats['version']}"
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hincrby(key, "_scans", stats["scans"])
+        pipe.hincrbyfloat(key, "_seconds", stats["scan_seconds"])
+        for name, rule_stats in stats["rules"].items():
+            if rule_stats["hits"]:
+                pipe.hincrby(key, f"{name}:hits", rule_stats["hits"])
+            if rule_stats["lines"]:
+                pipe.hincrby(key, f"{name}:lines", rule_stats["lines"])
+                pipe.hincrbyfloat(key, f"{name}:seconds", rule_stats["seconds"])
+        pipe.execute()
+    except Exception as e:
+        print(f"خطأ في حفظ مقاييس قواعد الأخطاء: {e}")
+
+
+async def get_rule_metrics(version: str) -> Dict[str, Any]:
+    """مقاييس قواعد إصدار معين، القواعد مرتبة من الأبطأ إلى الأسرع (عميل Redis غير المتزامن للـ endpoints)"""
+    raw = await get_async_redis().hgetall(f"{METRICS_KEY_PREFIX}:{version}")
+
+    rules: Dict[str, Dict[str, Any]] = {}
+    for field, value in raw.items():
+        if field.startswith("_"):
+            continue
+        name, _, metric = field.rpartition(":")
+        rules.setdefault(name, {"name": name, "hits": 0, "lines": 0, "seconds": 0.0})[metric] = float(value)
+
+    rule_list: List[Dict[str, Any]] = sorted(rules.values(), key=lambda r: r["seconds"], reverse=True)
+    for rule in rule_list:
+        rule["hits"] = int(rule["hits"])
+        rule["lines"] = int(rule["lines"])
+        rule["avg_microseconds_per_line"] = round(rule["seconds"] / rule["lines"] * 1e6, 3) if rule["lines"] else 0.0
+
+    return {
+        "version": version,
+        "scans": int(raw.get("_scans", 0)),
+        "scan_seconds": float(raw.get("_seconds", 0.0)),
+        "rules": rule_list
+    }
+
+
+rule_catalog = RuleCatalog()
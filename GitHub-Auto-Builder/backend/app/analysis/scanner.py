@@ -0,0 +1,274 @@
+"""
+ماسح الأخطاء - فحص اللوج بكل القواعد في مرور واحد
+"""
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+# رموز regex التي تنهي النص الحرفي
+_REGEX_SPECIAL = set(".^$*+?{}[]()|\\")
+# مكمم بين أقواس: {m} أو {m,} أو {,n} أو {m,n} (غير ذلك "{" حرف عادي)
+_BRACE_QUANTIFIER = re.compile(r"\{\d*(?:,\d*)?\}")
+# تسلسلات هروب لا يمكن معرفة النص الحرفي منها بدون تحليل كامل (\x41، \u0041، \N{...}، \1، \012)
+_OPAQUE_ESCAPES = set("xuUN0123456789")
+# تسلسلات هروب قد تطابق سطراً جديداً
+_NEWLINE_ESCAPES = set("nsWD") | _OPAQUE_ESCAPES
+
+# أقصر نص حرفي يستحق استخدامه كمرشح مسبق
+MIN_KEYWORD_LENGTH = 3
+
+
+def _class_end(pattern: str, start: int) -> int:
+    """موضع "]" الذي يغلق فئة الأحرف التي تبدأ عند start، أو -1"""
+    i = start + 1
+    if pattern[i:i + 1] == "^":
+        i += 1
+    if pattern[i:i + 1] == "]":
+        i += 1
+    while i < len(pattern):
+        if pattern[i] == "\\":
+            i += 2
+            continue
+        if pattern[i] == "]":
+            return i
+        i += 1
+    return -1
+
+
+def required_literal(pattern: str) -> Optional[str]:
+    """أطول نص حرفي يجب أن يظهر في كل تطابق للنمط، أو None
+
+    يُستخدم كمرشح مسبق رخيص قبل تشغيل النمط الكامل. الأنماط التي تحتوي على
+    بدائل (|) أو مجموعات خاصة أو تسلسلات هروب غير حرفية (\x41، \1) لا يُستخرج
+    منها نص وتُفحص على اللوج كاملاً. محتوى المكممات {m,n} وفئات الأحرف لا يُعد نصاً.
+    """
+    if "|" in pattern or "(?" in pattern:
+        return None
+
+    segments = []
+    current = []
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "[":
+            # تخطي فئة الأحرف [...]
+            end = _class_end(pattern, i)
+            if end == -1:
+                return None
+            segments.append("".join(current))
+            current = []
+            i = end + 1
+            continue
+        if char == "\\":
+            escape = pattern[i + 1:i + 2]
+            if not escape or escape in _OPAQUE_ESCAPES:
+                return None
+            if escape.isalnum():
+                # فئة (\d، \s) أو موضع (\b): ليست نصاً حرفياً
+                segments.append("".join(current))
+                current = []
+            elif depth == 0:
+                # حرف مهرب (\.، \() هو نص حرفي
+                current.append(escape)
+            i += 2
+            continue
+        if char == "{":
+            quantifier = _BRACE_QUANTIFIER.match(pattern, i)
+            if quantifier is None:
+                # "{" بدون مكمم صالح حرف عادي
+                if depth == 0:
+                    current.append(char)
+                i += 1
+                continue
+            # الحرف السابق قد يتكرر صفر مرة، ومحتوى {m,n} ليس نصاً
+            if current:
+                current.pop()
+            segments.append("".join(current))
+            current = []
+            i = quantifier.end()
+            continue
+        if char in "*?" and current:
+            # الحرف السابق اختياري أو مكرر
+            current.pop()
+        if char in _REGEX_SPECIAL:
+            segments.append("".join(current))
+            current = []
+            # محتوى المجموعات قد يكون اختيارياً، نكتفي بالنص خارجها
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+        elif depth == 0:
+            current.append(char)
+        i += 1
+    segments.append("".join(current))
+
+    keyword = max(segments, key=len).strip()
+    return keyword.lower() if len(keyword) >= MIN_KEYWORD_LENGTH else None
+
+
+def spans_lines(pattern: str) -> bool:
+    """هل يمكن أن يطابق النمط عبر أكثر من سطر؟
+
+    تقدير محافظ (True عند الشك): سطر جديد أو حرف تحكم حرفي، \n و\s و\W و\D،
+    فئات الأحرف المنفية أو التي تحتوي على تسلسلات هروب، والأعلام المضمنة مثل (?s).
+    """
+    if "(?" in pattern or any(ord(char) < 32 for char in pattern):
+        return True
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            if pattern[i + 1:i + 2] in _NEWLINE_ESCAPES:
+                return True
+            i += 2
+            continue
+        if char == "[":
+            end = _class_end(pattern, i)
+            if end == -1 or pattern[i + 1:i + 2] == "^" or "\\" in pattern[i:end]:
+                return True
+            i = end + 1
+            continue
+        i += 1
+    return False
+
+
+class ErrorScanner:
+    """فحص اللوج بكل قواعد الأخطاء في مرور واحد
+
+    مرشح مسبق واحد (بدائل من النصوص الحرفية للقواعد) يمر على اللوج كاملاً،
+    والأنماط الكاملة تعمل فقط على الأسطر التي تحتوي على النص الحرفي لقاعدتها.
+    الأنماط التي قد تطابق عبر الأسطر تعمل على اللوج كاملاً إذا ظهر نصها الحرفي فيه.
+    رقم السطر يُحسب بعداد متراكم بدلاً من عد الأسطر من بداية اللوج لكل تطابق.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]], max_matches_per_rule: int = 20, version: Optional[str] = None):
+        self.version = version
+        self.max_matches_per_rule = max_matches_per_rule
+        self.rules = []
+        for rule in rules:
+            compiled = dict(rule)
+            compiled["regex"] = re.compile(rule["pattern"], re.IGNORECASE)
+            compiled["keyword"] = required_literal(rule["pattern"])
+            compiled["multiline"] = spans_lines(rule["pattern"])
+            self.rules.append(compiled)
+
+        self._keyword_rules = [
+            i for i, rule in enumerate(self.rules) if rule["keyword"] and not rule["multiline"]
+        ]
+        self._full_rules = [
+            i for i, rule in enumerate(self.rules) if not rule["keyword"] or rule["multiline"]
+        ]
+
+        keywords = sorted({self.rules[i]["keyword"] for i in self._keyword_rules}, key=len, reverse=True)
+        self._prefilter = re.compile("|".join(re.escape(k) for k in keywords), re.IGNORECASE) if keywords else None
+
+        self.reset_stats()
+
+    def reset_stats(self):
+        """تصفير عدادات القواعد"""
+        self.scans = 0
+        self.scan_seconds = 0.0
+        self.rule_stats = {
+            rule["name"]: {"hits": 0, "lines": 0, "seconds": 0.0}
+            for rule in self.rules
+        }
+
+    def pop_stats(self) -> Dict[str, Any]:
+        """العدادات منذ آخر استدعاء، ثم تصفيرها"""
+        stats = {
+            "version": self.version,
+            "scans": self.scans,
+            "scan_seconds": self.scan_seconds,
+            "rules": self.rule_stats
+        }
+        self.reset_stats()
+        return stats
+
+    def scan(self, text: str) -> List[Dict[str, Any]]:
+        """الأخطاء الموجودة في اللوج مرتبة حسب ترتيب القواعد ثم رقم السطر"""
+        started = time.perf_counter()
+        found: List[List[Dict[str, Any]]] = [[] for _ in self.rules]
+
+        if self._prefilter is not None:
+            self._scan_keyword_rules(text, found)
+
+        total_lines = text.count("\n") + 1 if self._full_rules else 0
+        lowered = None
+        for index in self._full_rules:
+            rule = self.rules[index]
+            if rule["keyword"]:
+                # المرشح المسبق على اللوج كاملاً للأنماط التي تعبر الأسطر
+                if lowered is None:
+                    lowered = text.lower()
+                if rule["keyword"] not in lowered:
+                    continue
+            rule_started = time.perf_counter()
+            line_number, last = 1, 0
+            for match in rule["regex"].finditer(text):
+                line_number += text.count("\n", last, match.start())
+                last = match.start()
+                found[index].append(self._pattern_info(rule, match, line_number))
+                if len(found[index]) >= self.max_matches_per_rule:
+                    break
+            stats = self.rule_stats[rule["name"]]
+            stats["lines"] += total_lines
+            stats["seconds"] += time.perf_counter() - rule_started
+
+        for index, rule in enumerate(self.rules):
+            self.rule_stats[rule["name"]]["hits"] += len(found[index])
+
+        self.scans += 1
+        self.scan_seconds += time.perf_counter() - started
+        return [info for rule_matches in found for info in rule_matches]
+
+    def _scan_keyword_rules(self, text: str, found: List[List[Dict[str, Any]]]):
+        pending = set(self._keyword_rules)
+        line_number, last = 1, 0
+        position = 0
+
+        while pending:
+            hit = self._prefilter.search(text, position)
+            if hit is None:
+                break
+
+            line_start = text.rfind("\n", 0, hit.start()) + 1
+            line_end = text.find("\n", hit.end())
+            if line_end == -1:
+                line_end = len(text)
+
+            line_number += text.count("\n", last, line_start)
+            last = line_start
+
+            line = text[line_start:line_end]
+            lowered = line.lower()
+            for index in list(pending):
+                rule = self.rules[index]
+                if rule["keyword"] not in lowered:
+                    continue
+                rule_started = time.perf_counter()
+                for match in rule["regex"].finditer(line):
+                    found[index].append(self._pattern_info(rule, match, line_number))
+                    if len(found[index]) >= self.max_matches_per_rule:
+                        pending.discard(index)
+                        break
+                stats = self.rule_stats[rule["name"]]
+                stats["lines"] += 1
+                stats["seconds"] += time.perf_counter() - rule_started
+
+            # السطر التالي
+            position = line_end + 1
+
+    @staticmethod
+    def _pattern_info(rule: Dict[str, Any], match: re.Match, line_number: int) -> Dict[str, Any]:
+        return {
+            "rule_name": rule["name"],
+            "error_message": match.group(0),
+            "matched_text": match.group(1) if match.groups() else "",
+            "fix_type": rule["fix_type"],
+            "toolchain": rule.get("toolchain", "generic"),
+            "confidence": rule["confidence"],
+            "description": rule["description"],
+            "line_number": line_number
+        }
@@ -0,0 +1,173 @@
+"""
+تقسيم audit_logs حسب الوقت - partitions يومية أو شهرية على PostgreSQL وحذف السجلات المنتهية
+
+الحذف بـ DROP TABLE للـ partition كاملة بدلاً من DELETE لكل صف، وما تبقى (جزء من
+partition أو قاعدة بيانات غير مقسّمة مثل SQLite في الاختبار) يُحذف على دفعات.
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models.audit_log import AuditLog
+
+PARENT_TABLE = "audit_logs"
+PARTITION_PREFIX = "audit_logs_p"
+# يستقبل الصفوف خارج نطاق الـ partitions (إذا تأخرت مهمة التنظيف) بدلاً من فشل الإدراج
+DEFAULT_PARTITION = "audit_logs_default"
+PARTITION_PERIODS = ("day", "month")
+
+
+def period_start(day: date, period: str) -> date:
+    """بداية الفترة التي يقع فيها اليوم"""
+    if period not in PARTITION_PERIODS:
+        raise ValueError(f"فترة تقسيم غير مدعومة: {period}")
+    return day if period == "day" else day.replace(day=1)
+
+
+def next_period(start: date, period: str) -> date:
+    """بداية الفترة التالية"""
+    if period == "day":
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(start: date, period: str) -> str:
+    """audit_logs_p20251030 (يومي) أو audit_logs_p202510 (شهري)"""
+    return f"{PARTITION_PREFIX}{start:%Y%m%d}" if period == "day" else f"{PARTITION_PREFIX}{start:%Y%m}"
+
+
+def partition_bounds(name: str) -> Optional[Tuple[date, date]]:
+    """نطاق الـ partition من اسمها [البداية، النهاية)، أو None لـ partition الافتراضية"""
+    suffix = name[len(PARTITION_PREFIX):] if name.startswith(PARTITION_PREFIX) else ""
+    try:
+        if len(suffix) == 8:
+            start = datetime.strptime(suffix, "%Y%m%d").date()
+            return start, next_period(start, "day")
+        if len(suffix) == 6:
+            start = datetime.strptime(suffix, "%Y%m").date()
+            return start, next_period(start, "month")
+    except ValueError:
+        pass
+    return None
+
+
+def is_partitioned(conn) -> bool:
+    """هل audit_logs جدول مقسّم؟ (PostgreSQL بعد migration 0003)"""
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :table AND pg_table_is_visible(c.oid))"
+    ), {"table": PARENT_TABLE}).scalar())
+
+
+def list_partitions(conn) -> List[str]:
+    """أسماء partitions الجدول"""
+    return list(conn.execute(text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :table AND pg_table_is_visible(parent.oid) "
+        "ORDER BY child.relname"
+    ), {"table": PARENT_TABLE}).scalars())
+
+
+def ensure_partitions(
+    conn,
+    start: Optional[date] = None,
+    ahead: Optional[int] = None,
+    period: Optional[str] = None
+) -> List[str]:
+    """إنشاء partitions من start (الافتراضي: الفترة الحالية) حتى ahead فترات قادمة، يعيد أسماء المنشأة"""
+    period = period or settings.audit_log_partition_period
+    ahead = settings.audit_log_partitions_ahead if ahead is None else ahead
+
+    today = datetime.utcnow().date()
+    current = period_start(start or today, period)
+    last = period_start(today, period)
+    for _ in range(ahead):
+        last = next_period(last, period)
+
+    existing = set(list_partitions(conn))
+    # نطاقات مغطاة مسبقاً (مثل partitions شهرية من migration 0003 عند التبديل إلى يومية)
+    covered = [bounds for bounds in map(partition_bounds, existing) if bounds is not None]
+    if DEFAULT_PARTITION not in existing:
+        conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+
+    created = []
+    while current <= last:
+        end = next_period(current, period)
+        name = partition_name(current, period)
+        overlaps = any(lower < end and current < upper for lower, upper in covered)
+        if not overlaps:
+            try:
+                # savepoint: فشل partition واحدة (تداخل نطاق، صفوف في الافتراضية) لا يلغي الباقي
+                with conn.begin_nested():
+                    conn.execute(text(
+                        f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+                        f"FOR VALUES FROM ('{current.isoformat()}') TO ('{end.isoformat()}')"
+                    ))
+                created.append(name)
+            except Exception as e:
+                print(f"خطأ في إنشاء partition {name}: {e}")
+        current = end
+
+    return created
+
+
+def drop_expired_partitions(conn, cutoff: datetime) -> List[str]:
+    """حذف الـ partitions التي ينتهي نطاقها قبل cutoff بالكامل"""
+    dropped = []
+    for name in list_partitions(conn):
+        bounds = partition_bounds(name)
+        if bounds is not None and bounds[1] <= cutoff.date():
+            conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+    return dropped
+
+
+def purge_rows(db: Session, cutoff: datetime, batch_size: int) -> int:
+    """حذف الصفوف الأقدم من cutoff على دفعات (commit بعد كل دفعة حتى لا تطول الأقفال)"""
+    deleted = 0
+    while True:
+        batch = select(AuditLog.id).where(AuditLog.timestamp < cutoff).limit(batch_size)
+        count = db.execute(
+            delete(AuditLog)
+            .where(AuditLog.timestamp < cutoff, AuditLog.id.in_(batch.scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+def purge_audit_logs(db: Session, retention_days: Optional[int] = None) -> Dict[str, Any]:
+    """تطبيق log_retention_days على audit_logs
+
+    على الجدول المقسّم: إنشاء partitions الفترات القادمة ثم حذف المنتهية بالكامل،
+    ثم حذف ما تبقى قبل cutoff (الـ partition الحالية جزئياً والافتراضية) على دفعات.
+    """
+    retention_days = retention_days or settings.log_retention_days
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+
+    conn = db.connection()
+    result = {
+        "cutoff": cutoff.isoformat() + "Z",
+        "partitioned": is_partitioned(conn),
+        "created_partitions": [],
+        "dropped_partitions": [],
+        "deleted_rows": 0
+    }
+
+    if result["partitioned"]:
+        result["created_partitions"] = ensure_partitions(conn)
+        result["dropped_partitions"] = drop_expired_partitions(conn, cutoff)
+        db.commit()
+
+    result["deleted_rows"] = purge_rows(db, cutoff, settings.audit_log_purge_batch_size)
+    return result
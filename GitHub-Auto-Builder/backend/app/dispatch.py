@@ -0,0 +1,258 @@
+"""
+إرسال مهام Celery من FastAPI بدون حجب event loop - مع صندوق صادر (outbox) عند بطء الـ broker
+"""
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+from .models import SessionLocal
+from .models.task_outbox import TaskOutbox
+from .tasks import celery_app
+
+# أقصى تأخير بين محاولات إعادة الإرسال
+MAX_RETRY_DELAY_SECONDS = 300
+
+
+class TaskDispatcher:
+    """إرسال المهام إلى الـ broker في threads منفصلة
+
+    الإرسال ينتظر رد الـ broker (تأكيد الاستلام) لمدة timeout على الأكثر. إذا تأخر
+    أو فشل تُحفظ المهمة في جدول task_outbox وتعيد حلقة الخلفية إرسالها لاحقاً،
+    فيبقى زمن استجابة الـ webhook ثابتاً مهما كان حال الـ broker.
+    التسليم at-least-once: المهمة قد تصل مرتين إذا نجح الإرسال المتأخر وإعادة الإرسال معاً.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 0.5,
+        max_workers: int = 8,
+        relay_interval: float = 5.0,
+        batch_size: int = 100
+    ):
+        self.timeout = timeout
+        self.relay_interval = relay_interval
+        self.batch_size = batch_size
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task-dispatch")
+        # thread منفصل للصندوق الصادر حتى لا ينتظر خلف إرسالات عالقة
+        self._outbox_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-outbox")
+        # وthread خاص لإعادة الإرسال: إرسال عالق إلى الـ broker لا يؤخر store_outbox في مسار الطلب
+        self._relay_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-relay")
+        self._relay_task: Optional[asyncio.Task] = None
+
+        # إحصائيات
+        self.published = 0
+        self.outboxed = 0
+        self.relayed = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._relay_task is not None and not self._relay_task.done()
+
+    async def start(self):
+        """تشغيل حلقة إعادة إرسال الصندوق الصادر"""
+        if self.running:
+            return
+        self._relay_task = asyncio.create_task(self._relay_loop(), name="task-outbox-relay")
+
+    async def stop(self):
+        """إيقاف حلقة إعادة الإرسال (المهام المتبقية تبقى في الجدول)"""
+        if self._relay_task is not None:
+            self._relay_task.cancel()
+            try:
+                await self._relay_task
+            except asyncio.CancelledError:
+                pass
+            self._relay_task = None
+
+    async def dispatch(self, task, *args, **kwargs) -> str:
+        """إرسال مهمة بدون حجب event loop، يعيد task_id
+
+        بديل غير متزامن لـ task.delay(*args, **kwargs).
+        """
+        args = list(args)
+        task_id = str(uuid.uuid4())
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, publish_task, task.name, args, kwargs, task_id)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+            self.published += 1
+            return task_id
+        except Exception as e:
+            error = "انتهت مهلة الإرسال" if isinstance(e, asyncio.TimeoutError) else str(e)
+
+        await loop.run_in_executor(
+            self._outbox_executor, store_outbox, task.name, args, kwargs, task_id, error
+        )
+        self.outboxed += 1
+
+        # إذا نجح الإرسال المتأخر لاحقاً تُحذف المهمة من الصندوق الصادر
+        future.add_done_callback(lambda f: self._on_late_publish(f, task_id))
+        return task_id
+
+    def _on_late_publish(self, future, task_id: str):
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._outbox_executor.submit(remove_outbox, task_id)
+
+    async def _relay_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.relay_interval)
+            try:
+                relayed, failed = await loop.run_in_executor(self._relay_executor, relay_outbox, self.batch_size)
+                self.relayed += relayed
+                self.failed += failed
+            except Exception as e:
+                print(f"خطأ في إعادة إرسال المهام: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """إحصائيات الإرسال"""
+        return {
+            "published": self.published,
+            "outboxed": self.outboxed,
+            "relayed": self.relayed,
+            "failed": self.failed,
+            "relay_running": self.running
+        }
+
+
+def publish_task(task_name: str, args: List[Any], kwargs: Dict[str, Any], task_id: str):
+    """إرسال المهمة إلى الـ broker وانتظار رده
+
+    retry=False حتى يفشل الإرسال مباشرة بدلاً من سياسة إعادة المحاولة الافتراضية في Celery
+    (الصندوق الصادر يتولى إعادة المحاولة).
+    """
+    celery_app.send_task(task_name, args=args, kwargs=kwargs, task_id=task_id, retry=False)
+
+
+def store_outbox(task_name: str, args: List[Any], kwargs: Dict[str, Any], task_id: str, error: str):
+    """حفظ مهمة في الصندوق الصادر"""
+    db = SessionLocal()
+    try:
+        db.add(TaskOutbox(
+            task_id=task_id,
+            task_name=task_name,
+            args=args,
+            kwargs=kwargs,
+            attempts=1,
+            last_error=error,
+            next_attempt_at=datetime.utcnow() + timedelta(seconds=settings.task_outbox_relay_interval_seconds)
+        ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"خطأ في حفظ المهمة {task_name} ({task_id}) في الصندوق الصادر: {e}")
+    finally:
+        db.close()
+
+
+def remove_outbox(task_id: str):
+    """حذف مهمة من الصندوق الصادر بعد وصولها"""
+    db = SessionLocal()
+    try:
+        db.query(TaskOutbox).filter(TaskOutbox.task_id == task_id).delete(synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"خطأ في حذف المهمة {task_id} من الصندوق الصادر: {e}")
+    finally:
+        db.close()
+
+
+def claim_outbox(batch_size: int) -> List[Dict[str, Any]]:
+    """حجز المهام المستحقة في transaction قصيرة
+
+    next_attempt_at يُؤجَّل بمهلة الحجز، فلا يلتقطها relay آخر أثناء إرسالها، وتعود
+    تلقائياً إذا توقف هذا الـ relay قبل إنهائها.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        rows = db.query(TaskOutbox).filter(
+            TaskOutbox.next_attempt_at <= now
+        ).order_by(TaskOutbox.id).limit(batch_size).with_for_update(skip_locked=True).all()
+
+        claimed = []
+        for row in rows:
+            row.next_attempt_at = now + timedelta(seconds=MAX_RETRY_DELAY_SECONDS)
+            claimed.append({
+                "id": row.id,
+                "task_id": row.task_id,
+                "task_name": row.task_name,
+                "args": row.args or [],
+                "kwargs": row.kwargs or {},
+                "attempts": row.attempts
+            })
+        db.commit()
+        return claimed
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def finish_relay(
+    sent_ids: List[int],
+    failed_row: Optional[Dict[str, Any]] = None,
+    error: str = "",
+    pending_ids: Optional[List[int]] = None
+):
+    """حذف المهام المرسلة، وجدولة إعادة المحاولة للمهمة الفاشلة وما بعدها من المحجوز"""
+    db = SessionLocal()
+    try:
+        if sent_ids:
+            db.query(TaskOutbox).filter(TaskOutbox.id.in_(sent_ids)).delete(synchronize_session=False)
+        if failed_row is not None:
+            attempts = failed_row["attempts"] + 1
+            delay = min(MAX_RETRY_DELAY_SECONDS, settings.task_outbox_relay_interval_seconds * 2 ** attempts)
+            next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            db.query(TaskOutbox).filter(TaskOutbox.id == failed_row["id"]).update({
+                "attempts": attempts,
+                "last_error": error,
+                "next_attempt_at": next_attempt_at
+            }, synchronize_session=False)
+            if pending_ids:
+                db.query(TaskOutbox).filter(TaskOutbox.id.in_(pending_ids)).update(
+                    {"next_attempt_at": next_attempt_at}, synchronize_session=False
+                )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def relay_outbox(batch_size: int = 100) -> tuple:
+    """إعادة إرسال المهام المستحقة، يعيد (عدد المرسلة، عدد الفاشلة)
+
+    الإرسال يتم بعد إنهاء transaction الحجز، فلا تبقى أقفال الصفوف أثناء انتظار الـ broker.
+    يتوقف عند أول فشل لأن الـ broker غالباً ما زال غير متاح.
+    """
+    rows = claim_outbox(batch_size)
+    sent_ids: List[int] = []
+    for index, row in enumerate(rows):
+        try:
+            publish_task(row["task_name"], row["args"], row["kwargs"], row["task_id"])
+        except Exception as e:
+            finish_relay(sent_ids, row, str(e), pending_ids=[pending["id"] for pending in rows[index + 1:]])
+            return len(sent_ids), 1
+        sent_ids.append(row["id"])
+
+    finish_relay(sent_ids)
+    return len(sent_ids), 0
+
+
+task_dispatcher = TaskDispatcher(
+    timeout=settings.task_dispatch_timeout_seconds,
+    max_workers=settings.task_dispatch_workers,
+    relay_interval=settings.task_outbox_relay_interval_seconds,
+    batch_size=settings.task_outbox_batch_size
+)
@@ -0,0 +1,198 @@
+"""
+أحداث البناء المباشرة - نشر تغييرات الحالة وأسطر اللوج عبر Redis pub/sub
+"""
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from .redis_client import get_redis, get_async_redis
+
+# الحالات النهائية (ينتهي عندها بث الأحداث)
+FINAL_STATUSES = ("success", "failed", "cancelled", "timeout")
+
+# أقصى حجم لنص اللوج في حدث واحد، الباقي يُقرأ من /api/builds/{id}/logs
+MAX_LOG_EVENT_BYTES = 64 * 1024
+
+
+def build_channel(build_id: int) -> str:
+    """قناة أحداث عملية البناء"""
+    return f"builds:{build_id}:events"
+
+
+def build_event_payload(build_id: int, event: str, data: Dict[str, Any]) -> str:
+    """رسالة الحدث كما تُنشر في القناة"""
+    return json.dumps({"event": event, "build_id": build_id, "data": data}, default=str)
+
+
+def publish_build_event(build_id: int, event: str, data: Dict[str, Any]):
+    """نشر حدث لعملية بناء (متزامن - لمهام Celery)
+
+    فشل النشر لا يوقف مسار البناء، العملاء يمكنهم دائماً الرجوع إلى GET /api/builds/{id}.
+    """
+    try:
+        get_redis().publish(build_channel(build_id), build_event_payload(build_id, event, data))
+    except Exception as e:
+        print(f"خطأ في نشر حدث البناء {build_id}: {e}")
+
+
+async def publish_build_event_async(build_id: int, event: str, data: Dict[str, Any]):
+    """مثل publish_build_event عبر عميل Redis غير المتزامن (لـ FastAPI routers)
+
+    بطء Redis أو تعطله لا يحجب event loop.
+    """
+    try:
+        await get_async_redis().publish(build_channel(build_id), build_event_payload(build_id, event, data))
+    except Exception as e:
+        print(f"خطأ في نشر حدث البناء {build_id}: {e}")
+
+
+def build_status_data(build) -> Dict[str, Any]:
+    """بيانات حدث الحالة"""
+    return {
+        "status": build.status,
+        "started_at": build.started_at.isoformat() + "Z" if build.started_at else None,
+        "finished_at": build.finished_at.isoformat() + "Z" if build.finished_at else None,
+        "duration_seconds": build.duration_seconds,
+        "logs_size": build.logs_size or 0
+    }
+
+
+def publish_build_status(build):
+    """نشر حالة البناء الحالية"""
+    publish_build_event(build.id, "status", build_status_data(build))
+
+
+async def publish_build_status_async(build):
+    """نشر حالة البناء الحالية (غير متزامن)"""
+    await publish_build_event_async(build.id, "status", build_status_data(build))
+
+
+def log_chunk_data(offset: int, data: bytes, size: Optional[int] = None, stream: str = "logs") -> Dict[str, Any]:
+    """بيانات حدث أسطر لوج جديدة بدءاً من offset
+
+    data قد يكون بداية الجزء فقط، وعندها truncated=true ويقرأ العميل الباقي
+    من /api/builds/{id}/logs?start=offset
+    """
+    size = size if size is not None else offset + len(data)
+    return {
+        "stream": stream,
+        "offset": offset,
+        "size": size,
+        "text": data[:MAX_LOG_EVENT_BYTES].decode("utf-8", errors="replace"),
+        "truncated": offset + len(data) < size or len(data) > MAX_LOG_EVENT_BYTES
+    }
+
+
+def publish_log_chunk(build_id: int, offset: int, data: bytes, size: Optional[int] = None, stream: str = "logs"):
+    """نشر أسطر لوج جديدة"""
+    publish_build_event(build_id, "log", log_chunk_data(offset, data, size, stream))
+
+
+async def publish_log_chunk_async(
+    build_id: int,
+    offset: int,
+    data: bytes,
+    size: Optional[int] = None,
+    stream: str = "logs"
+):
+    """نشر أسطر لوج جديدة (غير متزامن)"""
+    await publish_build_event_async(build_id, "log", log_chunk_data(offset, data, size, stream))
+
+
+def publish_log_written(build_id: int, offset: int, data: Union[str, bytes], stream: str = "logs"):
+    """نشر أحداث log لجزء مكتوب كاملاً (حدث لكل MAX_LOG_EVENT_BYTES)
+
+    يُستدعى قبل نشر الحالة النهائية، لأن العملاء ينهون البث عندها.
+    """
+    data = data.encode("utf-8") if isinstance(data, str) else data
+    for event in replay_log_events(offset, data, offset + len(data), stream):
+        publish_build_event(build_id, "log", event)
+
+
+async def publish_log_written_async(build_id: int, offset: int, data: Union[str, bytes], stream: str = "logs"):
+    """مثل publish_log_written (غير متزامن)"""
+    data = data.encode("utf-8") if isinstance(data, str) else data
+    for event in replay_log_events(offset, data, offset + len(data), stream):
+        await publish_build_event_async(build_id, "log", event)
+
+
+def log_event_id(data: Dict[str, Any]) -> str:
+    """معرّف حدث اللوج (Last-Event-ID عند إعادة الاتصال): النوع وحجم اللوج بعد الحدث"""
+    return f"{data.get('stream', 'logs')}:{data['size']}"
+
+
+def parse_log_event_id(event_id: Optional[str]) -> Optional[Tuple[str, int]]:
+    """(النوع، الموضع) من Last-Event-ID، و"1234" بدون نوع يعني logs"""
+    if not event_id:
+        return None
+    stream, _, offset = event_id.strip().rpartition(":")
+    try:
+        return stream or "logs", max(0, int(offset))
+    except ValueError:
+        return None
+
+
+def replay_log_events(start: int, data: bytes, size: int, stream: str = "logs") -> List[Dict[str, Any]]:
+    """أحداث log للجزء data المقروء من start (عند إعادة الاتصال)
+
+    كل حدث حتى MAX_LOG_EVENT_BYTES. إذا لم يُقرأ اللوج حتى size يحمل آخر حدث
+    size الكامل و truncated=true، فيقرأ العميل الباقي من /api/builds/{id}/logs.
+    """
+    events = []
+    for position in range(0, len(data), MAX_LOG_EVENT_BYTES):
+        piece = data[position:position + MAX_LOG_EVENT_BYTES]
+        end = start + position + len(piece)
+        last = position + MAX_LOG_EVENT_BYTES >= len(data)
+        events.append(log_chunk_data(start + position, piece, size if last else end, stream))
+    return events
+
+
+def format_sse(event: str, data: Any, event_id: Optional[str] = None) -> str:
+    """تنسيق رسالة Server-Sent Events"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in json.dumps(data, default=str).split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+async def open_build_subscription(build_id: int):
+    """فتح اشتراك في قناة أحداث عملية بناء
+
+    يجب فتح الاشتراك قبل قراءة الحالة الحالية من قاعدة البيانات حتى لا يضيع
+    أي حدث بين القراءة والاشتراك.
+    """
+    pubsub = get_async_redis().pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(build_channel(build_id))
+    return pubsub
+
+
+async def iter_build_events(pubsub, keepalive_seconds: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """أحداث الاشتراك، ويغلقه عند الانتهاء
+
+    يعيد None كل keepalive_seconds بدون أحداث حتى يرسل المستدعي رسالة keep-alive
+    ويتحقق من انقطاع العميل.
+    """
+    try:
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=keepalive_seconds)
+            if message is None:
+                yield None
+                continue
+            if message.get("type") != "message":
+                continue
+            try:
+                yield json.loads(message["data"])
+            except (TypeError, ValueError):
+                continue
+    finally:
+        await close_build_subscription(pubsub)
+
+
+async def close_build_subscription(pubsub):
+    """إغلاق الاشتراك"""
+    try:
+        await pubsub.unsubscribe()
+        await pubsub.close()
+    except Exception as e:
+        print(f"خطأ في إغلاق اشتراك الأحداث: {e}")
@@ -0,0 +1,69 @@
+"""
+تسليمات GitHub - منع تكرار معالجة نفس التسليم وتجميع دفعات push على نفس الفرع
+"""
+from typing import Optional
+
+from ..config import settings
+from ..redis_client import get_redis, get_async_redis
+
+
+def delivery_key(delivery_id: str) -> str:
+    return f"webhooks:delivery:{delivery_id}"
+
+
+def push_sequence_key(repository_id: int, branch: str) -> str:
+    return f"webhooks:push:{repository_id}:{branch}:seq"
+
+
+async def is_duplicate_delivery(delivery_id: Optional[str]) -> bool:
+    """هل وصل هذا التسليم (X-GitHub-Delivery) سابقاً؟
+
+    GitHub يعيد إرسال التسليم بنفس المعرّف. عند تعذر الوصول إلى Redis يُعالج
+    التسليم (الأفضل معالجته مرتين على إسقاطه).
+    """
+    if not delivery_id:
+        return False
+    try:
+        first = await get_async_redis().set(
+            delivery_key(delivery_id), 1, nx=True, ex=settings.webhook_delivery_ttl_seconds
+        )
+        return not first
+    except Exception as e:
+        print(f"خطأ في التحقق من تكرار التسليم {delivery_id}: {e}")
+        return False
+
+
+async def forget_delivery(delivery_id: Optional[str]):
+    """حذف معرّف التسليم حتى تُقبل إعادة إرساله (عند فشل حفظه في صندوق الوارد)"""
+    if not delivery_id:
+        return
+    try:
+        await get_async_redis().delete(delivery_key(delivery_id))
+    except Exception as e:
+        print(f"خطأ في حذف التسليم {delivery_id}: {e}")
+
+
+def next_push_sequence(repository_id: int, branch: str) -> Optional[int]:
+    """رقم تسلسلي جديد لآخر push على الفرع، أو None إذا تعذر الوصول إلى Redis"""
+    try:
+        key = push_sequence_key(repository_id, branch)
+        pipe = get_redis().pipeline(transaction=True)
+        pipe.incr(key)
+        pipe.expire(key, max(60, int(settings.push_debounce_seconds * 10)))
+        sequence, _ = pipe.execute()
+        return int(sequence)
+    except Exception as e:
+        print(f"خطأ في تسجيل push على {repository_id}/{branch}: {e}")
+        return None
+
+
+def is_latest_push(repository_id: int, branch: str, sequence: Optional[int]) -> bool:
+    """هل هذا آخر push على الفرع؟ (push أحدث وصل خلال نافذة التجميع يلغي هذا)"""
+    if sequence is None:
+        return True
+    try:
+        current = get_redis().get(push_sequence_key(repository_id, branch))
+        return current is None or int(current) <= sequence
+    except Exception as e:
+        print(f"خطأ في قراءة آخر push على {repository_id}/{branch}: {e}")
+        return True
@@ -0,0 +1,101 @@
+"""
+صندوق الوارد للـ webhooks - Redis stream يُحفظ فيه التسليم كما وصل ويعالجه المستهلك على دفعات
+"""
+import os
+import socket
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+
+from ..config import settings
+from ..redis_client import get_redis, get_async_redis
+
+INBOX_STREAM = "webhooks:inbox"
+INBOX_GROUP = "webhook-consumers"
+
+
+async def append_delivery(event_type: Optional[str], delivery_id: Optional[str], body: bytes) -> str:
+    """إضافة تسليم إلى صندوق الوارد، يعيد معرّف الرسالة في الـ stream
+
+    الـ body يُحفظ كما وصل (بعد التحقق من التوقيع) بدون تحليل. لا يُستخدم MAXLEN لأن
+    القص يحذف أقدم الرسائل حتى لو لم تُعالج بعد؛ الرسائل المعالجة تُحذف في ack_inbox،
+    وتراكم الباقي يظهر في get_inbox_stats.
+    """
+    return await get_async_redis().xadd(
+        INBOX_STREAM,
+        {
+            "event_type": event_type or "",
+            "delivery_id": delivery_id or "",
+            "body": body.decode("utf-8", errors="replace"),
+        }
+    )
+
+
+def consumer_name() -> str:
+    """اسم المستهلك داخل المجموعة (worker واحد لكل عملية)"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def ensure_consumer_group(client: redis.Redis):
+    """إنشاء مجموعة المستهلكين والـ stream إذا لم يوجدا"""
+    try:
+        client.xgroup_create(INBOX_STREAM, INBOX_GROUP, id="0", mkstream=True)
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def read_inbox(consumer: str, count: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """قراءة دفعة من صندوق الوارد
+
+    تُستعاد أولاً الرسائل التي قرأها مستهلك آخر ولم يؤكدها خلال مهلة
+    webhook_inbox_claim_idle_seconds (توقف الـ worker أو فشل الدفعة)، ثم الرسائل الجديدة.
+    """
+    client = get_redis()
+    ensure_consumer_group(client)
+
+    claimed = client.xautoclaim(
+        INBOX_STREAM, INBOX_GROUP, consumer,
+        min_idle_time=int(settings.webhook_inbox_claim_idle_seconds * 1000),
+        start_id="0-0",
+        count=count
+    )
+    # الرسائل المحذوفة من الـ stream تعود بدون حقول
+    entries = [(entry_id, fields) for entry_id, fields in claimed[1] if fields]
+    if entries:
+        return entries
+
+    response = client.xreadgroup(INBOX_GROUP, consumer, {INBOX_STREAM: ">"}, count=count)
+    return response[0][1] if response else []
+
+
+def ack_inbox(entry_ids: List[str]):
+    """تأكيد معالجة الرسائل وحذفها من الـ stream"""
+    if not entry_ids:
+        return
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.xack(INBOX_STREAM, INBOX_GROUP, *entry_ids)
+    pipe.xdel(INBOX_STREAM, *entry_ids)
+    pipe.execute()
+
+
+async def get_inbox_stats() -> Dict[str, Any]:
+    """حجم صندوق الوارد وعدد الرسائل قيد المعالجة (عبر عميل Redis غير المتزامن لنقاط الفحص)
+
+    backlogged: الطول تجاوز webhook_inbox_alert_length (المستهلك متوقف أو أبطأ من التسليمات).
+    """
+    client = get_async_redis()
+    try:
+        await client.xgroup_create(INBOX_STREAM, INBOX_GROUP, id="0", mkstream=True)
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+    pending = await client.xpending(INBOX_STREAM, INBOX_GROUP)
+    length = await client.xlen(INBOX_STREAM)
+    return {
+        "length": length,
+        "pending": pending.get("pending", 0),
+        "consumers": len(pending.get("consumers") or []),
+        "alert_length": settings.webhook_inbox_alert_length,
+        "backlogged": length >= settings.webhook_inbox_alert_length
+    }
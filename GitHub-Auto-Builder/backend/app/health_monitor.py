@@ -0,0 +1,128 @@
+"""
+مراقب الصحة - فحص المكونات دورياً في الخلفية وحفظ آخر نتيجة حتى يكون /api/health فورياً
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+from .config import settings
+from .models import async_engine, get_pool_stats
+from .redis_client import get_async_redis
+
+
+class HealthMonitor:
+    """فحص قاعدة البيانات وRedis كل interval ثانية في الخلفية
+
+    نقاط الفحص (load balancers) تقرأ آخر نتيجة محفوظة بدون أي اتصال، فلا يزيد
+    تكرار الفحص الحمل على قاعدة البيانات. النتيجة الأقدم من ثلاث دورات تُعتبر قديمة.
+    """
+
+    def __init__(self, interval: float = 10.0, timeout: float = 2.0):
+        self.interval = interval
+        self.timeout = timeout
+
+        self._components: Dict[str, Dict[str, Any]] = {}
+        self._checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """تشغيل الفحص الدوري في الخلفية (الفحص الأول فوراً)"""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run(), name="health-monitor")
+
+    async def stop(self):
+        """إيقاف الفحص الدوري"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def refresh(self):
+        """فحص جميع المكونات بالتوازي وحفظ النتيجة"""
+        database, redis = await asyncio.gather(
+            self._check("database", check_database),
+            self._check("redis", check_redis)
+        )
+        self._components = {"database": database, "redis": redis}
+        self._checked_at = time.time()
+
+    async def _check(self, name: str, check) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(check(), timeout=self.timeout)
+            result.update(status="healthy", healthy=True, connection="active")
+        except Exception as e:
+            error = f"انتهت مهلة فحص {name}" if isinstance(e, asyncio.TimeoutError) else str(e)
+            result = {"status": "unhealthy", "healthy": False, "connection": "failed", "error": error}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        result["timestamp"] = datetime.utcnow().isoformat() + "Z"
+        return result
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"خطأ في فحص الصحة: {e}")
+            await asyncio.sleep(self.interval)
+
+    def get_component(self, name: str) -> Dict[str, Any]:
+        """آخر نتيجة فحص لمكون"""
+        return self._components.get(name) or {"status": "unknown", "healthy": False}
+
+    def get_status(self) -> Dict[str, Any]:
+        """الحالة المحفوظة (بدون أي اتصال)"""
+        age = time.time() - self._checked_at if self._checked_at is not None else None
+        stale = age is None or age > self.interval * 3
+
+        components = {name: self.get_component(name) for name in ("database", "redis")}
+        healthy = all(component["healthy"] for component in components.values())
+
+        return {
+            "status": "healthy" if healthy and not stale else "degraded",
+            "components": components,
+            "checked_at": datetime.utcfromtimestamp(self._checked_at).isoformat() + "Z" if self._checked_at else None,
+            "age_seconds": round(age, 2) if age is not None else None,
+            "stale": stale,
+            "monitor_running": self.running
+        }
+
+
+async def check_database() -> Dict[str, Any]:
+    """SELECT 1 على اتصال من الـ pool"""
+    async with async_engine.connect() as conn:
+        if (await conn.execute(text("SELECT 1"))).scalar() != 1:
+            raise Exception("Database query failed")
+    return {
+        "read_replica": bool(settings.database_read_url),
+        "pool": get_pool_stats()
+    }
+
+
+async def check_redis() -> Dict[str, Any]:
+    """PING ومعلومات الخادم عبر عميل Redis المشترك"""
+    client = get_async_redis()
+    await client.ping()
+    info = await client.info("server")
+    return {
+        "version": info.get("redis_version", "unknown"),
+        "uptime_in_seconds": info.get("uptime_in_seconds", 0)
+    }
+
+
+# instance عام يُشغّل ويُوقف من lifespan التطبيق
+health_monitor = HealthMonitor(
+    interval=settings.health_check_interval_seconds,
+    timeout=settings.health_check_timeout_seconds
+)
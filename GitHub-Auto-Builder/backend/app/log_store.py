@@ -0,0 +1,212 @@
+"""
+تخزين لوجات البناء - أجزاء مضغوطة في جدول build_log_chunks مع ملخص (بداية/نهاية) على صف البناء
+"""
+import hashlib
+import zlib
+from typing import Optional, Tuple, Union
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from .models.build import Build
+from .models.build_log import BuildLogChunk
+
+try:
+    import zstandard
+except ImportError:  # zstd اختياري، zlib كبديل
+    zstandard = None
+
+LOG_STREAMS = ("logs", "errors")
+
+# حجم الجزء قبل الضغط
+LOG_CHUNK_SIZE = 256 * 1024
+
+# الملخص المحفوظ على صف البناء
+LOG_HEAD_CHARS = 4096
+LOG_TAIL_CHARS = 16384
+ERROR_LOGS_TAIL_CHARS = 8192
+
+# أقصى حجم يُقرأ في طلب واحد
+MAX_LOG_RANGE = 4 * 1024 * 1024
+
+ZSTD_LEVEL = 3
+
+
+class LogOffsetError(ValueError):
+    """الموضع المرسل لا يطابق نهاية اللوج الحالية"""
+
+    def __init__(self, message: str, expected_offset: int):
+        super().__init__(message)
+        self.expected_offset = expected_offset
+
+
+def compress(data: bytes) -> Tuple[str, bytes]:
+    """ضغط البيانات، يعيد (الترميز، البيانات المضغوطة)"""
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    """فك ضغط جزء حسب ترميزه"""
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard غير مثبت لقراءة أجزاء zstd")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"ترميز غير مدعوم: {codec}")
+
+
+def _to_bytes(content: Union[str, bytes]) -> bytes:
+    return content.encode("utf-8") if isinstance(content, str) else content
+
+
+def get_log_size(db: Session, build: Build, stream: str = "logs") -> int:
+    """حجم اللوج بالبايت"""
+    if stream == "logs" and build.logs_size is not None:
+        return build.logs_size
+    size = db.query(func.max(BuildLogChunk.offset + BuildLogChunk.length)).filter(
+        BuildLogChunk.build_id == build.id,
+        BuildLogChunk.stream == stream
+    ).scalar()
+    return int(size or 0)
+
+
+def is_range_written(
+    db: Session,
+    build: Build,
+    offset: int,
+    length: int,
+    stream: str = "logs",
+    digest: Optional[str] = None
+) -> bool:
+    """هل كُتب النطاق [offset, offset + length) سابقاً كإضافة واحدة؟
+
+    الإضافة الواحدة قد تُقسم إلى عدة أجزاء، لذلك يكفي أن يبدأ جزء عند offset
+    وينتهي جزء عند offset + length. مع digest (sha256) يجب أن يطابق المحتوى المحفوظ
+    أيضاً، فلا يُقبل محتوى مختلف بنفس الموضع والطول كإعادة إرسال.
+    """
+    if length <= 0:
+        return False
+    end = offset + length
+    chunks = db.query(BuildLogChunk.offset, BuildLogChunk.length).filter(
+        BuildLogChunk.build_id == build.id,
+        BuildLogChunk.stream == stream,
+        or_(BuildLogChunk.offset == offset, BuildLogChunk.offset + BuildLogChunk.length == end)
+    ).all()
+    starts = any(chunk_offset == offset for chunk_offset, _ in chunks)
+    ends = any(chunk_offset + chunk_length == end for chunk_offset, chunk_length in chunks)
+    if not (starts and ends):
+        return False
+    return digest is None or hashlib.sha256(read_log(db, build, offset, end, stream)).hexdigest() == digest
+
+
+def append_log(
+    db: Session,
+    build: Build,
+    data: Union[str, bytes],
+    offset: Optional[int] = None,
+    stream: str = "logs"
+) -> int:
+    """إضافة بيانات إلى نهاية اللوج، يعيد الحجم الجديد
+
+    إذا أُرسل offset يجب أن يساوي نهاية اللوج الحالية. إعادة إرسال جزء مكتوب سابقاً
+    بنفس الموضع والطول لا تغير شيئاً (idempotent)، وأي موضع آخر يرفع LogOffsetError.
+    """
+    data = _to_bytes(data)
+    size = get_log_size(db, build, stream)
+
+    if offset is not None and offset != size:
+        digest = hashlib.sha256(data).hexdigest()
+        if offset < size and is_range_written(db, build, offset, len(data), stream, digest):
+            return size
+        raise LogOffsetError(f"الموضع {offset} لا يطابق نهاية اللوج {size}", size)
+
+    if not data:
+        return size
+
+    for start in range(0, len(data), LOG_CHUNK_SIZE):
+        piece = data[start:start + LOG_CHUNK_SIZE]
+        codec, blob = compress(piece)
+        db.add(BuildLogChunk(
+            build_id=build.id,
+            stream=stream,
+            offset=size + start,
+            length=len(piece),
+            codec=codec,
+            data=blob
+        ))
+
+    _update_summary(build, data, stream)
+    db.flush()
+    return size + len(data)
+
+
+def write_log(db: Session, build: Build, content: Union[str, bytes], stream: str = "logs") -> int:
+    """استبدال اللوج بالكامل، يعيد الحجم الجديد"""
+    db.query(BuildLogChunk).filter(
+        BuildLogChunk.build_id == build.id,
+        BuildLogChunk.stream == stream
+    ).delete(synchronize_session=False)
+
+    if stream == "logs":
+        build.logs_head = None
+        build.logs_tail = None
+        build.logs_size = 0
+        build.logs_content = None
+    else:
+        build.error_logs = None
+
+    return append_log(db, build, content, offset=0, stream=stream)
+
+
+def read_log(
+    db: Session,
+    build: Build,
+    start: int = 0,
+    end: Optional[int] = None,
+    stream: str = "logs"
+) -> bytes:
+    """قراءة البايتات [start, end) من اللوج بفك ضغط الأجزاء المتداخلة فقط"""
+    if end is None:
+        end = get_log_size(db, build, stream)
+    if end <= start:
+        return b""
+
+    chunks = db.query(BuildLogChunk).filter(
+        BuildLogChunk.build_id == build.id,
+        BuildLogChunk.stream == stream,
+        BuildLogChunk.offset < end,
+        BuildLogChunk.offset + BuildLogChunk.length > start
+    ).order_by(BuildLogChunk.offset).all()
+
+    parts = []
+    for chunk in chunks:
+        data = decompress(chunk.codec, chunk.data)
+        parts.append(data[max(0, start - chunk.offset):end - chunk.offset])
+    return b"".join(parts)
+
+
+def read_log_text(db: Session, build: Build, stream: str = "logs") -> str:
+    """اللوج الكامل كنص (مع دعم اللوجات القديمة المخزنة في أعمدة Text)"""
+    if stream == "logs" and not build.logs_size and build.logs_content:
+        return build.logs_content
+    data = read_log(db, build, stream=stream)
+    if not data and stream == "errors":
+        return build.error_logs or ""
+    return data.decode("utf-8", errors="replace")
+
+
+def _update_summary(build: Build, data: bytes, stream: str):
+    """تحديث الملخص المحفوظ على صف البناء بعد الإضافة"""
+    text = data.decode("utf-8", errors="replace")
+
+    if stream == "logs":
+        head = build.logs_head or ""
+        if len(head) < LOG_HEAD_CHARS:
+            build.logs_head = head + text[:LOG_HEAD_CHARS - len(head)]
+        build.logs_tail = ((build.logs_tail or "") + text[-LOG_TAIL_CHARS:])[-LOG_TAIL_CHARS:]
+        build.logs_size = (build.logs_size or 0) + len(data)
+    else:
+        build.error_logs = ((build.error_logs or "") + text[-ERROR_LOGS_TAIL_CHARS:])[-ERROR_LOGS_TAIL_CHARS:]
@@ -8,11 +8,16 @@ from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 
 from .config import settings, get_security_headers
-from .models.database import create_tables, get_table_info
+from .models import dispose_async_engines
+from .models.database import get_schema_revision
 from .routers import github_webhooks, builds, repositories, integrations, health
-from .middleware.rate_limiter import RateLimitMiddleware
+from .middleware.rate_limiter import setup_rate_limiting
 from .middleware.auth import AuthenticationMiddleware
 from .middleware.logging import LoggingMiddleware
+from .middleware.audit_writer import audit_log_writer
+from .dispatch import task_dispatcher
+from .health_monitor import health_monitor
+from .redis_client import close_redis
 
 
 @asynccontextmanager
@@ -23,25 +28,45 @@ async def lifespan(app: FastAPI):
     print(f"🔧 البيئة: {settings.env}")
     print(f"🐍 Python: 3.11+")
     
-    # إنشاء الجداول
+    # التحقق من revision المخطط فقط (الـ migrations خطوة نشر: python run.py migrate)
     try:
-        create_tables()
-        print("✅ تم إنشاء جداول قاعدة البيانات بنجاح")
-        
-        # فحص الاتصال
-        info = get_table_info()
-        if info['connected']:
-            print(f"📊 قاعدة البيانات: {info['total_tables']} جدول")
+        schema = get_schema_revision()
+        if schema['up_to_date']:
+            print(f"✅ مخطط قاعدة البيانات محدّث ({', '.join(schema['head'])})")
         else:
-            print(f"❌ خطأ في قاعدة البيانات: {info.get('error', 'غير محدد')}")
+            current = ', '.join(schema['current']) or 'فارغ'
+            print(f"⚠️  مخطط قاعدة البيانات غير محدّث ({current} ← {', '.join(schema['head'])}) - شغّل: python run.py migrate")
             
     except Exception as e:
-        print(f"❌ خطأ في إعداد قاعدة البيانات: {e}")
+        print(f"❌ خطأ في الاتصال بقاعدة البيانات: {e}")
+    
+    # كاتب سجلات المراجعة على دفعات
+    await audit_log_writer.start()
+    
+    # إعادة إرسال مهام Celery المتأخرة
+    await task_dispatcher.start()
+    
+    # فحص المكونات في الخلفية لـ /api/health
+    await health_monitor.start()
     
     yield
     
     # Shutdown
     print("🔄 إيقاف GitHub Auto Builder...")
+    
+    await health_monitor.stop()
+    
+    # تفريغ سجلات المراجعة المتبقية قبل الإيقاف
+    await audit_log_writer.stop()
+    stats = audit_log_writer.get_stats()
+    print(f"📝 سجلات المراجعة: {stats['written']} مكتوبة، {stats['dropped']} مُسقطة، {stats['failed']} فاشلة")
+    
+    await task_dispatcher.stop()
+    stats = task_dispatcher.get_stats()
+    print(f"📤 مهام Celery: {stats['published']} مرسلة، {stats['outboxed']} في الصندوق الصادر، {stats['relayed']} أعيد إرسالها")
+    
+    await close_redis()
+    await dispose_async_engines()
 
 
 # إنشاء تطبيق FastAPI
@@ -67,8 +92,7 @@ app.add_middleware(
 )
 
 # Rate Limiting
-if settings.env == "production":
-    app.add_middleware(RateLimitMiddleware)
+setup_rate_limiting(app)
 
 # Authentication
 app.add_middleware(AuthenticationMiddleware)
@@ -107,7 +131,8 @@ async def http_exception_handler(request, exc):
             },
             "timestamp": "2025-10-30T23:03:52Z",
             "path": str(request.url.path)
-        }
+        },
+        headers=getattr(exc, "headers", None)
     )
 
 
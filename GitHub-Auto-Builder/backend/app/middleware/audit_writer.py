@@ -0,0 +1,155 @@
+"""
+كاتب سجلات المراجعة على دفعات - يجمع سجلات الطلبات في طابور محدود ويكتبها دفعة واحدة
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from ..config import settings
+from ..models import SessionLocal
+from ..models.audit_log import AuditLog
+
+# علامة الإيقاف داخل الطابور
+_STOP = object()
+
+
+class AuditLogWriter:
+    """Background writer that flushes audit log rows in batches
+
+    الصفوف تُجمع في asyncio.Queue محدود الحجم، وتُكتب بـ INSERT واحد (executemany)
+    عند امتلاء الدفعة أو انتهاء مهلة التفريغ. عند امتلاء الطابور يُسقط السجل الجديد
+    ويُحتسب في عداد dropped بدلاً من إبطاء الطلب.
+    """
+
+    def __init__(self, batch_size: int = 500, flush_interval: float = 1.0, queue_size: int = 10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # إحصائيات
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_flush_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """تشغيل الكاتب في الخلفية"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run(), name="audit-log-writer")
+
+    async def stop(self, timeout: float = 10.0):
+        """إيقاف الكاتب بعد تفريغ جميع السجلات المتبقية"""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        try:
+            await asyncio.wait_for(self._task, timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ انتهت مهلة تفريغ سجلات المراجعة، المتبقي: {self._queue.qsize()}")
+            self._task.cancel()
+        finally:
+            self._task = None
+
+    def submit(self, row: Dict[str, Any]) -> bool:
+        """إضافة سجل إلى الطابور بدون انتظار، يعيد False إذا أُسقط السجل"""
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                print(f"⚠️ طابور سجلات المراجعة ممتلئ، تم إسقاط {self.dropped} سجل")
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """إحصائيات الكاتب"""
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_flush_at": self.last_flush_at,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            stopping = False
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                # أخذ ما هو متاح فوراً قبل الانتظار
+                if not self._queue.empty():
+                    item = self._queue.get_nowait()
+                else:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        loop = asyncio.get_running_loop()
+        try:
+            # الكتابة في thread منفصل لتجنب blocking
+            await loop.run_in_executor(None, write_audit_rows, batch)
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"خطأ في حفظ دفعة سجلات المراجعة ({len(batch)} سجل): {e}")
+        finally:
+            self.batches += 1
+            self.last_flush_at = time.time()
+
+
+def write_audit_rows(rows: List[Dict[str, Any]]):
+    """كتابة مجموعة سجلات في معاملة واحدة"""
+    db = SessionLocal()
+    try:
+        db.execute(insert(AuditLog.__table__), rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# instance عام يُشغّل ويُوقف من lifespan التطبيق
+audit_log_writer = AuditLogWriter(
+    batch_size=settings.audit_log_batch_size,
+    flush_interval=settings.audit_log_flush_interval_seconds,
+    queue_size=settings.audit_log_queue_size,
+)
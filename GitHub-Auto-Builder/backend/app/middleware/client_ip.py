@@ -0,0 +1,63 @@
+"""
+عنوان العميل الحقيقي - X-Forwarded-For يُقبل فقط من الـ proxies الموثوقة (trusted_proxies)
+"""
+import ipaddress
+from typing import Any, Dict, List, Union
+
+from ..config import settings
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_networks(values: List[str]) -> List[Network]:
+    """تحويل عناوين IP/CIDR إلى شبكات (القيم غير الصالحة تُتجاهل)"""
+    networks = []
+    for value in values:
+        try:
+            networks.append(ipaddress.ip_network(value.strip(), strict=False))
+        except ValueError:
+            print(f"⚠️ عنوان proxy غير صالح في trusted_proxies: {value}")
+    return networks
+
+
+def is_trusted_proxy(ip: str, networks: List[Network]) -> bool:
+    """هل العنوان ضمن الشبكات الموثوقة؟"""
+    if not networks:
+        return False
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def resolve_client_ip(scope: Dict[str, Any], networks: List[Network]) -> str:
+    """الحصول على IP الحقيقي للعميل من ASGI scope
+
+    عنوان الاتصال نفسه، إلا إذا كان proxy موثوقاً: عندها أقرب عنوان غير موثوق من
+    اليمين في X-Forwarded-For (ما قبله يضيفه العميل ويمكن تزويره)، ثم X-Real-IP.
+    """
+    client = scope.get("client")
+    peer = client[0] if client else "unknown"
+    if not is_trusted_proxy(peer, networks):
+        return peer
+
+    headers = scope.get("headers") or []
+    forwarded_for = b",".join(value for name, value in headers if name == b"x-forwarded-for")
+    hops = [hop.strip() for hop in forwarded_for.decode("latin-1").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not is_trusted_proxy(hop, networks):
+            return hop
+    if hops:
+        return hops[0]
+
+    real_ip = dict(headers).get(b"x-real-ip")
+    if real_ip:
+        return real_ip.decode("latin-1").strip()
+
+    return peer
+
+
+def trusted_proxy_networks() -> List[Network]:
+    """الشبكات الموثوقة من الإعدادات (تُحسب مرة واحدة لكل middleware)"""
+    return parse_networks(settings.trusted_proxies)
@@ -2,15 +2,14 @@
 Logging Middleware - تسجيل جميع الطلبات
 """
 import time
-import json
+import asyncio
 from typing import Dict, Any
 from fastapi import Request
-from starlette.middleware.base import RequestResponseEndpoint
 from starlette.types import ASGIApp
-from starlette.responses import Response
 
-from ..models.database import SessionLocal
 from ..models.audit_log import AuditLog
+from .audit_writer import audit_log_writer, write_audit_rows
+from .client_ip import resolve_client_ip, trusted_proxy_networks
 
 
 class LoggingMiddleware:
@@ -18,40 +17,49 @@ class LoggingMiddleware:
     
     def __init__(self, app: ASGIApp):
         self.app = app
+        self.trusted_proxies = trusted_proxy_networks()
     
     async def __call__(self, scope: Dict[str, Any], receive, send):
-        if scope["type"] == "http":
-            request = Request(scope)
-            start_time = time.time()
-            
-            # حفظ البيانات الأولية
-            scope["start_time"] = start_time
-            scope["request_id"] = self.generate_request_id()
-            
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        request = Request(scope)
+        start_time = time.time()
+        
+        # حفظ البيانات الأولية
+        scope["start_time"] = start_time
+        scope["request_id"] = self.generate_request_id()
+        
+        # التقاط رمز الحالة من رسالة بدء الاستجابة
+        status = {"code": 500}
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+        
+        try:
             # معالجة الطلب
-            response = await self.app(scope, receive, send)
-            
+            await self.app(scope, receive, send_wrapper)
+        finally:
             # تسجيل العملية
-            await self.log_request(request, start_time, response)
-            
-            return response
-        else:
-            return await self.app(scope, receive, send)
+            await self.log_request(request, start_time, status["code"])
     
     def generate_request_id(self) -> str:
         """إنشاء معرف فريد للطلب"""
         import uuid
         return str(uuid.uuid4())
     
-    async def log_request(self, request: Request, start_time: float, response: Response):
+    async def log_request(self, request: Request, start_time: float, status_code: int):
         """تسجيل تفاصيل الطلب"""
         try:
             end_time = time.time()
             duration = end_time - start_time
+            client_ip = self.get_client_ip(request)
+            user_agent = request.headers.get("user-agent")
             
             # إنشاء سجل مراجعة
-            log_entry = AuditLog()
-            log_entry.record_action(
+            row = AuditLog.build_row(
                 actor_type="api",
                 actor_name="api_client",
                 action="api_request",
@@ -62,60 +70,39 @@ class LoggingMiddleware:
                     "method": request.method,
                     "path": request.url.path,
                     "query_params": dict(request.query_params),
-                    "client_ip": self.get_client_ip(request),
-                    "user_agent": request.headers.get("user-agent"),
-                    "status_code": response.status_code,
+                    "client_ip": client_ip,
+                    "user_agent": user_agent,
+                    "status_code": status_code,
                     "duration_seconds": round(duration, 3),
                     "request_id": request.scope.get("request_id")
                 },
-                success=response.status_code < 400,
-                error_message=None if response.status_code < 400 else f"HTTP {response.status_code}"
+                success=status_code < 400,
+                error_message=None if status_code < 400 else f"HTTP {status_code}",
+                ip_address=client_ip,
+                user_agent=user_agent
             )
             
-            # حفظ في قاعدة البيانات (في background)
-            await self.save_log_async(log_entry)
+            # إضافة إلى طابور الكتابة على دفعات (في background)
+            await self.save_log_async(row)
             
         except Exception as e:
             # لا نريد أن يفشل الطلب بسبب خطأ في logging
             print(f"خطأ في تسجيل الطلب: {e}")
     
     def get_client_ip(self, request: Request) -> str:
-        """الحصول على IP الحقيقي للعميل"""
-        # البحث عن IP في headers مختلفة
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
-        
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip
-        
-        return request.client.host if request.client else "unknown"
+        """الحصول على IP الحقيقي للعميل (نفس قواعد rate limiter: X-Forwarded-For فقط من trusted_proxies)"""
+        return resolve_client_ip(request.scope, self.trusted_proxies)
     
-    async def save_log_async(self, log_entry: AuditLog):
+    async def save_log_async(self, row: Dict[str, Any]):
         """حفظ السجل بشكل غير متزامن"""
+        if audit_log_writer.running:
+            # عند امتلاء الطابور يُسقط السجل ويُحتسب في إحصائيات الكاتب
+            audit_log_writer.submit(row)
+            return
+        
+        # الكاتب غير مُشغّل (مثلاً بدون lifespan): كتابة مباشرة في thread منفصل
         try:
-            import asyncio
-            loop = asyncio.get_event_loop()
-            
-            # تشغيل في thread منفصل لتجنب blocking
-            await loop.run_in_executor(
-                None,
-                self._save_log_sync,
-                log_entry
-            )
-            
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, write_audit_rows, [row])
         except Exception as e:
             print(f"خطأ في حفظ السجل: {e}")
-    
-    def _save_log_sync(self, log_entry: AuditLog):
-        """حفظ السجل بشكل متزامن"""
-        try:
-            db = SessionLocal()
-            db.add(log_entry)
-            db.commit()
-        except Exception as e:
-            print(f"خطأ في حفظ السجل في قاعدة البيانات: {e}")
-            db.rollback()
-        finally:
-            db.close()
@@ -1,67 +1,225 @@
 """
-Rate Limiting Middleware
+Rate Limiting Middleware - تحديد معدل الطلبات الموزّع باستخدام Redis
 """
-from fastapi import Request, HTTPException
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+import json
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp
 
 from ..config import settings
+from ..redis_client import get_async_redis
+from .client_ip import resolve_client_ip, trusted_proxy_networks
+
+# مجموعات المسارات: (البادئة، المجموعة، مضاعف الحد). None يعني بدون حد
+ROUTE_GROUPS: List[Tuple[str, str, Optional[int]]] = [
+    ("/api/health", "health", None),
+    ("/api/webhooks", "webhooks", 5),  # webhooks - limits مرنة أكثر
+    ("/api/builds", "builds", 2),  # builds - limits متوسطة
+]
+DEFAULT_GROUP = ("default", 1)
+
+# النوافذ الزمنية: (الاسم، الطول بالثواني)
+WINDOWS = [("hour", 3600), ("day", 86400)]
+
+# نافذة منزلقة تقريبية (sliding window counter) لعدة نوافذ في خطوة ذرية واحدة.
+# KEYS: لكل نافذة (عداد النافذة الحالية، عداد النافذة السابقة)
+# ARGV: عدد الرموز المطلوبة، الوقت الحالي، ثم لكل نافذة (الحد، الطول)
+# يعيد {عدد الرموز الممنوحة، ثواني الانتظار عند الرفض}
+SLIDING_WINDOW_SCRIPT = """
+local requested = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+local windows = (#ARGV - 2) / 2
+local grant = requested
+local retry_after = 0
+
+for i = 1, windows do
+    local limit = tonumber(ARGV[1 + 2 * i])
+    local window = tonumber(ARGV[2 + 2 * i])
+    local elapsed = now % window
+    local current = tonumber(redis.call('GET', KEYS[2 * i - 1]) or '0')
+    local previous = tonumber(redis.call('GET', KEYS[2 * i]) or '0')
+    local estimated = previous * (window - elapsed) / window + current
+    local available = math.floor(limit - estimated)
+    if available < grant then
+        grant = math.max(available, 0)
+    end
+    if available < 1 then
+        -- الوقت حتى ينخفض التقدير برمز واحد، أو حتى بداية النافذة التالية
+        local wait = window - elapsed
+        if previous > 0 then
+            wait = math.min(wait, (estimated - limit + 1) * window / previous)
+        end
+        retry_after = math.max(retry_after, wait)
+    end
+end
+
+if grant < 1 then
+    return {0, math.ceil(retry_after)}
+end
+
+for i = 1, windows do
+    local window = tonumber(ARGV[2 + 2 * i])
+    redis.call('INCRBY', KEYS[2 * i - 1], grant)
+    redis.call('EXPIRE', KEYS[2 * i - 1], window * 2)
+end
+return {grant, 0}
+"""
 
-# إنشاء limiter
-limiter = Limiter(key_func=get_remote_address)
+
+@dataclass
+class _Lease:
+    """رموز محجوزة مسبقاً من Redis لعميل واحد داخل هذه العملية"""
+    tokens: int = 0
+    size: int = 1
+    expires_at: float = 0.0
+    blocked_until: float = 0.0
 
 
 class RateLimitMiddleware:
-    """Rate Limiting Middleware"""
-    
-    def __init__(self, app):
+    """Rate Limiting Middleware
+
+    كل عملية تحجز دفعات صغيرة من الرموز (lease) من Redis وتستهلكها محلياً حتى تنفد
+    أو تنتهي صلاحيتها، فلا يحتاج كل طلب إلى رحلة إلى Redis. حجم الدفعة يبدأ برمز واحد
+    ويتضاعف فقط للعملاء الذين يستهلكون دفعتهم كاملة قبل انتهاء صلاحيتها، حتى لا يُهدر
+    حد العملاء قليلي الطلبات. الرفض يُخزّن محلياً حتى انتهاء Retry-After.
+    عند تعطل Redis يُسمح بالطلبات (fail open).
+    """
+
+    def __init__(self, app: ASGIApp, redis=None):
         self.app = app
-    
+        self.redis = redis
+        self.hourly_limit = settings.rate_limit_requests_per_hour
+        self.daily_limit = settings.rate_limit_requests_per_day
+        self.lease_max = max(1, settings.rate_limit_lease_max)
+        self.lease_ttl = settings.rate_limit_lease_ttl_seconds
+        self.max_cached_clients = 10000
+        self.trusted_proxies = trusted_proxy_networks()
+        self._leases: Dict[Tuple[str, str], _Lease] = {}
+        self._script = None
+        self._redis_down_until = 0.0
+
     async def __call__(self, scope, receive, send):
-        if scope["type"] == "http":
-            # تطبيق limits حسب نوع الـ endpoint
-            request = Request(scope, receive, send)
-            
-            # تطبيق rate limits مختلفة حسب المسار
-            await self.apply_limits(request, send)
-        
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        group, multiplier = self.get_route_group(scope["path"])
+        if multiplier is None:
+            return await self.app(scope, receive, send)
+
+        allowed, retry_after = await self.apply_limits(self.get_client_ip(scope), group, multiplier)
+        if not allowed:
+            return await self.reject(scope, send, retry_after)
+
         return await self.app(scope, receive, send)
-    
-    async def apply_limits(self, request: Request, send):
-        """تطبيق limits"""
-        # يمكن تطبيق limits مختلفة حسب المسار
-        path = request.url.path
-        
-        if path.startswith("/api/webhooks"):
-            # webhooks - limits مرنة أكثر
-            pass
-        elif path.startswith("/api/builds"):
-            # builds - limits متوسطة
-            pass
-        elif path.startswith("/api/health"):
-            # health checks - no limits
-            pass
+
+    def get_route_group(self, path: str) -> Tuple[str, Optional[int]]:
+        """تحديد مجموعة المسار ومضاعف الحد"""
+        for prefix, group, multiplier in ROUTE_GROUPS:
+            if path.startswith(prefix):
+                return group, multiplier
+        return DEFAULT_GROUP
+
+    def get_client_ip(self, scope) -> str:
+        """الحصول على IP الحقيقي للعميل (X-Forwarded-For فقط من trusted_proxies)"""
+        return resolve_client_ip(scope, self.trusted_proxies)
+
+    async def apply_limits(self, client_ip: str, group: str, multiplier: int) -> Tuple[bool, int]:
+        """تطبيق limits، يعيد (مسموح، ثواني الانتظار)"""
+        now = time.time()
+        key = (group, client_ip)
+        lease = self._leases.get(key)
+
+        if lease is not None:
+            if lease.blocked_until > now:
+                return False, math.ceil(lease.blocked_until - now)
+            if lease.tokens > 0 and lease.expires_at > now:
+                lease.tokens -= 1
+                return True, 0
+            # الدفعة السابقة استُهلكت بالكامل قبل انتهائها: مضاعفة الحجم، وإلا إعادته إلى رمز واحد
+            lease.size = min(lease.size * 2, self.lease_max) if lease.tokens == 0 and lease.expires_at > now else 1
         else:
-            # باقي الـ endpoints
-            pass
+            lease = _Lease()
+
+        if now < self._redis_down_until:
+            return True, 0
+
+        try:
+            granted, retry_after = await self.acquire(group, client_ip, multiplier, lease.size, now)
+        except Exception as e:
+            # Redis غير متاح: السماح بالطلبات وتجنب المحاولة لبضع ثوان
+            print(f"⚠️ تعذر الوصول إلى Redis لتحديد المعدل: {e}")
+            self._redis_down_until = now + 5
+            return True, 0
+
+        self.store_lease(key, lease)
+        if granted < 1:
+            lease.tokens = 0
+            lease.blocked_until = now + retry_after
+            return False, retry_after
+
+        lease.tokens = granted - 1
+        lease.expires_at = now + self.lease_ttl
+        lease.blocked_until = 0.0
+        return True, 0
+
+    async def acquire(self, group: str, client_ip: str, multiplier: int, requested: int, now: float) -> Tuple[int, int]:
+        """حجز حتى requested رمز من Redis لجميع النوافذ ذرياً"""
+        if self.redis is None:
+            self.redis = get_async_redis()
+        if self._script is None:
+            self._script = self.redis.register_script(SLIDING_WINDOW_SCRIPT)
+
+        limits = {"hour": self.hourly_limit * multiplier, "day": self.daily_limit * multiplier}
+        keys: List[str] = []
+        args: List[float] = [requested, now]
+        for name, length in WINDOWS:
+            bucket = int(now // length)
+            prefix = f"ratelimit:{group}:{client_ip}:{name}"
+            keys.extend([f"{prefix}:{bucket}", f"{prefix}:{bucket - 1}"])
+            args.extend([limits[name], length])
+
+        granted, retry_after = await self._script(keys=keys, args=args)
+        return int(granted), max(1, int(retry_after))
+
+    def store_lease(self, key: Tuple[str, str], lease: _Lease):
+        """حفظ الدفعة في الذاكرة مع حد أقصى لعدد العملاء"""
+        if key not in self._leases and len(self._leases) >= self.max_cached_clients:
+            now = time.time()
+            self._leases = {
+                k: v for k, v in self._leases.items() if v.expires_at > now or v.blocked_until > now
+            }
+            if len(self._leases) >= self.max_cached_clients:
+                self._leases.clear()
+        self._leases[key] = lease
+
+    async def reject(self, scope, send, retry_after: int):
+        """إرسال استجابة 429"""
+        body = json.dumps({
+            "error": {
+                "code": 429,
+                "message": "تم تجاوز الحد المسموح من الطلبات",
+                "type": "RateLimitExceeded"
+            },
+            "retry_after": retry_after,
+            "path": scope["path"]
+        }).encode("utf-8")
+
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
 
 
 def setup_rate_limiting(app):
     """إعداد rate limiting للتطبيق"""
     if settings.env == "production":
-        # إضافة handlers
-        app.state.limiter = limiter
-        app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-        
-        # تطبيق limits على الـ endpoints
-        app.add_api_route(
-            "/api/webhooks/github",
-            github_webhook,
-            methods=["POST"],
-            dependencies=[
-                Depends(
-                    limiter.limit(f"{settings.rate_limit_requests_per_hour}/hour")
-                )
-            ]
-        )
+        app.add_middleware(RateLimitMiddleware)
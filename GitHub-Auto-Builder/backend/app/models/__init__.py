@@ -2,21 +2,107 @@
 نماذج قاعدة البيانات
 """
 from sqlalchemy import create_engine, MetaData
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from ..config import settings
 
+# تعريفات async المقابلة لتعريفات قاعدة البيانات المتزامنة
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(database_url: str) -> str:
+    """رابط قاعدة البيانات لمحرك async (asyncpg / aiosqlite)"""
+    url = make_url(database_url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername)).render_as_string(hide_password=False)
+
+
+def engine_options(database_url: str) -> dict:
+    """إعدادات الـ pool ومهلة الاستعلام من Settings حسب نوع قاعدة البيانات"""
+    url = make_url(database_url)
+    options = {
+        "pool_pre_ping": True,
+        "pool_recycle": settings.database_pool_recycle_seconds,
+        "echo": settings.database_echo
+    }
+    
+    # SQLite (التطوير والاختبار) يستخدم pool افتراضياً بدون حجم قابل للتعديل
+    if url.get_backend_name() == "sqlite":
+        return options
+    
+    options.update(
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_timeout=settings.database_pool_timeout_seconds
+    )
+    
+    # مهلة الاستعلام على مستوى الخادم (PostgreSQL) حتى لا يحجز استعلام عالق اتصالاً من الـ pool
+    if settings.database_statement_timeout_ms and url.get_backend_name() == "postgresql":
+        timeout = str(settings.database_statement_timeout_ms)
+        if url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    
+    return options
+
+
 # إنشاء engine قاعدة البيانات
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=settings.debug
-)
-
-# إنشاء SessionLocal
+engine = create_engine(settings.database_url, **engine_options(settings.database_url))
+
+# إنشاء SessionLocal (لمهام Celery والكود المتزامن)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# engine غير متزامن لـ FastAPI routers، حتى لا يحجب استعلام بطيء event loop
+async_database_url = get_async_database_url(settings.database_url)
+async_engine = create_async_engine(async_database_url, **engine_options(async_database_url))
+
+# expire_on_commit=False: الوصول إلى الحقول بعد commit لا يحتاج استعلاماً (غير مسموح في async)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# نسخة القراءة (read replica) للـ endpoints التي لا تكتب، وإلا نفس قاعدة البيانات الرئيسية
+if settings.database_read_url:
+    async_read_database_url = get_async_database_url(settings.database_read_url)
+    async_read_engine = create_async_engine(async_read_database_url, **engine_options(async_read_database_url))
+else:
+    async_read_engine = async_engine
+
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+
+def get_pool_stats() -> dict:
+    """استخدام pools الاتصالات (للمراقبة وضبط database_pool_size)"""
+    engines = {"sync": engine, "async": async_engine}
+    if async_read_engine is not async_engine:
+        engines["async_read"] = async_read_engine
+    
+    stats = {}
+    for name, target in engines.items():
+        pool = target.pool
+        info = {"class": type(pool).__name__, "status": pool.status()}
+        # QueuePool فقط يوفر الأعداد (SQLite/NullPool لا)
+        for metric in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, metric, None)
+            if callable(method):
+                info[metric] = method()
+        if "size" in info:
+            info["max_connections"] = info["size"] + settings.database_max_overflow
+        stats[name] = info
+    return stats
+
+
+async def dispose_async_engines():
+    """إغلاق اتصالات الـ engines غير المتزامنة عند إيقاف التطبيق"""
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+
+
 # إنشاء Base للنماذج
 Base = declarative_base()
 
@@ -31,3 +117,18 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """الحصول على session قاعدة البيانات غير المتزامنة (لـ FastAPI routers)"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """session للقراءة فقط على نسخة القراءة (database_read_url) إن وجدت
+
+    النسخة قد تتأخر قليلاً عن الرئيسية، فتُستخدم فقط للقوائم والإحصائيات.
+    """
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -1,8 +1,9 @@
 """
 نموذج سجل المراجعة لتتبع جميع العمليات
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, JSON, ForeignKey, Index
 from sqlalchemy.sql import func
+from datetime import datetime
 from . import Base
 
 
@@ -10,6 +11,12 @@ class AuditLog(Base):
     """نموذج سجل المراجعة"""
     
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # أحداث webhook وغيرها حسب نوع العملية مرتبة حسب الوقت
+        Index("ix_audit_logs_action_timestamp", "action", "timestamp"),
+    )
+    # على PostgreSQL الجدول مقسّم حسب timestamp (migration 0003، المفتاح الأساسي (id, timestamp))
+    # وتُدار الـ partitions في app/audit_partitions.py
     
     # أنواع العمليات
     ACTION_CHOICES = [
@@ -58,7 +65,7 @@ class AuditLog(Base):
     metadata = Column(JSON)
     
     # الطوابع الزمنية
-    timestamp = Column(DateTime, server_default=func.now(), index=True)
+    timestamp = Column(DateTime, nullable=False, server_default=func.now(), index=True)
     
     def __repr__(self):
         return f"<AuditLog(id={self.id}, action='{self.action}', actor='{self.actor_name}')>"
@@ -118,6 +125,41 @@ class AuditLog(Base):
         if metadata:
             self.metadata = metadata
     
+    @classmethod
+    def build_row(
+        cls,
+        actor_type: str,
+        action: str,
+        description: str = "",
+        actor_name: str = None,
+        resource_type: str = None,
+        resource_name: str = None,
+        details: dict = None,
+        success: bool = True,
+        error_message: str = None,
+        ip_address: str = None,
+        user_agent: str = None,
+        timestamp: datetime = None,
+        resource_id: int = None
+    ) -> dict:
+        """إنشاء صف جاهز للإدراج المجمّع، جميع الصفوف لها نفس المفاتيح"""
+        import json
+        return {
+            "actor_type": actor_type,
+            "actor_name": actor_name,
+            "action": action,
+            "description": description,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "resource_name": resource_name,
+            "details_json": json.dumps(details) if details else None,
+            "success": success,
+            "error_message": error_message,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "timestamp": timestamp or datetime.utcnow(),
+        }
+    
     @classmethod
     def log_user_action(
         cls,
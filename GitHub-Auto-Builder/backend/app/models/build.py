@@ -1,8 +1,8 @@
 """
 نموذج عمليات البناء
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, JSON, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Text, JSON, ForeignKey, Index, inspect
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from . import Base
 
@@ -11,6 +11,15 @@ class Build(Base):
     """نموذج عمليات البناء"""
     
     __tablename__ = "builds"
+    __table_args__ = (
+        # قوائم البناء لكل مستودع مرتبة حسب التاريخ (keyset pagination)
+        Index("ix_builds_repository_id_created_at", "repository_id", "created_at"),
+        Index("ix_builds_created_at_id", "created_at", "id"),
+        Index("ix_builds_status_created_at", "status", "created_at"),
+        Index("ix_builds_integration_id_created_at", "integration_id", "created_at"),
+        # إلغاء عمليات البناء المعلقة على نفس الفرع عند push جديد
+        Index("ix_builds_repository_id_branch_status", "repository_id", "branch", "status"),
+    )
     
     # حالات البناء
     STATUS_CHOICES = [
@@ -42,9 +51,13 @@ class Build(Base):
     duration_seconds = Column(Integer)
     
     # اللوجات والنتائج
+    # اللوج الكامل مخزن كأجزاء مضغوطة في build_log_chunks (انظر app/log_store.py)
     logs_url = Column(Text)
-    logs_content = Column(Text)
-    error_logs = Column(Text)
+    logs_content = deferred(Column(Text))  # قديم: لوجات ما قبل build_log_chunks
+    error_logs = Column(Text)  # آخر جزء من لوج الأخطاء
+    logs_head = Column(Text)  # بداية اللوج
+    logs_tail = Column(Text)  # نهاية اللوج
+    logs_size = Column(BigInteger, default=0)  # حجم اللوج بالبايت
     
     # النتائج والإحصائيات
     test_results = Column(JSON)  # نتائج الاختبارات
@@ -63,6 +76,7 @@ class Build(Base):
     repository = relationship("Repository", back_populates="builds")
     integration = relationship("Integration", back_populates="builds")
     fix_attempts = relationship("FixAttempt", back_populates="build")
+    log_chunks = relationship("BuildLogChunk", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<Build(id={self.id}, repo='{self.repository.full_name}', status='{self.status}')>"
@@ -106,11 +120,16 @@ class Build(Base):
     
     def get_logs_summary(self, max_length: int = 1000) -> str:
         """الحصول على ملخص اللوجات"""
-        if not self.logs_content:
+        # الملخص من بداية اللوج المحفوظة، بدون تحميل اللوج الكامل
+        # (logs_content القديم يُستخدم فقط إذا كان محملاً مسبقاً، لتجنب استعلام لكل صف)
+        logs = self.logs_head
+        if not logs and "logs_content" not in inspect(self).unloaded:
+            logs = self.logs_content
+        if not logs:
             return ""
         
         # إزالة الأسطر الطويلة جداً
-        lines = self.logs_content.split('\n')
+        lines = logs.split('\n')
         summary_lines = []
         current_length = 0
         
@@ -0,0 +1,41 @@
+"""
+نموذج أجزاء لوجات البناء المضغوطة
+"""
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, LargeBinary, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from . import Base
+
+
+class BuildLogChunk(Base):
+    """جزء مضغوط من لوج عملية بناء
+
+    اللوج يُخزّن كسلسلة أجزاء متتالية، كل جزء يغطي [offset, offset + length)
+    من البايتات غير المضغوطة.
+    """
+
+    __tablename__ = "build_log_chunks"
+    __table_args__ = (
+        UniqueConstraint("build_id", "stream", "offset", name="uq_build_log_chunks_offset"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    build_id = Column(Integer, ForeignKey("builds.id", ondelete="CASCADE"), nullable=False)
+    stream = Column(String(20), nullable=False, default="logs")  # logs, errors
+
+    # موضع الجزء في اللوج غير المضغوط
+    offset = Column(BigInteger, nullable=False)
+    length = Column(Integer, nullable=False)
+
+    # البيانات المضغوطة
+    codec = Column(String(10), nullable=False)  # zstd, zlib
+    data = Column(LargeBinary, nullable=False)
+
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<BuildLogChunk(build_id={self.build_id}, stream='{self.stream}', offset={self.offset}, length={self.length})>"
+
+    @property
+    def end(self) -> int:
+        """نهاية الجزء (غير شاملة)"""
+        return self.offset + self.length
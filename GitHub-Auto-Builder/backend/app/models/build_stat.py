@@ -0,0 +1,150 @@
+"""
+نموذج الإحصائيات اليومية المجمّعة لعمليات البناء
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, ForeignKey, UniqueConstraint, case, func, insert, or_, and_
+from sqlalchemy.orm import Session
+from . import Base
+from .build import Build
+
+
+class BuildDailyStat(Base):
+    """إحصائيات يومية لعمليات البناء لكل (يوم، مستودع، نوع التشغيل، الحالة)
+
+    يُحدَّث الجدول بمهمة Celery دورية، ويسمح بحساب الإحصائيات في O(عدد الأيام)
+    بدلاً من قراءة جميع عمليات البناء.
+    """
+
+    __tablename__ = "build_daily_stats"
+    __table_args__ = (
+        UniqueConstraint("day", "repository_id", "trigger_type", "status", name="uq_build_daily_stats_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)
+    repository_id = Column(Integer, ForeignKey("repositories.id", ondelete="CASCADE"), nullable=False)
+    trigger_type = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False)
+
+    # العدادات
+    build_count = Column(Integer, nullable=False, default=0)
+    duration_count = Column(Integer, nullable=False, default=0)  # عدد العمليات التي لها مدة
+    duration_sum = Column(BigInteger, nullable=False, default=0)
+
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<BuildDailyStat(day={self.day}, repo={self.repository_id}, status='{self.status}', count={self.build_count})>"
+
+    @classmethod
+    def last_rolled_day(cls, db: Session) -> Optional[date]:
+        """آخر يوم تم تجميعه"""
+        return db.query(BuildStatsRollup.last_rolled_day).filter(BuildStatsRollup.id == ROLLUP_ID).scalar()
+
+    @classmethod
+    def rollup(cls, db: Session, start_day: date, end_day: date) -> int:
+        """إعادة حساب الأيام من start_day إلى end_day (شاملة)، يعيد عدد الصفوف المكتوبة"""
+        start = datetime.combine(start_day, datetime.min.time())
+        end = datetime.combine(end_day + timedelta(days=1), datetime.min.time())
+
+        # دمج الصفوف ذات المفتاح نفسه (NULL و "unknown" يصبحان مفتاحاً واحداً)
+        stats: Dict[tuple, Dict[str, Any]] = {}
+        for row in aggregate_builds(db, [(start, end)], by_day=True):
+            key = (row["day"], row["repository_id"], row["trigger_type"], row["status"])
+            stat = stats.setdefault(key, {
+                "day": row["day"],
+                "repository_id": row["repository_id"],
+                "trigger_type": row["trigger_type"],
+                "status": row["status"],
+                "build_count": 0,
+                "duration_count": 0,
+                "duration_sum": 0,
+            })
+            stat["build_count"] += row["build_count"]
+            stat["duration_count"] += row["duration_count"]
+            stat["duration_sum"] += row["duration_sum"]
+
+        db.query(cls).filter(cls.day >= start_day, cls.day <= end_day).delete(synchronize_session=False)
+        if stats:
+            db.execute(insert(cls.__table__), list(stats.values()))
+
+        # العلامة تتقدم حتى لو لم تُكتب صفوف (أيام بلا عمليات بناء)
+        state = db.get(BuildStatsRollup, ROLLUP_ID)
+        if state is None:
+            db.add(BuildStatsRollup(id=ROLLUP_ID, last_rolled_day=end_day))
+        elif state.last_rolled_day < end_day:
+            state.last_rolled_day = end_day
+        return len(stats)
+
+
+# الجدول يحتوي صفاً واحداً
+ROLLUP_ID = 1
+
+
+class BuildStatsRollup(Base):
+    """آخر يوم تم تجميعه في build_daily_stats
+
+    منفصل عن max(day) لأن الأيام بلا عمليات بناء لا تكتب صفوفاً، فلا تتقدم العلامة
+    بعد فترة هادئة ويكبر النطاق المحسوب مباشرة من builds في كل طلب إحصائيات.
+    """
+
+    __tablename__ = "build_stats_rollups"
+
+    id = Column(Integer, primary_key=True)
+    last_rolled_day = Column(Date, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<BuildStatsRollup(last_rolled_day={self.last_rolled_day})>"
+
+
+def aggregate_builds(
+    db: Session,
+    ranges: List[tuple],
+    repository_id: Optional[int] = None,
+    by_day: bool = False
+) -> List[Dict[str, Any]]:
+    """تجميع عمليات البناء في استعلام GROUP BY واحد
+
+    Args:
+        ranges: فترات [start, end) على created_at
+        repository_id: تقييد النتائج بمستودع واحد
+        by_day: التجميع حسب اليوم والمستودع أيضاً (للجدول اليومي)
+    """
+    if not ranges:
+        return []
+
+    # مثل المنطق السابق: المدة 0 أو NULL لا تدخل في المتوسط
+    has_duration = Build.duration_seconds > 0
+    columns = [
+        Build.status.label("status"),
+        Build.trigger_type.label("trigger_type"),
+        func.count(Build.id).label("build_count"),
+        func.count(case((has_duration, 1))).label("duration_count"),
+        func.sum(case((has_duration, Build.duration_seconds))).label("duration_sum"),
+    ]
+    group_by = [Build.status, Build.trigger_type]
+    if by_day:
+        day = func.date(Build.created_at)
+        columns = [day.label("day"), Build.repository_id.label("repository_id")] + columns
+        group_by = [day, Build.repository_id] + group_by
+
+    query = db.query(*columns).filter(
+        or_(*[and_(Build.created_at >= start, Build.created_at < end) for start, end in ranges])
+    )
+    if repository_id:
+        query = query.filter(Build.repository_id == repository_id)
+
+    rows = []
+    for row in query.group_by(*group_by).all():
+        row = dict(row._mapping)
+        if by_day and isinstance(row["day"], str):
+            # SQLite يعيد date() كنص
+            row["day"] = date.fromisoformat(row["day"])
+        row["status"] = row["status"] or "unknown"
+        row["trigger_type"] = row["trigger_type"] or "unknown"
+        row["duration_sum"] = int(row["duration_sum"] or 0)
+        rows.append(row)
+    return rows
@@ -1,17 +1,33 @@
 """
 إنشاء وإعداد قاعدة البيانات
 """
-from . import Base, engine
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from . import Base, engine, async_engine
 from .user import User
 from .repository import Repository
 from .integration import Integration
 from .build import Build
 from .fix_attempt import FixAttempt
 from .audit_log import AuditLog
+from .build_stat import BuildDailyStat, BuildStatsRollup
+from .build_log import BuildLogChunk
+from .failure_fingerprint import FailureFingerprint
+from .task_outbox import TaskOutbox
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+# أول migration: المخطط كما كان ينشئه create_tables قبل Alembic
+BASELINE_REVISION = "0001"
 
 
 def create_tables():
-    """إنشاء جميع الجداول في قاعدة البيانات"""
+    """إنشاء جميع الجداول في قاعدة البيانات (للاختبار - الإنتاج يستخدم run_migrations)"""
     Base.metadata.create_all(bind=engine)
 
 
@@ -26,6 +42,46 @@ def reset_database():
     create_tables()
 
 
+def get_alembic_config() -> Config:
+    """إعدادات Alembic (backend/alembic.ini)"""
+    return Config(str(ALEMBIC_INI))
+
+
+def run_migrations(bind=None, revision: str = "head"):
+    """تطبيق الـ migrations - خطوة نشر تُشغَّل مرة واحدة قبل تشغيل workers
+    
+    قاعدة بيانات أنشأها create_tables سابقاً (بدون جدول alembic_version) تُسجَّل
+    على BASELINE_REVISION أولاً، ثم تُطبق الـ migrations التالية فقط.
+    """
+    from sqlalchemy import inspect
+    config = get_alembic_config()
+    
+    with (bind if bind is not None else engine).connect() as conn:
+        tables = inspect(conn).get_table_names()
+        conn.commit()
+        
+        config.attributes["connection"] = conn
+        if "alembic_version" not in tables and "builds" in tables:
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, revision)
+
+
+def get_schema_revision(bind=None) -> dict:
+    """revision قاعدة البيانات مقابل آخر migration
+    
+    استعلام واحد على alembic_version (بدون reflection)، يُستخدم عند بدء تشغيل كل worker.
+    """
+    heads = set(ScriptDirectory.from_config(get_alembic_config()).get_heads())
+    with (bind if bind is not None else engine).connect() as conn:
+        current = set(MigrationContext.configure(conn).get_current_heads())
+    
+    return {
+        "current": sorted(current),
+        "head": sorted(heads),
+        "up_to_date": current == heads
+    }
+
+
 def check_tables_exist() -> bool:
     """التحقق من وجود الجداول"""
     try:
@@ -41,11 +97,11 @@ def check_tables_exist() -> bool:
         return False
 
 
-def get_table_info() -> dict:
-    """الحصول على معلومات الجداول"""
+def get_table_info(bind=None) -> dict:
+    """الحصول على معلومات الجداول (bind: اتصال قائم بدلاً من engine الافتراضي)"""
     try:
         from sqlalchemy import inspect, text
-        inspector = inspect(engine)
+        inspector = inspect(bind if bind is not None else engine)
         
         info = {
             "tables": {},
@@ -89,11 +145,25 @@ def get_table_info() -> dict:
         }
 
 
-# إنشاء الجداول عند استيراد الملف
+async def get_table_info_async() -> dict:
+    """معلومات الجداول عبر engine غير المتزامن (لـ FastAPI routers)"""
+    try:
+        async with async_engine.connect() as conn:
+            return await conn.run_sync(get_table_info)
+    except Exception as e:
+        return {
+            "connected": False,
+            "error": str(e),
+            "tables": {},
+            "total_tables": 0
+        }
+
+
+# تطبيق الـ migrations: python -m app.models.database (أو python run.py migrate)
 if __name__ == "__main__":
-    print("إنشاء جداول قاعدة البيانات...")
-    create_tables()
-    print("تم إنشاء الجداول بنجاح!")
+    print("تطبيق migrations قاعدة البيانات...")
+    run_migrations()
+    print(f"تم تحديث المخطط إلى {', '.join(get_schema_revision()['current'])}")
     
     # عرض معلومات الجداول
     info = get_table_info()
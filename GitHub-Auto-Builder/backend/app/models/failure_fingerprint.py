@@ -0,0 +1,112 @@
+"""
+نموذج بصمات الفشل - نتائج التحليل والإصلاحات الناجحة المعروفة لكل خطأ متكرر
+"""
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from . import Base
+
+
+class FailureFingerprint(Base):
+    """بصمة خطأ في مستودع معين
+
+    تُحدَّث مع كل تحليل فشل، وتحفظ اقتراح الإصلاح وآخر محاولة إصلاح ناجحة حتى
+    يُعاد استخدامها عند تكرار نفس الخطأ بدلاً من إعادة الحساب.
+    """
+
+    __tablename__ = "failure_fingerprints"
+    __table_args__ = (
+        UniqueConstraint("repository_id", "fingerprint", name="uq_failure_fingerprints_repo_fingerprint"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    repository_id = Column(Integer, ForeignKey("repositories.id", ondelete="CASCADE"), nullable=False)
+    fingerprint = Column(String(64), nullable=False, index=True)  # sha256
+
+    # مكونات البصمة
+    rule_name = Column(String(100), nullable=False)
+    token = Column(Text)  # النص المطابق بعد التطبيع
+    toolchain = Column(String(50))
+
+    # التحليل السابق
+    fix_type = Column(String(50))
+    fix_suggestion = Column(Text)
+    analysis_result = Column(JSON)
+
+    # الإحصائيات
+    occurrences = Column(Integer, nullable=False, default=0)
+    fixed_count = Column(Integer, nullable=False, default=0)  # عدد الإصلاحات الناجحة
+    last_build_id = Column(Integer, ForeignKey("builds.id", ondelete="SET NULL"))
+    last_fix_attempt_id = Column(Integer, ForeignKey("fix_attempts.id", ondelete="SET NULL"))
+
+    # تواريخ
+    first_seen_at = Column(DateTime, server_default=func.now())
+    last_seen_at = Column(DateTime, server_default=func.now())
+    last_fixed_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<FailureFingerprint(repo={self.repository_id}, rule='{self.rule_name}', occurrences={self.occurrences})>"
+
+    @property
+    def has_known_fix(self) -> bool:
+        """هل نجح إصلاح لهذا الخطأ سابقاً"""
+        return bool(self.fixed_count and self.last_fix_attempt_id)
+
+    @classmethod
+    def lookup(cls, db: Session, repository_id: int, fingerprints: List[str]) -> Dict[str, "FailureFingerprint"]:
+        """البصمات المعروفة في استعلام واحد
+
+        تُفضَّل بصمة نفس المستودع، وإلا أكثر بصمة نجح إصلاحها في المستودعات الأخرى.
+        """
+        if not fingerprints:
+            return {}
+
+        rows = db.query(cls).filter(cls.fingerprint.in_(set(fingerprints))).all()
+
+        known: Dict[str, FailureFingerprint] = {}
+        for row in rows:
+            current = known.get(row.fingerprint)
+            if current is None or _rank(row, repository_id) > _rank(current, repository_id):
+                known[row.fingerprint] = row
+        return known
+
+    @classmethod
+    def upsert_occurrence(cls, db: Session, values: Dict, build_id: int):
+        """إنشاء البصمة أو زيادة عدادها في استعلام واحد
+
+        INSERT ... ON CONFLICT DO UPDATE على القيد الفريد (repository_id, fingerprint)،
+        فلا يفشل تحليلان متزامنان لنفس الخطأ بتعارض المفتاح ولا يضيع أي ظهور.
+        """
+        now = datetime.utcnow()
+        insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}[db.get_bind().dialect.name]
+        table = cls.__table__
+        stmt = insert(table).values(
+            **values,
+            occurrences=1,
+            fixed_count=0,
+            last_build_id=build_id,
+            first_seen_at=now,
+            last_seen_at=now
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.repository_id, table.c.fingerprint],
+            set_={
+                "occurrences": table.c.occurrences + 1,
+                "last_build_id": build_id,
+                "last_seen_at": now
+            }
+        ))
+
+    def record_fix(self, fix_attempt_id: int):
+        """تسجيل إصلاح ناجح"""
+        self.fixed_count = (self.fixed_count or 0) + 1
+        self.last_fix_attempt_id = fix_attempt_id
+        self.last_fixed_at = datetime.utcnow()
+
+
+def _rank(row: FailureFingerprint, repository_id: int) -> tuple:
+    return (row.repository_id == repository_id, row.fixed_count or 0, row.occurrences or 0)
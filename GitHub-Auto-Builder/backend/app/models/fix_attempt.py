@@ -1,7 +1,7 @@
 """
 نموذج محاولات الإصلاح التلقائي
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from . import Base
@@ -11,6 +11,10 @@ class FixAttempt(Base):
     """نموذج محاولات الإصلاح التلقائي"""
     
     __tablename__ = "fix_attempts"
+    __table_args__ = (
+        # محاولات الإصلاح المعلقة لكل عملية بناء بترتيب المحاولة
+        Index("ix_fix_attempts_build_id_status", "build_id", "status", "attempt_number"),
+    )
     
     # أنواع الإصلاحات
     FIX_TYPE_CHOICES = [
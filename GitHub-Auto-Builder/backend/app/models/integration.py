@@ -1,7 +1,7 @@
 """
 نموذج التكامل مع منصات CI
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from . import Base
@@ -11,6 +11,10 @@ class Integration(Base):
     """نموذج التكامل مع منصات CI"""
     
     __tablename__ = "integrations"
+    __table_args__ = (
+        # التكامل النشط لكل مستودع
+        Index("ix_integrations_repository_id_is_active", "repository_id", "is_active"),
+    )
     
     # أنواع المنصات المدعومة
     PLATFORM_CHOICES = [
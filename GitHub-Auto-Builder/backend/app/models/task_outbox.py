@@ -0,0 +1,35 @@
+"""
+نموذج صندوق المهام الصادرة - مهام Celery لم يقبلها الـ broker في الوقت المحدد
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Index
+from sqlalchemy.sql import func
+from . import Base
+
+
+class TaskOutbox(Base):
+    """مهمة بانتظار إعادة الإرسال إلى الـ broker
+
+    تُحذف بعد قبول الـ broker لها. task_id ثابت بين المحاولات، فإذا وصل الإرسال
+    الأصلي متأخراً يبقى للمهمة نفس المعرّف.
+    """
+
+    __tablename__ = "task_outbox"
+    __table_args__ = (
+        Index("ix_task_outbox_next_attempt_at", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(String(64), nullable=False, unique=True)
+    task_name = Column(String(255), nullable=False)
+    args = Column(JSON)
+    kwargs = Column(JSON)
+
+    # المحاولات
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    next_attempt_at = Column(DateTime, nullable=False)
+
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<TaskOutbox(task='{self.task_name}', task_id='{self.task_id}', attempts={self.attempts})>"
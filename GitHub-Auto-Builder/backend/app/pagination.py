@@ -0,0 +1,104 @@
+"""
+ترقيم الصفحات بالمؤشر (keyset pagination) - مؤشرات مبهمة على (عمود الترتيب، id)
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Select, func, select, text, tuple_
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    """ترميز موضع آخر صف في مؤشر مبهم"""
+    if isinstance(sort_value, datetime):
+        sort_value = {"dt": sort_value.isoformat()}
+    payload = json.dumps([sort_value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    """فك ترميز المؤشر، يرفع 400 إذا كان غير صالح"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if isinstance(sort_value, dict):
+            sort_value = datetime.fromisoformat(sort_value["dt"])
+        return sort_value, int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="مؤشر الصفحة غير صالح")
+
+
+async def paginate(
+    db: AsyncSession,
+    stmt: Select,
+    sort_column,
+    id_column,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0
+) -> Tuple[List[Any], Optional[str]]:
+    """جلب صفحة مرتبة تنازلياً على (sort_column, id_column)
+
+    مع المؤشر يُستخدم شرط (sort, id) < (آخر قيمة) بدلاً من OFFSET، فتبقى تكلفة
+    الصفحات العميقة ثابتة ويستخدم الفهرس المركب. offset مدعوم فقط للتوافق مع العملاء القدامى.
+    إذا كان select على كيان واحد تُعاد الكيانات، وإلا الصفوف (كيان، أعمدة إضافية).
+
+    Returns:
+        (الصفوف، مؤشر الصفحة التالية أو None)
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+    elif offset:
+        stmt = stmt.offset(offset)
+
+    # جلب صف إضافي لمعرفة وجود صفحة تالية بدون استعلام count
+    result = await db.execute(stmt.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1))
+    rows = result.scalars().all() if len(stmt.column_descriptions) == 1 else result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        entity = last[0] if isinstance(last, Row) else last
+        next_cursor = encode_cursor(getattr(entity, sort_column.key), getattr(entity, id_column.key))
+    return rows, next_cursor
+
+
+async def count_total(db: AsyncSession, stmt: Select, table_name: str, filtered: bool) -> Tuple[int, bool]:
+    """العدد الإجمالي، يعيد (العدد، هل هو تقديري)
+
+    بدون فلاتر على PostgreSQL يُستخدم تقدير pg_class.reltuples بدلاً من COUNT(*) على كامل الجدول.
+    """
+    if not filtered and db.get_bind().dialect.name == "postgresql":
+        estimate = (await db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :name"),
+            {"name": table_name}
+        )).scalar()
+        if estimate is not None and estimate >= 0:
+            return int(estimate), True
+    count_stmt = select(func.count()).select_from(stmt.order_by(None).subquery())
+    return (await db.execute(count_stmt)).scalar(), False
+
+
+def pagination_info(
+    limit: int,
+    next_cursor: Optional[str],
+    offset: int = 0,
+    total: Optional[Tuple[int, bool]] = None
+) -> Dict[str, Any]:
+    """بيانات الترقيم في الاستجابة"""
+    info = {
+        "limit": limit,
+        "offset": offset,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None
+    }
+    if total is not None:
+        info["total"], info["total_is_estimate"] = total
+    return info
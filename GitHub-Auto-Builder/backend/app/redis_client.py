@@ -0,0 +1,49 @@
+"""
+عملاء Redis المشتركة - اتصال واحد (مع pool) لكل عملية بدلاً من اتصال جديد لكل طلب
+"""
+from typing import Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from .config import settings
+
+_sync_client: Optional[redis.Redis] = None
+_async_client: Optional[aioredis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """عميل Redis المتزامن (للمهام الخلفية والكود المتزامن)"""
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = redis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            socket_timeout=settings.redis_socket_timeout_seconds,
+            socket_connect_timeout=settings.redis_socket_timeout_seconds,
+        )
+    return _sync_client
+
+
+def get_async_redis() -> aioredis.Redis:
+    """عميل Redis غير المتزامن (للـ middleware والـ endpoints)"""
+    global _async_client
+    if _async_client is None:
+        _async_client = aioredis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            socket_timeout=settings.redis_socket_timeout_seconds,
+            socket_connect_timeout=settings.redis_socket_timeout_seconds,
+        )
+    return _async_client
+
+
+async def close_redis():
+    """إغلاق الاتصالات عند إيقاف التطبيق"""
+    global _sync_client, _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
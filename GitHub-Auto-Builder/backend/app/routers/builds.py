@@ -1,43 +1,66 @@
 """
 Builds Router - إدارة عمليات البناء
 """
+import hashlib
 from datetime import datetime
 from typing import Dict, Any, List, Optional
-from sqlalchemy.orm import Session
-from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from fastapi import APIRouter, HTTPException, Depends, Query, Header, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 
-from ..models import get_db, Build, Repository, Integration
+from ..models import get_async_db, get_async_read_db, Build, Repository, Integration
+from ..models.build_stat import BuildDailyStat, aggregate_builds
+from ..log_store import (
+    LOG_STREAMS, LOG_CHUNK_SIZE, LOG_HEAD_CHARS, MAX_LOG_RANGE,
+    LogOffsetError, append_log, get_log_size, is_range_written, read_log, write_log
+)
+from ..pagination import paginate, count_total, pagination_info
+from ..tasks.fix_handlers import analyze_build_failure
+from ..dispatch import task_dispatcher
+from ..events import (
+    FINAL_STATUSES, MAX_LOG_EVENT_BYTES, build_status_data, format_sse, publish_build_status_async,
+    publish_log_chunk_async, publish_log_written_async, log_event_id, parse_log_event_id, replay_log_events,
+    open_build_subscription, iter_build_events, close_build_subscription
+)
 from ..config import settings
 
 router = APIRouter()
 
+LOG_MEDIA_TYPE = "text/plain; charset=utf-8"
+
 
 @router.get("/")
 async def list_builds(
     repository_id: Optional[int] = Query(None, description="ID المستودع"),
     status: Optional[str] = Query(None, description="حالة البناء"),
     limit: int = Query(50, ge=1, le=100, description="عدد النتائج"),
-    offset: int = Query(0, ge=0, description="رقم البداية"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="مؤشر الصفحة التالية"),
+    offset: int = Query(0, ge=0, description="رقم البداية (قديم، استخدم cursor)"),
+    include_total: bool = Query(False, description="حساب العدد الإجمالي"),
+    db: AsyncSession = Depends(get_async_read_db)
 ) -> Dict[str, Any]:
     """قائمة عمليات البناء"""
     try:
-        query = db.query(Build)
+        query = select(Build)
         
         # تطبيق الفلاتر
         if repository_id:
-            query = query.filter(Build.repository_id == repository_id)
+            query = query.where(Build.repository_id == repository_id)
         
         if status:
-            query = query.filter(Build.status == status)
+            query = query.where(Build.status == status)
         
-        # الحصول على العدد الإجمالي
-        total = query.count()
+        # الحصول على العدد الإجمالي (اختياري)
+        total = await count_total(db, query, Build.__tablename__, bool(repository_id or status)) if include_total else None
         
-        # الحصول على النتائج
-        builds = query.order_by(
-            Build.created_at.desc()
-        ).offset(offset).limit(limit).all()
+        # الحصول على النتائج (تحميل المستودع في نفس الاستعلام لتجنب N+1)
+        builds, next_cursor = await paginate(
+            db,
+            query.options(joinedload(Build.repository).load_only(Repository.full_name)),
+            Build.created_at, Build.id, limit, cursor=cursor, offset=offset
+        )
         
         return {
             "builds": [
@@ -56,14 +79,11 @@ async def list_builds(
                 }
                 for build in builds
             ],
-            "pagination": {
-                "total": total,
-                "limit": limit,
-                "offset": offset,
-                "has_more": offset + limit < total
-            }
+            "pagination": pagination_info(limit, next_cursor, offset, total)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -71,15 +91,27 @@ async def list_builds(
 @router.get("/{build_id}")
 async def get_build(
     build_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """الحصول على تفاصيل عملية بناء"""
     try:
-        build = db.query(Build).filter(Build.id == build_id).first()
+        build = await db.scalar(
+            select(Build)
+            .where(Build.id == build_id)
+            .options(
+                joinedload(Build.repository),
+                joinedload(Build.integration),
+                selectinload(Build.fix_attempts)
+            )
+        )
         
         if not build:
             raise HTTPException(status_code=404, detail="عملية البناء غير موجودة")
         
+        if not build.logs_size:
+            # لوجات قديمة في عمود logs_content المؤجل
+            await db.refresh(build, ["logs_content"])
+        
         return {
             "id": build.id,
             "repository": {
@@ -107,7 +139,7 @@ async def get_build(
             },
             "results": {
                 "logs_url": build.logs_url,
-                "logs_content": build.logs_content,
+                "logs": get_logs_info(build),
                 "error_logs": build.error_logs,
                 "test_results": build.test_results,
                 "coverage_percentage": build.coverage_percentage,
@@ -134,15 +166,248 @@ async def get_build(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{build_id}/logs")
+async def get_build_logs(
+    build_id: int,
+    stream: str = Query("logs", description="نوع اللوج: logs أو errors"),
+    start: Optional[int] = Query(None, ge=0, description="بداية النطاق بالبايت"),
+    end: Optional[int] = Query(None, ge=0, description="نهاية النطاق بالبايت (غير شاملة)"),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """قراءة لوج عملية بناء كنص، مع دعم النطاقات (?start=&end= أو Range: bytes=a-b)"""
+    try:
+        if stream not in LOG_STREAMS:
+            raise HTTPException(status_code=400, detail=f"نوع لوج غير مدعوم: {stream}")
+        
+        build = await db.get(Build, build_id)
+        
+        if not build:
+            raise HTTPException(status_code=404, detail="عملية البناء غير موجودة")
+        
+        size = await db.run_sync(get_log_size, build, stream)
+        
+        # لوجات قديمة مخزنة في أعمدة Text
+        if size == 0:
+            if stream == "logs":
+                await db.refresh(build, ["logs_content"])
+            legacy = build.logs_content if stream == "logs" else build.error_logs
+            return PlainTextResponse(legacy or "")
+        
+        if range_header and start is None and end is None:
+            start, end = parse_range_header(range_header, size)
+        
+        partial = start is not None or end is not None
+        start = start or 0
+        end = min(end if end is not None else size, size, start + MAX_LOG_RANGE)
+        if start > size or (partial and start >= end):
+            return PlainTextResponse(
+                "",
+                status_code=416,
+                headers={"Content-Range": f"bytes */{size}"}
+            )
+        
+        # البايتات كما هي: حدود النطاق قد تقسم حرفاً متعدد البايتات، وفك الترميز
+        # هنا يغير طول الجسم عن Content-Range فيفسد تجميع العميل للأجزاء
+        data = await db.run_sync(read_log, build, start, end, stream)
+        headers = {"Accept-Ranges": "bytes", "X-Log-Size": str(size)}
+        
+        if partial or end < size:
+            headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+            return Response(data, status_code=206, media_type=LOG_MEDIA_TYPE, headers=headers)
+        
+        return Response(data, media_type=LOG_MEDIA_TYPE, headers=headers)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{build_id}/events")
+async def build_events(
+    build_id: int,
+    request: Request,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """بث مباشر لتغييرات حالة البناء وأسطر اللوج الجديدة (Server-Sent Events)
+
+    أول حدث هو الحالة الحالية، بعدها أحداث status و log حتى تنتهي عملية البناء.
+    عند إعادة الاتصال (Last-Event-ID) تُرسل أولاً أسطر اللوج التي فاتت العميل من مخزن اللوجات.
+    """
+    try:
+        pubsub = await open_build_subscription(build_id)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"البث المباشر غير متاح حالياً: {e}")
+    
+    try:
+        build = await db.get(Build, build_id)
+        
+        if not build:
+            raise HTTPException(status_code=404, detail="عملية البناء غير موجودة")
+        
+        snapshot = build_status_data(build)
+        
+        # الأسطر المكتوبة بعد آخر حدث استلمه العميل (بعد فتح الاشتراك حتى لا يضيع شيء)
+        replay = []
+        resume = parse_log_event_id(last_event_id)
+        if resume and resume[0] in LOG_STREAMS:
+            stream, start = resume
+            size = await db.run_sync(get_log_size, build, stream)
+            if start < size:
+                data = await db.run_sync(read_log, build, start, min(size, start + MAX_LOG_RANGE), stream)
+                replay = replay_log_events(start, data, size, stream)
+    except Exception:
+        await close_build_subscription(pubsub)
+        raise
+    finally:
+        # لا حاجة لاتصال قاعدة البيانات طوال مدة البث
+        await db.close()
+    
+    async def event_stream():
+        events = iter_build_events(pubsub)
+        # حجم كل لوج مرسل، لتجاهل الأحداث المباشرة المكررة مع ما أُعيد إرساله
+        sent: Dict[str, int] = {}
+        try:
+            yield format_sse("status", snapshot)
+            for data in replay:
+                sent[data["stream"]] = data["size"]
+                yield format_sse("log", data, log_event_id(data))
+            if snapshot["status"] in FINAL_STATUSES:
+                return
+            
+            async for message in events:
+                if await request.is_disconnected():
+                    break
+                if message is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                event = message.get("event", "message")
+                data = message.get("data", {})
+                if event == "log":
+                    if data["size"] <= sent.get(data.get("stream", "logs"), 0):
+                        continue
+                    sent[data.get("stream", "logs")] = data["size"]
+                yield format_sse(event, data, log_event_id(data) if event == "log" else None)
+                
+                if event == "status" and data.get("status") in FINAL_STATUSES:
+                    break
+        finally:
+            await events.aclose()
+            await close_build_subscription(pubsub)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.put("/{build_id}/logs/append")
+async def append_build_logs(
+    build_id: int,
+    request: Request,
+    offset: int = Query(..., ge=0, description="موضع الجزء في اللوج بالبايت"),
+    stream: str = Query("logs", description="نوع اللوج: logs أو errors"),
+    analyze: bool = Query(False, description="تحليل الأخطاء في الجزء المضاف"),
+    db: AsyncSession = Depends(get_async_db)
+) -> Dict[str, Any]:
+    """إضافة جزء إلى لوج عملية بناء (جسم الطلب نص خام)
+
+    يُقرأ الجسم (حتى build_log_append_max_bytes) ويُتحقق من حجمه قبل فتح أي معاملة،
+    ثم يُقفل صف البناء فقط أثناء الكتابة، فلا يُحجز اتصال من الـ pool طوال رفع منفذ CI البطيء.
+    إعادة إرسال جزء بنفس offset وطوله ومحتواه لا تغير شيئاً، وأي offset آخر غير نهاية
+    اللوج (أو محتوى مختلف عند موضع مكتوب) يعيد 409 مع الموضع المتوقع.
+    """
+    try:
+        if stream not in LOG_STREAMS:
+            raise HTTPException(status_code=400, detail=f"نوع لوج غير مدعوم: {stream}")
+        
+        chunks: List[bytes] = []
+        buffer = bytearray()
+        length = 0
+        digest = hashlib.sha256()
+        async for part in request.stream():
+            length += len(part)
+            if length > settings.build_log_append_max_bytes:
+                raise HTTPException(status_code=413, detail="حجم الجزء أكبر من المسموح")
+            digest.update(part)
+            buffer += part
+            while len(buffer) >= LOG_CHUNK_SIZE:
+                chunks.append(bytes(buffer[:LOG_CHUNK_SIZE]))
+                del buffer[:LOG_CHUNK_SIZE]
+        if buffer:
+            chunks.append(bytes(buffer))
+        
+        # قفل صف البناء لترتيب الإضافات المتزامنة على نفس اللوج
+        build = await db.scalar(select(Build).where(Build.id == build_id).with_for_update())
+        
+        if not build:
+            raise HTTPException(status_code=404, detail="عملية البناء غير موجودة")
+        
+        size = await db.run_sync(get_log_size, build, stream)
+        
+        if offset < size:
+            # إعادة إرسال: نفس الموضع والطول والمحتوى (sha256) لجزء مكتوب سابقاً
+            if not await db.run_sync(is_range_written, build, offset, length, stream, digest.hexdigest()):
+                raise offset_conflict(offset, size)
+            await db.rollback()
+            return {
+                "build_id": build_id,
+                "stream": stream,
+                "offset": offset,
+                "size": size,
+                "duplicate": True
+            }
+        
+        if offset > size:
+            raise offset_conflict(offset, size)
+        
+        position = offset
+        for chunk in chunks:
+            position = await db.run_sync(append_log, build, chunk, offset=position, stream=stream)
+        
+        build.updated_at = datetime.utcnow()
+        await db.commit()
+        
+        if position > offset:
+            await publish_log_chunk_async(
+                build_id, offset, chunks[0][:MAX_LOG_EVENT_BYTES], size=position, stream=stream
+            )
+        
+        # تحليل اللوج الجزئي بدون انتظار انتهاء البناء
+        if analyze and stream == "logs" and position > offset:
+            await task_dispatcher.dispatch(analyze_build_failure, build_id, start_offset=offset, partial=True)
+        
+        return {
+            "build_id": build_id,
+            "stream": stream,
+            "offset": offset,
+            "size": position,
+            "duplicate": False
+        }
+        
+    except HTTPException:
+        raise
+    except LogOffsetError as e:
+        await db.rollback()
+        raise offset_conflict(offset, e.expected_offset)
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/{build_id}/logs")
 async def update_build_logs(
     build_id: int,
     logs_data: Dict[str, Any],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """تحديث لوجات عملية بناء"""
     try:
-        build = db.query(Build).filter(Build.id == build_id).first()
+        build = await db.get(Build, build_id)
         
         if not build:
             raise HTTPException(status_code=404, detail="عملية البناء غير موجودة")
@@ -152,10 +417,10 @@ async def update_build_logs(
             build.logs_url = logs_data["logs_url"]
         
         if "logs_content" in logs_data:
-            build.logs_content = logs_data["logs_content"]
+            await db.run_sync(write_log, build, logs_data["logs_content"] or "")
         
         if "error_logs" in logs_data:
-            build.error_logs = logs_data["error_logs"]
+            await db.run_sync(write_log, build, logs_data["error_logs"] or "", stream="errors")
         
         # تحديث الحالة
         if "status" in logs_data:
@@ -168,7 +433,14 @@ async def update_build_logs(
         
         build.updated_at = datetime.utcnow()
         
-        db.commit()
+        await db.commit()
+        
+        # أسطر اللوج قبل الحالة (مشتركو البث ينهون عند الحالة النهائية)
+        if logs_data.get("logs_content"):
+            await publish_log_written_async(build_id, 0, logs_data["logs_content"])
+        
+        if "status" in logs_data or "logs_content" in logs_data:
+            await publish_build_status_async(build)
         
         return {
             "message": "تم تحديث اللوجات بنجاح",
@@ -179,18 +451,18 @@ async def update_build_logs(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/{build_id}/retry")
 async def retry_build(
     build_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """إعادة تشغيل عملية بناء"""
     try:
-        build = db.query(Build).filter(Build.id == build_id).first()
+        build = await db.get(Build, build_id)
         
         if not build:
             raise HTTPException(status_code=404, detail="عملية البناء غير موجودة")
@@ -206,7 +478,7 @@ async def retry_build(
         )
         
         db.add(new_build)
-        db.commit()
+        await db.commit()
         
         # هنا يمكن إضافة مهمة لتشغيل البناء
         # await trigger_build.delay(new_build.id)
@@ -221,7 +493,7 @@ async def retry_build(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -229,53 +501,79 @@ async def retry_build(
 async def build_statistics(
     repository_id: Optional[int] = Query(None, description="ID المستودع"),
     days: int = Query(7, ge=1, le=30, description="عدد الأيام"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ) -> Dict[str, Any]:
     """إحصائيات البناء"""
     try:
         from datetime import timedelta
-        from sqlalchemy import func, case
         
         # تحديد نطاق التاريخ
-        start_date = datetime.utcnow() - timedelta(days=days)
-        
-        query = db.query(Build).filter(
-            Build.created_at >= start_date
-        )
-        
-        if repository_id:
-            query = query.filter(Build.repository_id == repository_id)
+        now = datetime.utcnow()
+        start_date = now - timedelta(days=days)
+        
+        # الأيام الكاملة المجمّعة تُقرأ من build_daily_stats، والباقي (بداية اليوم الأول
+        # الجزئية وما بعد آخر تجميع) يُحسب مباشرة من builds باستعلام GROUP BY واحد
+        first_full_day = start_date.date() + timedelta(days=1)
+        last_rolled_day = await db.run_sync(BuildDailyStat.last_rolled_day)
+        
+        rows = []
+        live_ranges = []
+        if last_rolled_day and last_rolled_day >= first_full_day:
+            rollup_query = select(
+                BuildDailyStat.status,
+                BuildDailyStat.trigger_type,
+                func.sum(BuildDailyStat.build_count).label("build_count"),
+                func.sum(BuildDailyStat.duration_count).label("duration_count"),
+                func.sum(BuildDailyStat.duration_sum).label("duration_sum")
+            ).where(
+                BuildDailyStat.day >= first_full_day,
+                BuildDailyStat.day <= last_rolled_day
+            )
+            if repository_id:
+                rollup_query = rollup_query.where(BuildDailyStat.repository_id == repository_id)
+            rows.extend(
+                dict(row._mapping)
+                for row in await db.execute(
+                    rollup_query.group_by(BuildDailyStat.status, BuildDailyStat.trigger_type)
+                )
+            )
+            
+            live_ranges.append((start_date, datetime.combine(first_full_day, datetime.min.time())))
+            live_ranges.append((datetime.combine(last_rolled_day + timedelta(days=1), datetime.min.time()), now))
+        else:
+            live_ranges.append((start_date, now))
         
-        builds = query.all()
+        rows.extend(await db.run_sync(aggregate_builds, live_ranges, repository_id=repository_id))
         
         # حساب الإحصائيات
-        total_builds = len(builds)
-        successful_builds = len([b for b in builds if b.status == "success"])
-        failed_builds = len([b for b in builds if b.status == "failed"])
-        running_builds = len([b for b in builds if b.status == "running"])
-        pending_builds = len([b for b in builds if b.status == "pending"])
+        status_counts = {}
+        trigger_types = {}
+        duration_sum = 0
+        duration_count = 0
+        for row in rows:
+            count = int(row["build_count"] or 0)
+            status_counts[row["status"]] = status_counts.get(row["status"], 0) + count
+            trigger_types[row["trigger_type"]] = trigger_types.get(row["trigger_type"], 0) + count
+            duration_sum += int(row["duration_sum"] or 0)
+            duration_count += int(row["duration_count"] or 0)
+        
+        total_builds = sum(status_counts.values())
+        successful_builds = status_counts.get("success", 0)
+        failed_builds = status_counts.get("failed", 0)
+        running_builds = status_counts.get("running", 0)
+        pending_builds = status_counts.get("pending", 0)
         
         # حساب معدل النجاح
         success_rate = (successful_builds / total_builds * 100) if total_builds > 0 else 0
         
         # حساب متوسط المدة
-        completed_builds = [b for b in builds if b.duration_seconds]
-        avg_duration = (
-            sum(b.duration_seconds for b in completed_builds) / len(completed_builds)
-            if completed_builds else 0
-        )
-        
-        # إحصائيات حسب النوع
-        trigger_types = {}
-        for build in builds:
-            trigger_type = build.trigger_type or "unknown"
-            trigger_types[trigger_type] = trigger_types.get(trigger_type, 0) + 1
+        avg_duration = duration_sum / duration_count if duration_count else 0
         
         return {
             "period": {
                 "days": days,
                 "start_date": start_date.isoformat() + "Z",
-                "end_date": datetime.utcnow().isoformat() + "Z"
+                "end_date": now.isoformat() + "Z"
             },
             "totals": {
                 "total_builds": total_builds,
@@ -290,9 +588,9 @@ async def build_statistics(
             },
             "timing": {
                 "average_duration_seconds": round(avg_duration, 2),
-                "average_duration_formatted": format_duration(avg_duration)
+                "average_duration_formatted": format_duration(int(avg_duration))
             },
-            "triggers": trigger_types,
+            "triggers": {trigger: count for trigger, count in trigger_types.items() if count},
             "repository_id": repository_id
         }
         
@@ -300,6 +598,51 @@ async def build_statistics(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def get_logs_info(build: Build) -> Dict[str, Any]:
+    """ملخص اللوج (بداية/نهاية/حجم) مع رابط قراءة اللوج الكامل"""
+    if not build.logs_size and build.logs_content:
+        # لوجات قديمة قبل build_log_chunks
+        return {
+            "size": len(build.logs_content.encode("utf-8")),
+            "head": build.logs_content[:LOG_HEAD_CHARS],
+            "tail": None,
+            "url": f"/api/builds/{build.id}/logs"
+        }
+    
+    return {
+        "size": build.logs_size or 0,
+        "head": build.logs_head,
+        "tail": build.logs_tail,
+        "url": f"/api/builds/{build.id}/logs"
+    }
+
+
+def offset_conflict(offset: int, expected_offset: int) -> HTTPException:
+    """استجابة 409 عند إرسال جزء بموضع لا يطابق نهاية اللوج"""
+    return HTTPException(
+        status_code=409,
+        detail={
+            "message": f"الموضع {offset} لا يطابق نهاية اللوج",
+            "expected_offset": expected_offset
+        },
+        headers={"X-Log-Offset": str(expected_offset)}
+    )
+
+
+def parse_range_header(range_header: str, size: int):
+    """تحليل ترويسة Range بصيغة bytes=a-b أو bytes=a- أو bytes=-n"""
+    try:
+        unit, _, spec = range_header.partition("=")
+        if unit.strip() != "bytes" or "," in spec:
+            raise ValueError(range_header)
+        first, _, last = spec.strip().partition("-")
+        if not first:
+            return max(0, size - int(last)), size
+        return int(first), (int(last) + 1 if last else None)
+    except ValueError:
+        raise HTTPException(status_code=416, detail="ترويسة Range غير صالحة")
+
+
 def format_duration(seconds: int) -> str:
     """تنسيق المدة بالثواني"""
     if not seconds:
@@ -3,112 +3,73 @@ GitHub Webhooks Router - معالجة إشعارات GitHub
 """
 import hmac
 import hashlib
-import json
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 
-from fastapi import APIRouter, HTTPException, Header, Request, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Header, Request, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..config import settings
-from ..models import get_db, AuditLog
-from ..tasks.github_handlers import process_github_event
-from ..models.repository import Repository
+from ..models import get_async_read_db, AuditLog
+from ..github.deliveries import is_duplicate_delivery, forget_delivery
+from ..github.inbox import append_delivery
+from ..pagination import paginate, count_total, pagination_info
 
 router = APIRouter()
 
+# إجراءات سجل المراجعة التي تمثل أحداث webhook
+WEBHOOK_ACTIONS = ("webhook_received", "webhook_error")
 
-@router.post("/github")
+
+@router.post("/github", status_code=202)
 async def github_webhook(
     request: Request,
     x_hub_signature_256: Optional[str] = Header(None),
     x_github_event: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
+    x_github_delivery: Optional[str] = Header(None)
 ) -> Dict[str, Any]:
     """
-    استقبال ومعالجة webhooks من GitHub
+    استقبال webhooks من GitHub
+    
+    يتحقق من التوقيع فقط ويحفظ الـ body كما وصل في صندوق الوارد (Redis stream)،
+    والتحليل وسجل المراجعة وتوجيه الحدث تتم في مهمة consume_webhook_inbox على دفعات.
+    لا يلمس قاعدة البيانات، فيبقى الرد ضمن مهلة GitHub (10 ثوانٍ) حتى عند تعطلها.
     """
-    try:
-        # الحصول على body
-        body = await request.body()
-        
-        # التحقق من التوقيع
-        if not verify_github_signature(body, x_hub_signature_256):
-            raise HTTPException(
-                status_code=401,
-                detail="توقيع GitHub غير صحيح"
-            )
-        
-        # تحليل payload
-        try:
-            payload = json.loads(body)
-        except json.JSONDecodeError:
-            raise HTTPException(
-                status_code=400,
-                detail="Payload غير صالح"
-            )
-        
-        # الحصول على معلومات GitHub
-        event_type = x_github_event or payload.get("action", "unknown")
-        repository = payload.get("repository", {})
-        sender = payload.get("sender", {})
-        
-        # تسجيل العملية
-        log_action(
-            db=db,
-            actor_type="github",
-            actor_name=sender.get("login", "unknown"),
-            action="webhook_received",
-            resource_type="repository",
-            resource_name=repository.get("full_name"),
-            details={
-                "event_type": event_type,
-                "repository": repository,
-                "sender": sender,
-                "payload_keys": list(payload.keys())
-            }
+    body = await request.body()
+    
+    # التحقق من التوقيع
+    if not verify_github_signature(body, x_hub_signature_256):
+        raise HTTPException(
+            status_code=401,
+            detail="توقيع GitHub غير صحيح"
         )
-        
-        # تحديد نوع العملية
-        if event_type == "push":
-            await handle_push_event(payload, db)
-        elif event_type == "pull_request":
-            await handle_pull_request_event(payload, db)
-        elif event_type == "issues":
-            await handle_issues_event(payload, db)
-        else:
-            # إشعار عام
-            await process_github_event.delay({
-                "event_type": event_type,
-                "payload": payload,
-                "repository": repository,
-                "sender": sender
-            })
-        
+    
+    # GitHub يعيد إرسال التسليم بنفس X-GitHub-Delivery
+    if await is_duplicate_delivery(x_github_delivery):
         return {
-            "status": "received",
-            "event_type": event_type,
-            "repository": repository.get("full_name"),
+            "status": "duplicate",
+            "delivery_id": x_github_delivery,
             "timestamp": datetime.utcnow().isoformat() + "Z"
         }
-        
-    except HTTPException:
-        raise
+    
+    try:
+        inbox_id = await append_delivery(x_github_event, x_github_delivery, body)
     except Exception as e:
-        # تسجيل الخطأ
-        log_action(
-            db=db,
-            actor_type="system",
-            action="webhook_error",
-            description=f"خطأ في معالجة webhook: {str(e)}",
-            success=False,
-            error_message=str(e)
-        )
-        
+        print(f"خطأ في حفظ webhook في صندوق الوارد: {e}")
+        await forget_delivery(x_github_delivery)
         raise HTTPException(
-            status_code=500,
-            detail=f"خطأ في معالجة webhook: {str(e)}"
+            status_code=503,
+            detail="تعذر حفظ webhook، أعد إرساله لاحقاً"
         )
+    
+    return {
+        "status": "accepted",
+        "event_type": x_github_event,
+        "delivery_id": x_github_delivery,
+        "inbox_id": inbox_id,
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
 
 
 def verify_github_signature(body: bytes, signature: str) -> bool:
@@ -130,172 +91,34 @@ def verify_github_signature(body: bytes, signature: str) -> bool:
     return hmac.compare_digest(signature, expected_signature)
 
 
-async def handle_push_event(payload: Dict[str, Any], db: Session) -> None:
-    """معالجة حدث push"""
-    repository = payload.get("repository", {})
-    ref = payload.get("ref", "")
-    commits = payload.get("commits", [])
-    
-    # البحث عن المستودع في قاعدة البيانات
-    repo = db.query(Repository).filter(
-        Repository.full_name == repository.get("full_name")
-    ).first()
-    
-    if repo:
-        # تسجيل العملية
-        log_action(
-            db=db,
-            actor_type="github",
-            actor_name=payload.get("pusher", {}).get("name", "unknown"),
-            action="push_received",
-            resource_type="repository",
-            resource_id=repo.id,
-            resource_name=repo.full_name,
-            details={
-                "ref": ref,
-                "commits_count": len(commits),
-                "after_commit": payload.get("after")
-            }
-        )
-        
-        # إضافة مهمة لتشغيل البناء
-        if repo.auto_fix_enabled:
-            await process_github_event.delay({
-                "event_type": "push",
-                "repository_id": repo.id,
-                "branch": ref.replace("refs/heads/", ""),
-                "commits": commits,
-                "action": "trigger_build"
-            })
-    else:
-        # مستودع غير مسجل
-        log_action(
-            db=db,
-            actor_type="system",
-            action="push_received_unregistered_repo",
-            resource_type="repository",
-            resource_name=repository.get("full_name"),
-            details={
-                "ref": ref,
-                "commits_count": len(commits)
-            },
-            success=False,
-            error_message="المستودع غير مسجل في النظام"
-        )
-
-
-async def handle_pull_request_event(payload: Dict[str, Any], db: Session) -> None:
-    """معالجة حدث pull request"""
-    action = payload.get("action", "opened")
-    pull_request = payload.get("pull_request", {})
-    repository = payload.get("repository", {})
-    
-    if action in ["opened", "synchronize", "reopened"]:
-        # البحث عن المستودع
-        repo = db.query(Repository).filter(
-            Repository.full_name == repository.get("full_name")
-        ).first()
-        
-        if repo and repo.auto_fix_enabled:
-            # تسجيل العملية
-            log_action(
-                db=db,
-                actor_type="github",
-                actor_name=payload.get("sender", {}).get("login", "unknown"),
-                action="pull_request_received",
-                resource_type="repository",
-                resource_id=repo.id,
-                resource_name=repo.full_name,
-                details={
-                    "action": action,
-                    "pr_number": pull_request.get("number"),
-                    "pr_title": pull_request.get("title"),
-                    "branch": pull_request.get("head", {}).get("ref")
-                }
-            )
-            
-            # إضافة مهمة لتشغيل البناء
-            await process_github_event.delay({
-                "event_type": "pull_request",
-                "repository_id": repo.id,
-                "pr_number": pull_request.get("number"),
-                "action": action,
-                "branch": pull_request.get("head", {}).get("ref"),
-                "base_branch": pull_request.get("base", {}).get("ref")
-            })
-
-
-async def handle_issues_event(payload: Dict[str, Any], db: Session) -> None:
-    """معالجة حدث issues"""
-    action = payload.get("action", "opened")
-    issue = payload.get("issue", {})
-    repository = payload.get("repository", {})
-    
-    # تسجيل العملية فقط للأخطاء
-    log_action(
-        db=db,
-        actor_type="github",
-        actor_name=payload.get("sender", {}).get("login", "unknown"),
-        action="issue_received",
-        resource_type="repository",
-        resource_name=repository.get("full_name"),
-        details={
-            "action": action,
-            "issue_number": issue.get("number"),
-            "issue_title": issue.get("title"),
-            "labels": [label.get("name") for label in issue.get("labels", [])]
-        }
-    )
-
-
-def log_action(
-    db: Session,
-    actor_type: str,
-    action: str,
-    description: str = "",
-    resource_type: str = None,
-    resource_id: int = None,
-    resource_name: str = None,
-    details: dict = None,
-    success: bool = True,
-    error_message: str = None
-) -> None:
-    """تسجيل عملية في سجل المراجعة"""
-    try:
-        log_entry = AuditLog()
-        log_entry.record_action(
-            actor_type=actor_type,
-            action=action,
-            description=description,
-            resource_type=resource_type,
-            resource_id=resource_id,
-            resource_name=resource_name,
-            details=details,
-            success=success,
-            error_message=error_message
-        )
-        
-        db.add(log_entry)
-        db.commit()
-        
-    except Exception as e:
-        print(f"خطأ في تسجيل العملية: {e}")
-        db.rollback()
-
-
 @router.get("/events")
 async def list_webhook_events(
-    limit: int = 50,
-    offset: int = 0,
-    db: Session = Depends(get_db)
+    limit: int = Query(50, ge=1, le=100, description="عدد النتائج"),
+    cursor: Optional[str] = Query(None, description="مؤشر الصفحة التالية"),
+    offset: int = Query(0, ge=0, description="رقم البداية (قديم، استخدم cursor)"),
+    days: Optional[int] = Query(None, ge=1, description="الأحداث خلال آخر N يوماً"),
+    include_total: bool = Query(False, description="حساب العدد الإجمالي"),
+    db: AsyncSession = Depends(get_async_read_db)
 ) -> Dict[str, Any]:
     """قائمة أحداث Webhook الأخيرة"""
     try:
-        logs = db.query(AuditLog).filter(
-            AuditLog.action.like("%webhook%")
-        ).order_by(
-            AuditLog.timestamp.desc()
-        ).offset(offset).limit(limit).all()
+        # لا توجد سجلات أقدم من log_retention_days
+        days = min(days or settings.webhook_events_window_days, settings.log_retention_days)
+        since = datetime.utcnow() - timedelta(days=days)
+        
+        # IN على قائمة ثابتة يستخدم الفهرس (action, timestamp) بخلاف LIKE '%webhook%'،
+        # وحد timestamp الأدنى يقصر البحث على الـ partitions الحديثة
+        query = select(AuditLog).where(
+            AuditLog.action.in_(WEBHOOK_ACTIONS),
+            AuditLog.timestamp >= since
+        )
+        
+        # الحصول على العدد الإجمالي (اختياري)
+        total = await count_total(db, query, AuditLog.__tablename__, True) if include_total else None
+        
+        logs, next_cursor = await paginate(
+            db, query, AuditLog.timestamp, AuditLog.id, limit, cursor=cursor, offset=offset
+        )
         
         return {
             "events": [
@@ -310,10 +133,13 @@ async def list_webhook_events(
                 }
                 for log in logs
             ],
-            "total": len(logs),
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "days": days,
+            "pagination": pagination_info(limit, next_cursor, offset, total)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
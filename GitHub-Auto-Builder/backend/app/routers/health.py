@@ -1,72 +1,87 @@
 """
 مدقق الصحة العام للنظام
 """
+import time
 from datetime import datetime
 from typing import Dict, Any
 from fastapi import APIRouter, HTTPException
-from sqlalchemy import text
 
 from ..config import settings
-from ..models import SessionLocal, get_table_info
+from ..health_monitor import health_monitor
+from ..models.database import get_table_info_async
+from ..analysis.rules import rule_catalog, get_rule_metrics
+from ..github.inbox import get_inbox_stats
 
 router = APIRouter()
 
+# نتيجة reflection المخطط لـ /details
+_schema_cache: Dict[str, Any] = {"info": None, "cached_at": None, "expires_at": 0.0}
+
 
 @router.get("/")
 async def health_check() -> Dict[str, Any]:
-    """فحص صحة النظام العام"""
-    try:
-        # فحص قاعدة البيانات
-        db_status = await check_database_health()
-        
-        # فحص Redis
-        redis_status = await check_redis_health()
-        
-        # حالة عامة
-        overall_status = "healthy"
-        if not db_status["healthy"] or not redis_status["healthy"]:
-            overall_status = "degraded"
-        
-        return {
-            "status": overall_status,
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "version": "0.1.0",
-            "environment": settings.env,
-            "components": {
-                "database": db_status,
-                "redis": redis_status,
-                "api": {
-                    "status": "healthy",
-                    "uptime": "running"
-                }
-            }
-        }
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=503,
-            detail={
-                "status": "unhealthy",
-                "error": str(e),
-                "timestamp": datetime.utcnow().isoformat() + "Z"
-            }
-        )
+    """فحص صحة النظام العام
+    
+    يعيد آخر نتيجة من health_monitor (تُحدَّث في الخلفية) بدون أي اتصال بقاعدة
+    البيانات أو Redis، فيبقى زمنه ثابتاً مهما تكرر الطلب.
+    """
+    status = health_monitor.get_status()
+    status["components"]["api"] = {
+        "status": "healthy",
+        "uptime": "running"
+    }
+    
+    return {
+        "status": status["status"],
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "version": "0.1.0",
+        "environment": settings.env,
+        "components": status["components"],
+        "checked_at": status["checked_at"],
+        "age_seconds": status["age_seconds"],
+        "stale": status["stale"]
+    }
 
 
 @router.get("/database")
 async def database_health() -> Dict[str, Any]:
-    """فحص صحة قاعدة البيانات"""
+    """فحص صحة قاعدة البيانات (آخر نتيجة محفوظة)"""
+    return health_monitor.get_component("database")
+
+
+@router.get("/redis")
+async def redis_health() -> Dict[str, Any]:
+    """فحص صحة Redis (آخر نتيجة محفوظة)"""
+    return health_monitor.get_component("redis")
+
+
+@router.get("/error-rules")
+async def error_rules_metrics() -> Dict[str, Any]:
+    """إصدار قواعد الأخطاء الحالي ومقاييس كل قاعدة (عدد التطابقات ووقت الفحص)"""
     try:
-        return await check_database_health()
+        scanner = rule_catalog.get_scanner()
+        metrics = await get_rule_metrics(scanner.version)
+        metrics["rules_count"] = len(scanner.rules)
+        metrics["timestamp"] = datetime.utcnow().isoformat() + "Z"
+        return metrics
     except Exception as e:
         raise HTTPException(status_code=503, detail=str(e))
 
 
-@router.get("/redis")
-async def redis_health() -> Dict[str, Any]:
-    """فحص صحة Redis"""
+@router.get("/webhook-inbox")
+async def webhook_inbox_health() -> Dict[str, Any]:
+    """حجم صندوق وارد الـ webhooks (التسليمات التي لم تُعالج بعد)
+
+    status يصبح degraded عندما يتجاوز الطول webhook_inbox_alert_length، للتنبيه قبل
+    أن يستهلك الـ stream ذاكرة Redis.
+    """
     try:
-        return await check_redis_health()
+        stats = await get_inbox_stats()
+        if stats["backlogged"]:
+            print(f"تحذير: صندوق وارد الـ webhooks متأخر ({stats['length']} رسالة)")
+        stats["status"] = "degraded" if stats["backlogged"] else "healthy"
+        stats["timestamp"] = datetime.utcnow().isoformat() + "Z"
+        return stats
     except Exception as e:
         raise HTTPException(status_code=503, detail=str(e))
 
@@ -76,7 +91,7 @@ async def detailed_health() -> Dict[str, Any]:
     """فحص تفصيلي للصحة"""
     try:
         # معلومات قاعدة البيانات
-        db_info = get_table_info()
+        db_info = await get_cached_table_info()
         
         # معلومات النظام
         import sys
@@ -102,77 +117,16 @@ async def detailed_health() -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def check_database_health() -> Dict[str, Any]:
-    """فحص صحة قاعدة البيانات"""
-    try:
-        db = SessionLocal()
-        
-        # اختبار بسيط للتأكد من الاتصال
-        result = db.execute(text("SELECT 1")).scalar()
-        
-        if result != 1:
-            raise Exception("Database query failed")
-        
-        # الحصول على معلومات الجداول
-        table_info = get_table_info()
-        
-        db.close()
-        
-        return {
-            "status": "healthy",
-            "healthy": True,
-            "connection": "active",
-            "tables": table_info.get("total_tables", 0),
-            "timestamp": datetime.utcnow().isoformat() + "Z"
-        }
-        
-    except Exception as e:
-        return {
-            "status": "unhealthy",
-            "healthy": False,
-            "connection": "failed",
-            "error": str(e),
-            "timestamp": datetime.utcnow().isoformat() + "Z"
-        }
-
-
-async def check_redis_health() -> Dict[str, Any]:
-    """فحص صحة Redis"""
-    try:
-        import redis
-        from urllib.parse import urlparse
-        
-        # تحليل URL
-        parsed = urlparse(settings.redis_url)
-        
-        # الاتصال بـ Redis
-        r = redis.Redis(
-            host=parsed.hostname or "localhost",
-            port=parsed.port or 6379,
-            password=parsed.password,
-            decode_responses=True
-        )
-        
-        # اختبار الاتصال
-        r.ping()
-        
-        # الحصول على معلومات
-        info = r.info()
-        
-        return {
-            "status": "healthy",
-            "healthy": True,
-            "connection": "active",
-            "version": info.get("redis_version", "unknown"),
-            "uptime_in_seconds": info.get("uptime_in_seconds", 0),
-            "timestamp": datetime.utcnow().isoformat() + "Z"
-        }
-        
-    except Exception as e:
-        return {
-            "status": "unhealthy",
-            "healthy": False,
-            "connection": "failed",
-            "error": str(e),
-            "timestamp": datetime.utcnow().isoformat() + "Z"
-        }
+async def get_cached_table_info() -> Dict[str, Any]:
+    """معلومات الجداول (reflection لكل الأعمدة والفهارس) مع cache لمدة health_schema_cache_seconds"""
+    now = time.monotonic()
+    if _schema_cache["info"] is None or now >= _schema_cache["expires_at"]:
+        info = await get_table_info_async()
+        if not info.get("connected"):
+            # لا تُحفظ نتيجة الفشل حتى يُعاد الفحص في الطلب التالي
+            return info
+        _schema_cache.update(info=info, cached_at=time.time(), expires_at=now + settings.health_schema_cache_seconds)
+    
+    info = dict(_schema_cache["info"])
+    info["cached_at"] = datetime.utcfromtimestamp(_schema_cache["cached_at"]).isoformat() + "Z"
+    return info
@@ -3,10 +3,14 @@ Integrations Router - إدارة التكاملات مع منصات CI
 """
 from datetime import datetime
 from typing import Dict, Any, List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from fastapi import APIRouter, HTTPException, Depends, Query
 
-from ..models import get_db, Integration, Repository
+from ..models import get_async_db, Integration, Repository
+from ..models.build import Build
+from ..pagination import paginate, count_total, pagination_info
 from ..config import settings
 
 router = APIRouter()
@@ -18,30 +22,35 @@ async def list_integrations(
     repository_id: Optional[int] = Query(None, description="ID المستودع"),
     is_active: Optional[bool] = Query(None, description="هل التكامل نشط"),
     limit: int = Query(50, ge=1, le=100, description="عدد النتائج"),
-    offset: int = Query(0, ge=0, description="رقم البداية"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="مؤشر الصفحة التالية"),
+    offset: int = Query(0, ge=0, description="رقم البداية (قديم، استخدم cursor)"),
+    include_total: bool = Query(False, description="حساب العدد الإجمالي"),
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """قائمة التكاملات"""
     try:
-        query = db.query(Integration)
+        query = select(Integration)
         
         # تطبيق الفلاتر
         if platform:
-            query = query.filter(Integration.platform == platform)
+            query = query.where(Integration.platform == platform)
         
         if repository_id:
-            query = query.filter(Integration.repository_id == repository_id)
+            query = query.where(Integration.repository_id == repository_id)
         
         if is_active is not None:
-            query = query.filter(Integration.is_active == is_active)
+            query = query.where(Integration.is_active == is_active)
         
-        # الحصول على العدد الإجمالي
-        total = query.count()
+        # الحصول على العدد الإجمالي (اختياري)
+        filtered = bool(platform or repository_id or is_active is not None)
+        total = await count_total(db, query, Integration.__tablename__, filtered) if include_total else None
         
-        # الحصول على النتائج
-        integrations = query.order_by(
-            Integration.updated_at.desc()
-        ).offset(offset).limit(limit).all()
+        # الحصول على النتائج (تحميل المستودع في نفس الاستعلام لتجنب N+1)
+        integrations, next_cursor = await paginate(
+            db,
+            query.options(joinedload(Integration.repository).load_only(Repository.id, Repository.full_name)),
+            Integration.created_at, Integration.id, limit, cursor=cursor, offset=offset
+        )
         
         return {
             "integrations": [
@@ -60,15 +69,12 @@ async def list_integrations(
                 }
                 for integration in integrations
             ],
-            "pagination": {
-                "total": total,
-                "limit": limit,
-                "offset": offset,
-                "has_more": offset + limit < total
-            },
+            "pagination": pagination_info(limit, next_cursor, offset, total),
             "supported_platforms": Integration.get_supported_platforms()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -76,7 +82,7 @@ async def list_integrations(
 @router.post("/")
 async def create_integration(
     integration_data: Dict[str, Any],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """إنشاء تكامل جديد"""
     try:
@@ -94,18 +100,18 @@ async def create_integration(
             )
         
         # التحقق من وجود المستودع
-        repository = db.query(Repository).filter(
-            Repository.id == integration_data["repository_id"]
-        ).first()
+        repository = await db.get(Repository, integration_data["repository_id"])
         
         if not repository:
             raise HTTPException(status_code=404, detail="المستودع غير موجود")
         
         # التحقق من عدم وجود تكامل مماثل
-        existing = db.query(Integration).filter(
-            Integration.repository_id == integration_data["repository_id"],
-            Integration.platform == integration_data["platform"]
-        ).first()
+        existing = await db.scalar(
+            select(Integration).where(
+                Integration.repository_id == integration_data["repository_id"],
+                Integration.platform == integration_data["platform"]
+            )
+        )
         
         if existing:
             raise HTTPException(
@@ -125,8 +131,8 @@ async def create_integration(
         )
         
         db.add(integration)
-        db.commit()
-        db.refresh(integration)
+        await db.commit()
+        await db.refresh(integration)
         
         return {
             "message": "تم إنشاء التكامل بنجاح",
@@ -142,7 +148,7 @@ async def create_integration(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -151,13 +157,15 @@ async def get_integration(
     integration_id: int,
     include_config: bool = Query(False, description="تضمين الإعدادات"),
     include_recent_builds: bool = Query(False, description="تضمين العمليات الأخيرة"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """الحصول على تفاصيل تكامل"""
     try:
-        integration = db.query(Integration).filter(
-            Integration.id == integration_id
-        ).first()
+        integration = await db.scalar(
+            select(Integration)
+            .where(Integration.id == integration_id)
+            .options(joinedload(Integration.repository))
+        )
         
         if not integration:
             raise HTTPException(status_code=404, detail="التكامل غير موجود")
@@ -194,13 +202,12 @@ async def get_integration(
         
         # إضافة العمليات الأخيرة
         if include_recent_builds:
-            recent_builds = (
-                db.query(Build)
-                .filter(Build.integration_id == integration_id)
+            recent_builds = (await db.execute(
+                select(Build)
+                .where(Build.integration_id == integration_id)
                 .order_by(Build.created_at.desc())
                 .limit(10)
-                .all()
-            )
+            )).scalars().all()
             
             result["recent_builds"] = [
                 {
@@ -227,13 +234,11 @@ async def get_integration(
 async def update_integration(
     integration_id: int,
     update_data: Dict[str, Any],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """تحديث إعدادات تكامل"""
     try:
-        integration = db.query(Integration).filter(
-            Integration.id == integration_id
-        ).first()
+        integration = await db.get(Integration, integration_id)
         
         if not integration:
             raise HTTPException(status_code=404, detail="التكامل غير موجود")
@@ -254,7 +259,7 @@ async def update_integration(
         # تحديث timestamp
         integration.updated_at = datetime.utcnow()
         
-        db.commit()
+        await db.commit()
         
         return {
             "message": "تم تحديث التكامل بنجاح",
@@ -266,30 +271,33 @@ async def update_integration(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.delete("/{integration_id}")
 async def delete_integration(
     integration_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """حذف تكامل"""
     try:
-        integration = db.query(Integration).filter(
-            Integration.id == integration_id
-        ).first()
+        integration = await db.scalar(
+            select(Integration)
+            .where(Integration.id == integration_id)
+            .options(joinedload(Integration.repository).load_only(Repository.full_name))
+        )
         
         if not integration:
             raise HTTPException(status_code=404, detail="التكامل غير موجود")
         
         # التحقق من عدم وجود عمليات بناء جارية
-        from ..models.build import Build
-        active_builds = db.query(Build).filter(
-            Build.integration_id == integration_id,
-            Build.status.in_(["pending", "running"])
-        ).count()
+        active_builds = await db.scalar(
+            select(func.count(Build.id)).where(
+                Build.integration_id == integration_id,
+                Build.status.in_(["pending", "running"])
+            )
+        )
         
         if active_builds > 0:
             raise HTTPException(
@@ -301,8 +309,8 @@ async def delete_integration(
         repo_name = integration.repository.full_name
         platform_name = integration.display_name
         
-        db.delete(integration)
-        db.commit()
+        await db.delete(integration)
+        await db.commit()
         
         return {
             "message": "تم حذف التكامل بنجاح",
@@ -315,7 +323,7 @@ async def delete_integration(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -323,13 +331,11 @@ async def delete_integration(
 async def test_integration(
     integration_id: int,
     test_data: Optional[Dict[str, Any]] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """اختبار تكامل"""
     try:
-        integration = db.query(Integration).filter(
-            Integration.id == integration_id
-        ).first()
+        integration = await db.get(Integration, integration_id)
         
         if not integration:
             raise HTTPException(status_code=404, detail="التكامل غير موجود")
@@ -356,7 +362,7 @@ async def test_integration(
         
         # تحديث آخر استخدام
         integration.last_used_at = datetime.utcnow()
-        db.commit()
+        await db.commit()
         
         return test_result
         
@@ -401,7 +407,7 @@ async def get_supported_platforms() -> Dict[str, Any]:
 @router.post("/codemagic/configure")
 async def configure_codemagic_integration(
     config_data: Dict[str, Any],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """إعداد تكامل Codemagic"""
     try:
@@ -432,7 +438,7 @@ async def configure_codemagic_integration(
 @router.post("/github-actions/configure")
 async def configure_github_actions_integration(
     config_data: Dict[str, Any],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """إعداد تكامل GitHub Actions"""
     try:
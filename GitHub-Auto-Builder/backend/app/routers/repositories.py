@@ -3,10 +3,13 @@ Repositories Router - إدارة المستودعات
 """
 from datetime import datetime
 from typing import Dict, Any, List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import APIRouter, HTTPException, Depends, Query
 
-from ..models import get_db, Repository, Integration
+from ..models import get_async_db, Repository, Integration
+from ..models.build import Build
+from ..pagination import paginate, count_total, pagination_info
 from ..config import settings
 
 router = APIRouter()
@@ -16,24 +19,37 @@ router = APIRouter()
 async def list_repositories(
     auto_fix_enabled: Optional[bool] = Query(None, description="هل الإصلاح التلقائي مفعل"),
     limit: int = Query(50, ge=1, le=100, description="عدد النتائج"),
-    offset: int = Query(0, ge=0, description="رقم البداية"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="مؤشر الصفحة التالية"),
+    offset: int = Query(0, ge=0, description="رقم البداية (قديم، استخدم cursor)"),
+    include_total: bool = Query(False, description="حساب العدد الإجمالي"),
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """قائمة المستودعات"""
     try:
-        query = db.query(Repository)
+        query = select(Repository)
         
         # تطبيق الفلاتر
         if auto_fix_enabled is not None:
-            query = query.filter(Repository.auto_fix_enabled == auto_fix_enabled)
-        
-        # الحصول على العدد الإجمالي
-        total = query.count()
+            query = query.where(Repository.auto_fix_enabled == auto_fix_enabled)
+        
+        # الحصول على العدد الإجمالي (اختياري)
+        total = await count_total(db, query, Repository.__tablename__, auto_fix_enabled is not None) if include_total else None
+        
+        # عدد التكاملات كاستعلام فرعي مرتبط بدلاً من تحميل repo.integrations لكل مستودع
+        integrations_count_query = (
+            select(func.count(Integration.id))
+            .where(Integration.repository_id == Repository.id)
+            .correlate(Repository)
+            .scalar_subquery()
+            .label("integrations_count")
+        )
         
         # الحصول على النتائج
-        repositories = query.order_by(
-            Repository.updated_at.desc()
-        ).offset(offset).limit(limit).all()
+        rows, next_cursor = await paginate(
+            db,
+            query.add_columns(integrations_count_query),
+            Repository.created_at, Repository.id, limit, cursor=cursor, offset=offset
+        )
         
         return {
             "repositories": [
@@ -50,21 +66,18 @@ async def list_repositories(
                     "auto_merge_enabled": repo.auto_merge_enabled,
                     "primary_branch": repo.primary_branch,
                     "last_build_at": repo.last_build_at.isoformat() + "Z" if repo.last_build_at else None,
-                    "integrations_count": len(repo.integrations),
+                    "integrations_count": integrations_count,
                     "github_url": repo.github_url,
                     "created_at": repo.created_at.isoformat() + "Z" if repo.created_at else None,
                     "updated_at": repo.updated_at.isoformat() + "Z" if repo.updated_at else None
                 }
-                for repo in repositories
+                for repo, integrations_count in rows
             ],
-            "pagination": {
-                "total": total,
-                "limit": limit,
-                "offset": offset,
-                "has_more": offset + limit < total
-            }
+            "pagination": pagination_info(limit, next_cursor, offset, total)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -72,7 +85,7 @@ async def list_repositories(
 @router.post("/")
 async def create_repository(
     repo_data: Dict[str, Any],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """إنشاء مستودع جديد"""
     try:
@@ -83,9 +96,9 @@ async def create_repository(
                 raise HTTPException(status_code=400, detail=f"حقل مطلوب: {field}")
         
         # التحقق من عدم وجود المستودع
-        existing = db.query(Repository).filter(
-            Repository.github_repo_id == repo_data["github_repo_id"]
-        ).first()
+        existing = await db.scalar(
+            select(Repository).where(Repository.github_repo_id == repo_data["github_repo_id"])
+        )
         
         if existing:
             raise HTTPException(
@@ -110,8 +123,8 @@ async def create_repository(
         )
         
         db.add(repository)
-        db.commit()
-        db.refresh(repository)
+        await db.commit()
+        await db.refresh(repository)
         
         return {
             "message": "تم إنشاء المستودع بنجاح",
@@ -126,7 +139,7 @@ async def create_repository(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -135,13 +148,11 @@ async def get_repository(
     repository_id: int,
     include_integrations: bool = Query(True, description="تضمين التكاملات"),
     include_recent_builds: bool = Query(False, description="تضمين العمليات الأخيرة"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """الحصول على تفاصيل مستودع"""
     try:
-        repository = db.query(Repository).filter(
-            Repository.id == repository_id
-        ).first()
+        repository = await db.get(Repository, repository_id)
         
         if not repository:
             raise HTTPException(status_code=404, detail="المستودع غير موجود")
@@ -174,6 +185,10 @@ async def get_repository(
         
         # إضافة التكاملات
         if include_integrations:
+            integrations = (await db.execute(
+                select(Integration).where(Integration.repository_id == repository_id)
+            )).scalars().all()
+            
             result["integrations"] = [
                 {
                     "id": integration.id,
@@ -183,18 +198,17 @@ async def get_repository(
                     "last_used_at": integration.last_used_at.isoformat() + "Z" if integration.last_used_at else None,
                     "created_at": integration.created_at.isoformat() + "Z" if integration.created_at else None
                 }
-                for integration in repository.integrations
+                for integration in integrations
             ]
         
         # إضافة العمليات الأخيرة
         if include_recent_builds:
-            recent_builds = (
-                db.query(Build)
-                .filter(Build.repository_id == repository_id)
+            recent_builds = (await db.execute(
+                select(Build)
+                .where(Build.repository_id == repository_id)
                 .order_by(Build.created_at.desc())
                 .limit(10)
-                .all()
-            )
+            )).scalars().all()
             
             result["recent_builds"] = [
                 {
@@ -222,13 +236,11 @@ async def get_repository(
 async def update_repository(
     repository_id: int,
     update_data: Dict[str, Any],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """تحديث إعدادات مستودع"""
     try:
-        repository = db.query(Repository).filter(
-            Repository.id == repository_id
-        ).first()
+        repository = await db.get(Repository, repository_id)
         
         if not repository:
             raise HTTPException(status_code=404, detail="المستودع غير موجود")
@@ -252,7 +264,7 @@ async def update_repository(
         # تحديث timestamp
         repository.updated_at = datetime.utcnow()
         
-        db.commit()
+        await db.commit()
         
         return {
             "message": "تم تحديث المستودع بنجاح",
@@ -264,30 +276,29 @@ async def update_repository(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.delete("/{repository_id}")
 async def delete_repository(
     repository_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """حذف مستودع"""
     try:
-        repository = db.query(Repository).filter(
-            Repository.id == repository_id
-        ).first()
+        repository = await db.get(Repository, repository_id)
         
         if not repository:
             raise HTTPException(status_code=404, detail="المستودع غير موجود")
         
         # التحقق من عدم وجود عمليات بناء جارية
-        from ..models.build import Build
-        active_builds = db.query(Build).filter(
-            Build.repository_id == repository_id,
-            Build.status.in_(["pending", "running"])
-        ).count()
+        active_builds = await db.scalar(
+            select(func.count(Build.id)).where(
+                Build.repository_id == repository_id,
+                Build.status.in_(["pending", "running"])
+            )
+        )
         
         if active_builds > 0:
             raise HTTPException(
@@ -296,14 +307,14 @@ async def delete_repository(
             )
         
         # حذف التكاملات أولاً
-        db.query(Integration).filter(
-            Integration.repository_id == repository_id
-        ).delete()
+        await db.execute(
+            delete(Integration).where(Integration.repository_id == repository_id)
+        )
         
         # حذف المستودع
         repo_name = repository.full_name
-        db.delete(repository)
-        db.commit()
+        await db.delete(repository)
+        await db.commit()
         
         return {
             "message": "تم حذف المستودع بنجاح",
@@ -313,7 +324,7 @@ async def delete_repository(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -321,13 +332,11 @@ async def delete_repository(
 async def link_github_repository(
     repository_id: int,
     github_data: Dict[str, Any],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """ربط مستودع مع GitHub"""
     try:
-        repository = db.query(Repository).filter(
-            Repository.id == repository_id
-        ).first()
+        repository = await db.get(Repository, repository_id)
         
         if not repository:
             raise HTTPException(status_code=404, detail="المستودع غير موجود")
@@ -349,13 +358,11 @@ async def link_github_repository(
 @router.get("/{repository_id}/settings")
 async def get_repository_settings(
     repository_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """الحصول على إعدادات مستودع مفصلة"""
     try:
-        repository = db.query(Repository).filter(
-            Repository.id == repository_id
-        ).first()
+        repository = await db.get(Repository, repository_id)
         
         if not repository:
             raise HTTPException(status_code=404, detail="المستودع غير موجود")
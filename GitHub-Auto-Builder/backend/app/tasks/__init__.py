@@ -12,7 +12,8 @@ celery_app = Celery(
     include=[
         "app.tasks.github_handlers",
         "app.tasks.build_handlers",
-        "app.tasks.fix_handlers"
+        "app.tasks.fix_handlers",
+        "app.tasks.cleanup"
     ]
 )
 
@@ -28,12 +29,21 @@ celery_app.conf.update(
         "app.tasks.github_handlers.*": {"queue": "github"},
         "app.tasks.build_handlers.*": {"queue": "builds"},
         "app.tasks.fix_handlers.*": {"queue": "fixes"},
+        "app.tasks.cleanup.*": {"queue": "builds"},
     },
     beat_schedule={
+        "consume-webhook-inbox": {
+            "task": "app.tasks.github_handlers.consume_webhook_inbox",
+            "schedule": settings.webhook_inbox_poll_interval_seconds,
+        },
         "cleanup-old-logs": {
             "task": "app.tasks.cleanup.cleanup_old_logs",
             "schedule": 86400.0,  # كل 24 ساعة
         },
+        "rollup-build-stats": {
+            "task": "app.tasks.build_handlers.rollup_build_stats",
+            "schedule": 900.0,  # كل 15 دقيقة
+        },
         "send-health-report": {
             "task": "app.tasks.monitoring.send_health_report",
             "schedule": 3600.0,  # كل ساعة
@@ -11,6 +11,9 @@ from ..models.database import SessionLocal
 from ..models.build import Build
 from ..models.integration import Integration
 from ..models.repository import Repository
+from ..models.build_stat import BuildDailyStat
+from ..log_store import write_log
+from ..events import publish_build_status, publish_log_written
 from ..config import settings
 from . import celery_app
 
@@ -23,19 +26,33 @@ def trigger_build(self, build_id: int):
     try:
         db = SessionLocal()
         
+        # تحديث الحالة إلى "قيد التشغيل" بشرط أن تكون ما زالت معلقة (UPDATE شرطي واحد):
+        # عملية ألغاها push أحدث، أو بدأها worker آخر، لا تُشغّل
+        claimed = db.query(Build).filter(
+            Build.id == build_id,
+            Build.status == "pending"
+        ).update({"status": "running", "started_at": datetime.utcnow()}, synchronize_session=False)
+        db.commit()
+        
         # الحصول على تفاصيل البناء
         build = db.query(Build).filter(Build.id == build_id).first()
         if not build:
+            db.close()
             self.update_state(
                 state="FAILURE",
                 meta="عملية البناء غير موجودة"
             )
             return
         
-        # تحديث الحالة إلى "قيد التشغيل"
-        build.status = "running"
-        build.started_at = datetime.utcnow()
-        db.commit()
+        if not claimed:
+            db.close()
+            self.update_state(
+                state="SUCCESS",
+                meta=f"تم تخطي عملية البناء بحالة {build.status}"
+            )
+            return {"status": "skipped", "build_status": build.status}
+        
+        publish_build_status(build)
         
         # تشغيل البناء حسب المنصة
         integration = build.integration
@@ -69,10 +86,12 @@ def trigger_build(self, build_id: int):
         repository.last_build_at = datetime.utcnow()
         
         db.commit()
+        publish_build_status(build)
+        final_status = build.status
         db.close()
         
         # بدء تحليل الأخطاء إذا فشل البناء
-        if build.status == "failed":
+        if final_status == "failed":
             analyze_build_failure.delay(build_id)
         
         self.update_state(
@@ -87,7 +106,8 @@ def trigger_build(self, build_id: int):
         try:
             db = SessionLocal()
             build = db.query(Build).filter(Build.id == build_id).first()
-            if build:
+            # لا تُغيَّر عملية ملغاة أو منتهية إلى فشل
+            if build and build.status == "running":
                 build.status = "failed"
                 build.error_logs = str(e)
                 build.finished_at = datetime.utcnow()
@@ -96,6 +116,7 @@ def trigger_build(self, build_id: int):
                     build.calculate_duration()
                 
                 db.commit()
+                publish_build_status(build)
             db.close()
         except:
             pass
@@ -191,10 +212,15 @@ def monitor_build_status(self, build_id: int):
                 build.calculate_duration()
             
             # حفظ اللوجات
+            logs = status.get("logs") or ""
             if "logs" in status:
-                build.logs_content = status["logs"]
+                write_log(db, build, logs)
             
             db.commit()
+            # أسطر اللوج قبل الحالة النهائية (مشتركو البث ينهون عندها)
+            if logs:
+                publish_log_written(build.id, 0, logs)
+            publish_build_status(build)
             
             # بدء تحليل الأخطاء إذا فشل البناء
             if build.status == "failed":
@@ -260,7 +286,7 @@ def collect_build_logs(self, build_id: int):
         logs_content = get_build_logs_from_platform(build)
         
         if logs_content:
-            build.logs_content = logs_content
+            write_log(db, build, logs_content)
             db.commit()
         
         db.close()
@@ -387,3 +413,45 @@ def cleanup_old_builds(self, days_to_keep: int = 30):
             meta=f"خطأ في التنظيف: {str(e)}"
         )
         raise
+
+
+@celery_app.task(bind=True, name="app.tasks.build_handlers.rollup_build_stats")
+def rollup_build_stats(self, days: int = 2):
+    """
+    تحديث الإحصائيات اليومية لعمليات البناء
+    
+    يُعاد حساب آخر days أيام مكتملة (لأن حالة البناء قد تتغير بعد منتصف الليل)،
+    ويُكمل أي أيام فاتت منذ آخر تجميع إذا توقفت المهمة لفترة.
+    """
+    db = SessionLocal()
+    try:
+        from datetime import timedelta
+        
+        yesterday = datetime.utcnow().date() - timedelta(days=1)
+        start_day = yesterday - timedelta(days=days - 1)
+        
+        last_rolled_day = BuildDailyStat.last_rolled_day(db)
+        if last_rolled_day is None:
+            # التشغيل الأول: تجميع كامل الفترة التي تعرضها الإحصائيات
+            start_day = yesterday - timedelta(days=30)
+        elif last_rolled_day < start_day:
+            start_day = last_rolled_day
+        
+        rows = BuildDailyStat.rollup(db, start_day, yesterday)
+        db.commit()
+        
+        return {
+            "status": "completed",
+            "message": f"تم تجميع إحصائيات البناء من {start_day} إلى {yesterday}",
+            "rows": rows
+        }
+        
+    except Exception as e:
+        db.rollback()
+        self.update_state(
+            state="FAILURE",
+            meta=f"خطأ في تجميع الإحصائيات: {str(e)}"
+        )
+        raise
+    finally:
+        db.close()
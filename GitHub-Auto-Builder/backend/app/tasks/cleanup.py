@@ -0,0 +1,32 @@
+"""
+مهام التنظيف الدورية
+"""
+from ..audit_partitions import purge_audit_logs
+from ..models import SessionLocal
+from . import celery_app
+
+
+@celery_app.task(bind=True, name="app.tasks.cleanup.cleanup_old_logs")
+def cleanup_old_logs(self, retention_days: int = None):
+    """
+    حذف سجلات المراجعة الأقدم من log_retention_days وإنشاء partitions الفترات القادمة
+    """
+    db = SessionLocal()
+    try:
+        result = purge_audit_logs(db, retention_days)
+        
+        return {
+            "status": "completed",
+            "message": f"تم حذف {len(result['dropped_partitions'])} partition و{result['deleted_rows']} سجل مراجعة قديم",
+            **result
+        }
+        
+    except Exception as e:
+        db.rollback()
+        self.update_state(
+            state="FAILURE",
+            meta=f"خطأ في تنظيف السجلات: {str(e)}"
+        )
+        raise
+    finally:
+        db.close()
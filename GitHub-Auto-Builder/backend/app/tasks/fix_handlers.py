@@ -2,23 +2,36 @@
 Fix Handlers - تحليل وإصلاح الأخطاء تلقائياً
 """
 from celery import current_task
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from datetime import datetime
-import re
 import json
 
 from ..models.database import SessionLocal
 from ..models.build import Build
 from ..models.fix_attempt import FixAttempt
 from ..models.repository import Repository
+from ..models.failure_fingerprint import FailureFingerprint
+from ..log_store import read_log, read_log_text
+from ..analysis.rules import rule_catalog, flush_rule_metrics
+from ..analysis.fingerprint import fingerprint_pattern
 from ..config import settings
 from . import celery_app
 
+# حجم التداخل عند تحليل جزء من اللوج
+ANALYSIS_OVERLAP_BYTES = 4096
+
+# درجة الثقة الدنيا لخطأ أُصلح بنجاح سابقاً بنفس البصمة
+KNOWN_FIX_CONFIDENCE = 90
+
 
 @celery_app.task(bind=True, name="app.tasks.fix_handlers.analyze_build_failure")
-def analyze_build_failure(self, build_id: int):
+def analyze_build_failure(self, build_id: int, start_offset: int = 0, partial: bool = False):
     """
     تحليل فشل البناء ومحاولة الإصلاح
+    
+    start_offset: تحليل اللوج من هذا الموضع فقط (للأجزاء المضافة أثناء البناء)
+    partial: اللوج غير مكتمل، تُنشأ محاولات الإصلاح بدون البدء بتطبيقها
     """
     try:
         db = SessionLocal()
@@ -32,7 +45,12 @@ def analyze_build_failure(self, build_id: int):
             return
         
         # الحصول على اللوجات
-        logs_content = build.logs_content or ""
+        if start_offset:
+            # تداخل مع الجزء السابق حتى لا يضيع خطأ مقسوم بين جزأين
+            window_start = max(0, start_offset - ANALYSIS_OVERLAP_BYTES)
+            logs_content = read_log(db, build, window_start).decode("utf-8", errors="replace")
+        else:
+            logs_content = read_log_text(db, build)
         
         if not logs_content:
             self.update_state(
@@ -51,19 +69,33 @@ def analyze_build_failure(self, build_id: int):
             )
             return
         
+        # بصمات الأخطاء والتحليل السابق لنفس الأخطاء في استعلام واحد
+        fingerprints = {}
+        for pattern in error_patterns:
+            parts = fingerprint_pattern(pattern)
+            pattern["fingerprint"] = parts["fingerprint"]
+            fingerprints.setdefault(parts["fingerprint"], parts)
+        known = FailureFingerprint.lookup(db, build.repository_id, list(fingerprints))
+        
         # إنشاء محاولة إصلاح لكل خطأ
-        fix_attempts_created = 0
+        fix_attempts_created = create_fix_attempts(db, build, error_patterns, known)
         
-        for pattern in error_patterns:
-            fix_attempt = create_fix_attempt(db, build, pattern)
-            if fix_attempt:
-                fix_attempts_created += 1
+        record_fingerprints(db, build, error_patterns, fingerprints, known)
         
         db.commit()
+        
+        # محاولات أُنشئت أثناء تحليل جزئي سابق لم يبدأ تطبيقها بعد
+        pending_attempts = fix_attempts_created
+        if not partial and not pending_attempts:
+            pending_attempts = db.query(FixAttempt).filter(
+                FixAttempt.build_id == build_id,
+                FixAttempt.status == "pending"
+            ).count()
+        
         db.close()
         
         # بدء محاولة الإصلاح إذا تم إنشاء محاولات
-        if fix_attempts_created > 0:
+        if pending_attempts > 0 and not partial:
             attempt_first_fix.delay(build_id)
         
         self.update_state(
@@ -88,122 +120,98 @@ def analyze_error_patterns(logs_content: str) -> list:
     """
     تحليل أنماط الأخطاء في اللوجات
     """
-    # قواعد الأخطاء الشائعة
-    error_rules = [
-        {
-            "name": "missing_python_package",
-            "pattern": r"ModuleNotFoundError: No module named '([^']+)'",
-            "fix_type": "dependency_update",
-            "confidence": 90,
-            "description": "حزمة Python مفقودة"
-        },
-        {
-            "name": "dependency_version_conflict",
-            "pattern": r"ERROR:.*version.*conflict",
-            "fix_type": "dependency_update", 
-            "confidence": 80,
-            "description": "تعارض في إصدارات التبعيات"
-        },
-        {
-            "name": "gradle_sync_failed",
-            "pattern": r"Gradle sync failed",
-            "fix_type": "config_fix",
-            "confidence": 85,
-            "description": "فشل مزامنة Gradle"
-        },
-        {
-            "name": "android_sdk_missing",
-            "pattern": r"Android SDK.*not found",
-            "fix_type": "environment_fix",
-            "confidence": 90,
-            "description": "Android SDK غير موجود"
-        },
-        {
-            "name": "java_home_not_set",
-            "pattern": r"JAVA_HOME.*not set",
-            "fix_type": "environment_fix",
-            "confidence": 95,
-            "description": "متغير JAVA_HOME غير محدد"
-        },
-        {
-            "name": "keystore_not_found",
-            "pattern": r"keystore.*not found",
-            "fix_type": "missing_file",
-            "confidence": 85,
-            "description": "ملف keystore مفقود"
-        },
-        {
-            "name": "npm_package_missing",
-            "pattern": r"npm ERR!.*not found",
-            "fix_type": "dependency_update",
-            "confidence": 80,
-            "description": "حزمة NPM مفقودة"
-        },
-        {
-            "name": "syntax_error",
-            "pattern": r"SyntaxError.*",
-            "fix_type": "syntax_fix",
-            "confidence": 70,
-            "description": "خطأ نحوي"
-        }
-    ]
-    
-    patterns_found = []
-    
-    for rule in error_rules:
-        matches = re.finditer(rule["pattern"], logs_content, re.IGNORECASE)
-        
-        for match in matches:
-            pattern_info = {
-                "rule_name": rule["name"],
-                "error_message": match.group(0),
-                "matched_text": match.group(1) if match.groups() else "",
-                "fix_type": rule["fix_type"],
-                "confidence": rule["confidence"],
-                "description": rule["description"],
-                "line_number": logs_content[:match.start()].count('\n') + 1
-            }
-            
-            patterns_found.append(pattern_info)
-    
+    # القواعد في app/analysis/error_rules.json (تُترجم مرة واحدة لكل إصدار)
+    scanner = rule_catalog.get_scanner()
+    patterns_found = scanner.scan(logs_content)
+    flush_rule_metrics(scanner)
     return patterns_found
 
 
-def create_fix_attempt(db: Session, build: Build, pattern: dict) -> FixAttempt:
+def create_fix_attempts(db: Session, build: Build, patterns: list, known: dict = None) -> int:
     """
-    إنشاء محاولة إصلاح جديدة
+    إنشاء محاولات الإصلاح لكل الأخطاء المكتشفة، يعيد عدد المحاولات الجديدة
+    
+    محاولة واحدة لكل قاعدة: الأخطاء المكررة تُدمج في الذاكرة، والمحاولات السابقة
+    تُقرأ في استعلام واحد، والمحاولات الجديدة تُكتب في INSERT واحد.
+    
+    known: بصمات نفس الأخطاء من تحليل سابق، يُعاد استخدام اقتراحها، ورفع الثقة
+    لإصلاحها الناجح فقط إذا كانت من نفس المستودع
     """
-    # التحقق من المحاولات السابقة
-    existing_attempts = db.query(FixAttempt).filter(
-        FixAttempt.build_id == build.id,
-        FixAttempt.error_pattern == pattern["rule_name"],
-        FixAttempt.status.in_(["pending", "applied"])
-    ).count()
+    known = known or {}
     
-    if existing_attempts > 0:
-        return None  # تخطي المحاولة المكررة
+    # المحاولات السابقة (معلقة أو مطبقة) لهذا البناء
+    existing_rules = {
+        error_pattern
+        for (error_pattern,) in db.query(FixAttempt.error_pattern).filter(
+            FixAttempt.build_id == build.id,
+            FixAttempt.status.in_(["pending", "applied"])
+        )
+    }
     
-    # إنشاء المحاولة
-    fix_attempt = FixAttempt(
-        build_id=build.id,
-        attempt_number=existing_attempts + 1,
-        fix_type=pattern["fix_type"],
-        status="pending",
-        error_pattern=pattern["rule_name"],
-        error_message=pattern["error_message"],
-        confidence_score=pattern["confidence"],
-        analysis_result=pattern,
-        requires_approval=pattern["confidence"] < 80
-    )
+    rows = []
+    for pattern in patterns:
+        if pattern["rule_name"] in existing_rules:
+            continue  # تخطي المحاولة المكررة
+        existing_rules.add(pattern["rule_name"])
+        
+        fingerprint = known.get(pattern.get("fingerprint"))
+        confidence = pattern["confidence"]
+        analysis_result = pattern
+        if (
+            fingerprint is not None
+            and fingerprint.has_known_fix
+            and fingerprint.repository_id == build.repository_id
+        ):
+            # نفس الخطأ أُصلح بنجاح سابقاً في نفس المستودع (إصلاح مستودع آخر لا يتجاوز الموافقة)
+            confidence = max(confidence, KNOWN_FIX_CONFIDENCE)
+            analysis_result = dict(pattern, known_fix_attempt_id=fingerprint.last_fix_attempt_id)
+        
+        # اقتراح الإصلاح (أو إعادة استخدام الاقتراح السابق لنفس البصمة)
+        if fingerprint is not None and fingerprint.fix_suggestion:
+            fix_suggestion = fingerprint.fix_suggestion
+        else:
+            fix_suggestion = generate_fix_suggestion(pattern)
+        
+        rows.append({
+            "build_id": build.id,
+            "attempt_number": 1,  # لا توجد محاولة معلقة أو مطبقة لهذه القاعدة
+            "fix_type": pattern["fix_type"],
+            "status": "pending",
+            "error_pattern": pattern["rule_name"],
+            "error_message": pattern["error_message"],
+            "confidence_score": confidence,
+            "analysis_result": analysis_result,
+            "fix_suggestion": fix_suggestion,
+            "requires_approval": confidence < 80,
+            "was_successful": False
+        })
     
-    # إنشاء اقتراح الإصلاح
-    fix_suggestion = generate_fix_suggestion(pattern)
-    fix_attempt.fix_suggestion = fix_suggestion
+    if rows:
+        db.execute(insert(FixAttempt.__table__), rows)
     
-    db.add(fix_attempt)
-    db.flush()  # للحصول على ID
+    return len(rows)
+
+
+def record_fingerprints(db: Session, build: Build, patterns: list, fingerprints: dict, known: dict):
+    """تحديث بصمات الأخطاء المكتشفة في هذا البناء (إنشاء الجديدة وزيادة عداد الموجودة)"""
+    first_patterns = {}
+    for pattern in patterns:
+        first_patterns.setdefault(pattern["fingerprint"], pattern)
     
-    return fix_attempt
+    for fingerprint, parts in fingerprints.items():
+        row = known.get(fingerprint)
+        pattern = first_patterns[fingerprint]
+        FailureFingerprint.upsert_occurrence(db, {
+            "repository_id": build.repository_id,
+            "fingerprint": fingerprint,
+            "rule_name": parts["rule_name"],
+            "token": parts["token"],
+            "toolchain": parts["toolchain"],
+            "fix_type": pattern["fix_type"],
+            # البصمة من مستودع آخر: يُعاد استخدام اقتراحها فقط
+            "fix_suggestion": (row.fix_suggestion if row is not None else None) or generate_fix_suggestion(pattern),
+            "analysis_result": pattern
+        }, build.id)
 
 
 def generate_fix_suggestion(pattern: dict) -> str:
@@ -283,6 +291,16 @@ def apply_fix_attempt(db: Session, fix_attempt: FixAttempt) -> dict:
     # تحديث حالة المحاولة
     if result["status"] == "success":
         fix_attempt.mark_as_applied()
+        
+        # حفظ الإصلاح الناجح على بصمة الخطأ لإعادة استخدامه
+        fingerprint = (fix_attempt.analysis_result or {}).get("fingerprint")
+        if fingerprint:
+            row = db.query(FailureFingerprint).filter(
+                FailureFingerprint.repository_id == build.repository_id,
+                FailureFingerprint.fingerprint == fingerprint
+            ).first()
+            if row:
+                row.record_fix(fix_attempt.id)
     else:
         fix_attempt.mark_as_failed(result.get("error", "خطأ في الإصلاح"))
     
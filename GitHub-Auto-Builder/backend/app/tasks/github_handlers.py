@@ -2,15 +2,23 @@
 GitHub Event Handlers - معالجة أحداث GitHub
 """
 from celery import current_task
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from datetime import datetime
+from typing import Any, Dict, List, Tuple
+import json
 
 from ..models.database import SessionLocal
 from ..models.repository import Repository
 from ..models.build import Build
 from ..models.integration import Integration
+from ..models.audit_log import AuditLog
 from ..config import settings
+from ..events import publish_build_status
+from ..github.deliveries import is_latest_push, next_push_sequence
+from ..github.inbox import read_inbox, ack_inbox, consumer_name
 from . import celery_app
+from .build_handlers import trigger_build
 
 
 @celery_app.task(bind=True, name="app.tasks.github_handlers.process_github_event")
@@ -64,6 +72,235 @@ def process_github_event(self, event_data: dict):
         raise
 
 
+@celery_app.task(name="app.tasks.github_handlers.consume_webhook_inbox")
+def consume_webhook_inbox(max_batches: int = 10):
+    """
+    معالجة صندوق وارد الـ webhooks على دفعات (تُشغّل دورياً من celery beat)
+    """
+    consumer = consumer_name()
+    batch_size = settings.webhook_inbox_batch_size
+    processed = 0
+    
+    for _ in range(max_batches):
+        entries = read_inbox(consumer, batch_size)
+        if not entries:
+            break
+        
+        db = SessionLocal()
+        try:
+            process_webhook_batch(db, entries)
+        finally:
+            db.close()
+        
+        # التأكيد بعد الحفظ والإرسال فقط: الدفعة الفاشلة تبقى معلقة ويستعيدها مستهلك لاحق
+        ack_inbox([entry_id for entry_id, _ in entries])
+        processed += len(entries)
+        
+        if len(entries) < batch_size:
+            break
+    
+    return {"status": "success", "processed": processed}
+
+
+def process_webhook_batch(db: Session, entries: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, int]:
+    """
+    تحليل دفعة تسليمات من صندوق الوارد وتسجيلها في سجل المراجعة وتوجيهها
+    
+    المستودعات تُجلب باستعلام واحد وسجلات المراجعة تُكتب بـ INSERT واحد، ثم تُرسل
+    المهام. إذا فشلت الدفعة قبل تأكيدها تُعاد معالجتها كاملة (at-least-once).
+    """
+    rows: List[Dict[str, Any]] = []
+    events = []
+    
+    for entry_id, fields in entries:
+        received_at = inbox_entry_time(entry_id)
+        try:
+            payload = json.loads(fields.get("body") or "")
+            if not isinstance(payload, dict):
+                raise ValueError("payload ليس كائن JSON")
+        except ValueError as e:
+            rows.append(AuditLog.build_row(
+                actor_type="system",
+                action="webhook_error",
+                description=f"Payload غير صالح: {str(e)}",
+                details={"delivery_id": fields.get("delivery_id"), "event_type": fields.get("event_type")},
+                success=False,
+                error_message="Payload غير صالح",
+                timestamp=received_at
+            ))
+            continue
+        
+        event_type = fields.get("event_type") or payload.get("action", "unknown")
+        events.append((event_type, payload, received_at))
+    
+    # جميع المستودعات المذكورة في الدفعة باستعلام واحد
+    full_names = {(payload.get("repository") or {}).get("full_name") for _, payload, _ in events}
+    full_names.discard(None)
+    repositories = {
+        repo.full_name: repo
+        for repo in db.query(Repository).filter(Repository.full_name.in_(full_names)).all()
+    } if full_names else {}
+    
+    tasks: List[Tuple[Dict[str, Any], Any]] = []
+    for event_type, payload, received_at in events:
+        try:
+            route_webhook_event(event_type, payload, repositories, received_at, rows, tasks)
+        except Exception as e:
+            rows.append(AuditLog.build_row(
+                actor_type="system",
+                action="webhook_error",
+                description=f"خطأ في معالجة webhook: {str(e)}",
+                success=False,
+                error_message=str(e),
+                timestamp=received_at
+            ))
+    
+    if rows:
+        db.execute(insert(AuditLog.__table__), rows)
+        db.commit()
+    
+    for event_data, countdown in tasks:
+        process_github_event.apply_async((event_data,), countdown=countdown)
+    
+    return {"events": len(events), "tasks": len(tasks), "audit_rows": len(rows)}
+
+
+def route_webhook_event(
+    event_type: str,
+    payload: Dict[str, Any],
+    repositories: Dict[str, Repository],
+    received_at: datetime,
+    rows: List[Dict[str, Any]],
+    tasks: List[Tuple[Dict[str, Any], Any]]
+):
+    """
+    تحديد سجلات المراجعة والمهام لحدث واحد (تُضاف إلى rows و tasks)
+    """
+    repository = payload.get("repository") or {}
+    sender = payload.get("sender") or {}
+    repo = repositories.get(repository.get("full_name"))
+    
+    rows.append(AuditLog.build_row(
+        actor_type="github",
+        actor_name=sender.get("login", "unknown"),
+        action="webhook_received",
+        resource_type="repository",
+        resource_name=repository.get("full_name"),
+        details={
+            "event_type": event_type,
+            "repository": repository,
+            "sender": sender,
+            "payload_keys": list(payload.keys())
+        },
+        timestamp=received_at
+    ))
+    
+    if event_type == "push":
+        ref = payload.get("ref", "")
+        commits = payload.get("commits", [])
+        
+        if not repo:
+            rows.append(AuditLog.build_row(
+                actor_type="system",
+                action="push_received_unregistered_repo",
+                resource_type="repository",
+                resource_name=repository.get("full_name"),
+                details={"ref": ref, "commits_count": len(commits)},
+                success=False,
+                error_message="المستودع غير مسجل في النظام",
+                timestamp=received_at
+            ))
+            return
+        
+        rows.append(AuditLog.build_row(
+            actor_type="github",
+            actor_name=(payload.get("pusher") or {}).get("name", "unknown"),
+            action="push_received",
+            resource_type="repository",
+            resource_id=repo.id,
+            resource_name=repo.full_name,
+            details={"ref": ref, "commits_count": len(commits), "after_commit": payload.get("after")},
+            timestamp=received_at
+        ))
+        
+        # تشغيل البناء بعد نافذة التجميع: إذا وصل push أحدث على نفس الفرع خلال
+        # النافذة تُتخطى هذه المهمة ويُبنى آخر commit فقط
+        if repo.auto_fix_enabled:
+            branch = ref.replace("refs/heads/", "")
+            tasks.append(({
+                "event_type": "push",
+                "repository_id": repo.id,
+                "branch": branch,
+                "commits": commits,
+                "after": payload.get("after"),
+                "push_sequence": next_push_sequence(repo.id, branch),
+                "action": "trigger_build"
+            }, settings.push_debounce_seconds))
+    
+    elif event_type == "pull_request":
+        action = payload.get("action", "opened")
+        pull_request = payload.get("pull_request") or {}
+        
+        if action in ["opened", "synchronize", "reopened"] and repo and repo.auto_fix_enabled:
+            rows.append(AuditLog.build_row(
+                actor_type="github",
+                actor_name=sender.get("login", "unknown"),
+                action="pull_request_received",
+                resource_type="repository",
+                resource_id=repo.id,
+                resource_name=repo.full_name,
+                details={
+                    "action": action,
+                    "pr_number": pull_request.get("number"),
+                    "pr_title": pull_request.get("title"),
+                    "branch": pull_request.get("head", {}).get("ref")
+                },
+                timestamp=received_at
+            ))
+            tasks.append(({
+                "event_type": "pull_request",
+                "repository_id": repo.id,
+                "pr_number": pull_request.get("number"),
+                "action": action,
+                "branch": pull_request.get("head", {}).get("ref"),
+                "base_branch": pull_request.get("base", {}).get("ref")
+            }, None))
+    
+    elif event_type == "issues":
+        issue = payload.get("issue") or {}
+        rows.append(AuditLog.build_row(
+            actor_type="github",
+            actor_name=sender.get("login", "unknown"),
+            action="issue_received",
+            resource_type="repository",
+            resource_name=repository.get("full_name"),
+            details={
+                "action": payload.get("action", "opened"),
+                "issue_number": issue.get("number"),
+                "issue_title": issue.get("title"),
+                "labels": [label.get("name") for label in issue.get("labels", [])]
+            },
+            timestamp=received_at
+        ))
+    
+    else:
+        # إشعار عام
+        tasks.append(({
+            "event_type": event_type,
+            "payload": payload,
+            "repository": repository,
+            "sender": sender
+        }, None))
+
+
+def inbox_entry_time(entry_id: str) -> datetime:
+    """وقت وصول التسليم من معرّف رسالة الـ stream (<ms>-<seq>)"""
+    try:
+        return datetime.utcfromtimestamp(int(entry_id.split("-", 1)[0]) / 1000)
+    except (ValueError, AttributeError):
+        return datetime.utcnow()
+
+
 def process_push_event(db: Session, repository: Repository, event_data: dict):
     """
     معالجة حدث push
@@ -74,6 +311,10 @@ def process_push_event(db: Session, repository: Repository, event_data: dict):
     if not branch:
         return
     
+    # push أحدث على نفس الفرع وصل خلال نافذة التجميع، سيُبنى بدلاً من هذا
+    if not is_latest_push(repository.id, branch, event_data.get("push_sequence")):
+        return
+    
     # البحث عن تكامل نشط
     integration = db.query(Integration).filter(
         Integration.repository_id == repository.id,
@@ -84,11 +325,23 @@ def process_push_event(db: Session, repository: Repository, event_data: dict):
         # إنشاء تكامل تلقائي إذا لم يوجد
         integration = create_default_integration(db, repository)
     
+    # إلغاء عمليات البناء المعلقة الأقدم على نفس الفرع (commits تجاوزها هذا الـ push)
+    superseded = db.query(Build).filter(
+        Build.repository_id == repository.id,
+        Build.branch == branch,
+        Build.trigger_type == "push",
+        Build.status == "pending"
+    ).all()
+    for old_build in superseded:
+        old_build.status = "cancelled"
+        old_build.finished_at = datetime.utcnow()
+    
     # إنشاء عملية بناء جديدة
     build = Build(
         repository_id=repository.id,
         integration_id=integration.id,
         branch=branch,
+        commit_sha=event_data.get("after") or (commits[-1].get("id") if commits else None),
         trigger_type="push",
         status="pending"
     )
@@ -97,6 +350,9 @@ def process_push_event(db: Session, repository: Repository, event_data: dict):
     db.commit()
     db.refresh(build)
     
+    for old_build in superseded:
+        publish_build_status(old_build)
+    
     # تشغيل مهمة البناء
     trigger_build.delay(build.id)
 
@@ -0,0 +1,284 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19 12:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('audit_logs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('actor_type', sa.String(length=20), nullable=False),
+    sa.Column('actor_id', sa.Integer(), nullable=True),
+    sa.Column('actor_name', sa.String(length=255), nullable=True),
+    sa.Column('action', sa.String(length=50), nullable=False),
+    sa.Column('resource_type', sa.String(length=50), nullable=True),
+    sa.Column('resource_id', sa.Integer(), nullable=True),
+    sa.Column('resource_name', sa.String(length=255), nullable=True),
+    sa.Column('details_json', sa.Text(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('ip_address', sa.String(length=45), nullable=True),
+    sa.Column('user_agent', sa.Text(), nullable=True),
+    sa.Column('success', sa.Boolean(), nullable=True),
+    sa.Column('error_message', sa.Text(), nullable=True),
+    sa.Column('metadata', sa.JSON(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_audit_logs_action'), 'audit_logs', ['action'], unique=False)
+    op.create_index('ix_audit_logs_action_timestamp', 'audit_logs', ['action', 'timestamp'], unique=False)
+    op.create_index(op.f('ix_audit_logs_id'), 'audit_logs', ['id'], unique=False)
+    op.create_index(op.f('ix_audit_logs_timestamp'), 'audit_logs', ['timestamp'], unique=False)
+    op.create_table('repositories',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner', sa.String(length=255), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('github_repo_id', sa.Integer(), nullable=False),
+    sa.Column('full_name', sa.String(length=511), nullable=False),
+    sa.Column('auto_fix_enabled', sa.Boolean(), nullable=True),
+    sa.Column('auto_fix_safe_only', sa.Boolean(), nullable=True),
+    sa.Column('auto_merge_enabled', sa.Boolean(), nullable=True),
+    sa.Column('primary_branch', sa.String(length=255), nullable=True),
+    sa.Column('webhook_secret', sa.Text(), nullable=True),
+    sa.Column('settings_json', sa.Text(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('default_language', sa.String(length=100), nullable=True),
+    sa.Column('is_private', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('last_build_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_repositories_full_name'), 'repositories', ['full_name'], unique=True)
+    op.create_index(op.f('ix_repositories_github_repo_id'), 'repositories', ['github_repo_id'], unique=True)
+    op.create_index(op.f('ix_repositories_id'), 'repositories', ['id'], unique=False)
+    op.create_index(op.f('ix_repositories_name'), 'repositories', ['name'], unique=False)
+    op.create_index(op.f('ix_repositories_owner'), 'repositories', ['owner'], unique=False)
+    op.create_table('task_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.String(length=64), nullable=False),
+    sa.Column('task_name', sa.String(length=255), nullable=False),
+    sa.Column('args', sa.JSON(), nullable=True),
+    sa.Column('kwargs', sa.JSON(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('task_id')
+    )
+    op.create_index(op.f('ix_task_outbox_id'), 'task_outbox', ['id'], unique=False)
+    op.create_index('ix_task_outbox_next_attempt_at', 'task_outbox', ['next_attempt_at'], unique=False)
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('github_id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=255), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=True),
+    sa.Column('email', sa.String(length=255), nullable=True),
+    sa.Column('avatar_url', sa.Text(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=False)
+    op.create_index(op.f('ix_users_github_id'), 'users', ['github_id'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=False)
+    op.create_table('build_daily_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('repository_id', sa.Integer(), nullable=False),
+    sa.Column('trigger_type', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('build_count', sa.Integer(), nullable=False),
+    sa.Column('duration_count', sa.Integer(), nullable=False),
+    sa.Column('duration_sum', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['repository_id'], ['repositories.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'repository_id', 'trigger_type', 'status', name='uq_build_daily_stats_key')
+    )
+    op.create_index(op.f('ix_build_daily_stats_day'), 'build_daily_stats', ['day'], unique=False)
+    op.create_index(op.f('ix_build_daily_stats_id'), 'build_daily_stats', ['id'], unique=False)
+    op.create_table('integrations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('repository_id', sa.Integer(), nullable=False),
+    sa.Column('platform', sa.String(length=50), nullable=False),
+    sa.Column('config_json', sa.Text(), nullable=True),
+    sa.Column('token_encrypted', sa.Text(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(), nullable=True),
+    sa.Column('webhook_url', sa.Text(), nullable=True),
+    sa.Column('settings', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['repository_id'], ['repositories.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_integrations_id'), 'integrations', ['id'], unique=False)
+    op.create_index(op.f('ix_integrations_platform'), 'integrations', ['platform'], unique=False)
+    op.create_table('builds',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('repository_id', sa.Integer(), nullable=False),
+    sa.Column('integration_id', sa.Integer(), nullable=False),
+    sa.Column('branch', sa.String(length=255), nullable=False),
+    sa.Column('commit_sha', sa.String(length=40), nullable=True),
+    sa.Column('build_id_platform', sa.String(length=255), nullable=True),
+    sa.Column('pull_request_id', sa.Integer(), nullable=True),
+    sa.Column('trigger_type', sa.String(length=50), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('duration_seconds', sa.Integer(), nullable=True),
+    sa.Column('logs_url', sa.Text(), nullable=True),
+    sa.Column('logs_content', sa.Text(), nullable=True),
+    sa.Column('error_logs', sa.Text(), nullable=True),
+    sa.Column('logs_head', sa.Text(), nullable=True),
+    sa.Column('logs_tail', sa.Text(), nullable=True),
+    sa.Column('logs_size', sa.BigInteger(), nullable=True),
+    sa.Column('test_results', sa.JSON(), nullable=True),
+    sa.Column('coverage_percentage', sa.Integer(), nullable=True),
+    sa.Column('artifacts_url', sa.Text(), nullable=True),
+    sa.Column('build_data', sa.JSON(), nullable=True),
+    sa.Column('metadata', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['integration_id'], ['integrations.id'], ),
+    sa.ForeignKeyConstraint(['repository_id'], ['repositories.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_builds_branch'), 'builds', ['branch'], unique=False)
+    op.create_index(op.f('ix_builds_build_id_platform'), 'builds', ['build_id_platform'], unique=False)
+    op.create_index(op.f('ix_builds_commit_sha'), 'builds', ['commit_sha'], unique=False)
+    op.create_index('ix_builds_created_at_id', 'builds', ['created_at', 'id'], unique=False)
+    op.create_index(op.f('ix_builds_id'), 'builds', ['id'], unique=False)
+    op.create_index('ix_builds_repository_id_created_at', 'builds', ['repository_id', 'created_at'], unique=False)
+    op.create_index(op.f('ix_builds_status'), 'builds', ['status'], unique=False)
+    op.create_table('build_log_chunks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('build_id', sa.Integer(), nullable=False),
+    sa.Column('stream', sa.String(length=20), nullable=False),
+    sa.Column('offset', sa.BigInteger(), nullable=False),
+    sa.Column('length', sa.Integer(), nullable=False),
+    sa.Column('codec', sa.String(length=10), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['build_id'], ['builds.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('build_id', 'stream', 'offset', name='uq_build_log_chunks_offset')
+    )
+    op.create_index(op.f('ix_build_log_chunks_id'), 'build_log_chunks', ['id'], unique=False)
+    op.create_table('fix_attempts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('build_id', sa.Integer(), nullable=False),
+    sa.Column('attempt_number', sa.Integer(), nullable=False),
+    sa.Column('fix_type', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('error_pattern', sa.Text(), nullable=True),
+    sa.Column('error_message', sa.Text(), nullable=True),
+    sa.Column('analysis_result', sa.JSON(), nullable=True),
+    sa.Column('fix_suggestion', sa.Text(), nullable=True),
+    sa.Column('files_changed', sa.JSON(), nullable=True),
+    sa.Column('changes_summary', sa.Text(), nullable=True),
+    sa.Column('diff_content', sa.Text(), nullable=True),
+    sa.Column('branch_name', sa.String(length=255), nullable=True),
+    sa.Column('commit_sha', sa.String(length=40), nullable=True),
+    sa.Column('pull_request_url', sa.Text(), nullable=True),
+    sa.Column('pull_request_number', sa.Integer(), nullable=True),
+    sa.Column('confidence_score', sa.Integer(), nullable=True),
+    sa.Column('requires_approval', sa.Boolean(), nullable=True),
+    sa.Column('was_successful', sa.Boolean(), nullable=True),
+    sa.Column('metadata', sa.JSON(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('applied_at', sa.DateTime(), nullable=True),
+    sa.Column('reverted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['build_id'], ['builds.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_fix_attempts_fix_type'), 'fix_attempts', ['fix_type'], unique=False)
+    op.create_index(op.f('ix_fix_attempts_id'), 'fix_attempts', ['id'], unique=False)
+    op.create_index(op.f('ix_fix_attempts_status'), 'fix_attempts', ['status'], unique=False)
+    op.create_table('failure_fingerprints',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('repository_id', sa.Integer(), nullable=False),
+    sa.Column('fingerprint', sa.String(length=64), nullable=False),
+    sa.Column('rule_name', sa.String(length=100), nullable=False),
+    sa.Column('token', sa.Text(), nullable=True),
+    sa.Column('toolchain', sa.String(length=50), nullable=True),
+    sa.Column('fix_type', sa.String(length=50), nullable=True),
+    sa.Column('fix_suggestion', sa.Text(), nullable=True),
+    sa.Column('analysis_result', sa.JSON(), nullable=True),
+    sa.Column('occurrences', sa.Integer(), nullable=False),
+    sa.Column('fixed_count', sa.Integer(), nullable=False),
+    sa.Column('last_build_id', sa.Integer(), nullable=True),
+    sa.Column('last_fix_attempt_id', sa.Integer(), nullable=True),
+    sa.Column('first_seen_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('last_seen_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('last_fixed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['last_build_id'], ['builds.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['last_fix_attempt_id'], ['fix_attempts.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['repository_id'], ['repositories.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('repository_id', 'fingerprint', name='uq_failure_fingerprints_repo_fingerprint')
+    )
+    op.create_index(op.f('ix_failure_fingerprints_fingerprint'), 'failure_fingerprints', ['fingerprint'], unique=False)
+    op.create_index(op.f('ix_failure_fingerprints_id'), 'failure_fingerprints', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_failure_fingerprints_id'), table_name='failure_fingerprints')
+    op.drop_index(op.f('ix_failure_fingerprints_fingerprint'), table_name='failure_fingerprints')
+    op.drop_table('failure_fingerprints')
+    op.drop_index(op.f('ix_fix_attempts_status'), table_name='fix_attempts')
+    op.drop_index(op.f('ix_fix_attempts_id'), table_name='fix_attempts')
+    op.drop_index(op.f('ix_fix_attempts_fix_type'), table_name='fix_attempts')
+    op.drop_table('fix_attempts')
+    op.drop_index(op.f('ix_build_log_chunks_id'), table_name='build_log_chunks')
+    op.drop_table('build_log_chunks')
+    op.drop_index(op.f('ix_builds_status'), table_name='builds')
+    op.drop_index('ix_builds_repository_id_created_at', table_name='builds')
+    op.drop_index(op.f('ix_builds_id'), table_name='builds')
+    op.drop_index('ix_builds_created_at_id', table_name='builds')
+    op.drop_index(op.f('ix_builds_commit_sha'), table_name='builds')
+    op.drop_index(op.f('ix_builds_build_id_platform'), table_name='builds')
+    op.drop_index(op.f('ix_builds_branch'), table_name='builds')
+    op.drop_table('builds')
+    op.drop_index(op.f('ix_integrations_platform'), table_name='integrations')
+    op.drop_index(op.f('ix_integrations_id'), table_name='integrations')
+    op.drop_table('integrations')
+    op.drop_index(op.f('ix_build_daily_stats_id'), table_name='build_daily_stats')
+    op.drop_index(op.f('ix_build_daily_stats_day'), table_name='build_daily_stats')
+    op.drop_table('build_daily_stats')
+    op.drop_index(op.f('ix_users_username'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_github_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+    op.drop_index('ix_task_outbox_next_attempt_at', table_name='task_outbox')
+    op.drop_index(op.f('ix_task_outbox_id'), table_name='task_outbox')
+    op.drop_table('task_outbox')
+    op.drop_index(op.f('ix_repositories_owner'), table_name='repositories')
+    op.drop_index(op.f('ix_repositories_name'), table_name='repositories')
+    op.drop_index(op.f('ix_repositories_id'), table_name='repositories')
+    op.drop_index(op.f('ix_repositories_github_repo_id'), table_name='repositories')
+    op.drop_index(op.f('ix_repositories_full_name'), table_name='repositories')
+    op.drop_table('repositories')
+    op.drop_index(op.f('ix_audit_logs_timestamp'), table_name='audit_logs')
+    op.drop_index(op.f('ix_audit_logs_id'), table_name='audit_logs')
+    op.drop_index('ix_audit_logs_action_timestamp', table_name='audit_logs')
+    op.drop_index(op.f('ix_audit_logs_action'), table_name='audit_logs')
+    op.drop_table('audit_logs')
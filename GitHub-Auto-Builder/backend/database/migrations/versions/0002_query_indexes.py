@@ -0,0 +1,45 @@
+"""composite indexes for build, integration and fix attempt queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 12:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+# (اسم الفهرس، الجدول، الأعمدة)
+INDEXES = [
+    # قائمة عمليات البناء حسب الحالة مرتبة حسب التاريخ، وإعادة تشغيل العمليات الفاشلة
+    ('ix_builds_status_created_at', 'builds', ['status', 'created_at']),
+    # عمليات البناء الأخيرة لكل تكامل
+    ('ix_builds_integration_id_created_at', 'builds', ['integration_id', 'created_at']),
+    # إلغاء عمليات البناء المعلقة على نفس الفرع عند push جديد
+    ('ix_builds_repository_id_branch_status', 'builds', ['repository_id', 'branch', 'status']),
+    # التكامل النشط لكل مستودع
+    ('ix_integrations_repository_id_is_active', 'integrations', ['repository_id', 'is_active']),
+    # محاولات الإصلاح المعلقة لكل عملية بناء بترتيب المحاولة
+    ('ix_fix_attempts_build_id_status', 'fix_attempts', ['build_id', 'status', 'attempt_number']),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY على PostgreSQL حتى لا يُقفل الجدول للكتابة أثناء بناء الفهرس
+    # (لا يعمل داخل transaction، لذلك autocommit_block)
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
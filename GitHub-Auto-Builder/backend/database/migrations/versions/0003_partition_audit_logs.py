@@ -0,0 +1,149 @@
+"""partition audit_logs by timestamp
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 12:40:00.000000
+
+لا تحذف الـ migration أي سجل: كل صفوف الجدول القديم تُنقل إلى partitions شهرية تبدأ من
+أقدم سجل، وتطبيق log_retention_days يبقى لمهمة purge_audit_logs بعد الترقية.
+الـ DDL ثابت هنا (لا يستورد app.*) حتى لا يتغير سلوك الـ migration مع تغيّر التطبيق أو الإعدادات.
+
+"""
+from datetime import date, datetime, timedelta
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_audit_logs_action', ['action']),
+    ('ix_audit_logs_action_timestamp', ['action', 'timestamp']),
+    ('ix_audit_logs_id', ['id']),
+    ('ix_audit_logs_timestamp', ['timestamp']),
+]
+
+COLUMNS = (
+    'id', 'actor_type', 'actor_id', 'actor_name', 'action', 'resource_type', 'resource_id',
+    'resource_name', 'details_json', 'description', 'ip_address', 'user_agent', 'success',
+    'error_message', 'metadata', 'timestamp',
+)
+
+# قيم app.audit_partitions وقت كتابة الـ migration (شهري، 3 فترات قادمة)
+DEFAULT_PARTITION = 'audit_logs_default'
+PARTITION_PREFIX = 'audit_logs_p'
+PARTITIONS_AHEAD = 3
+
+
+def next_month(start: date) -> date:
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def earliest_legacy_day() -> date:
+    today = datetime.utcnow().date()
+    if context.is_offline_mode():
+        return today
+    earliest = op.get_bind().execute(sa.text('SELECT min("timestamp") FROM audit_logs_legacy')).scalar()
+    return min(earliest.date(), today) if earliest else today
+
+
+def create_partitions(start: date):
+    # partition شهرية لكل شهر من start حتى PARTITIONS_AHEAD أشهر قادمة، والافتراضية لما خارجها
+    op.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF audit_logs DEFAULT')
+    current = start.replace(day=1)
+    last = datetime.utcnow().date().replace(day=1)
+    for _ in range(PARTITIONS_AHEAD):
+        last = next_month(last)
+    while current <= last:
+        end = next_month(current)
+        op.execute(
+            f'CREATE TABLE {PARTITION_PREFIX}{current:%Y%m} PARTITION OF audit_logs '
+            f"FOR VALUES FROM ('{current.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        current = end
+
+
+def audit_log_columns():
+    # id من نفس sequence الجدول القديم حتى تستمر المعرّفات
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('audit_logs_id_seq'::regclass)"), nullable=False),
+        sa.Column('actor_type', sa.String(length=20), nullable=False),
+        sa.Column('actor_id', sa.Integer(), nullable=True),
+        sa.Column('actor_name', sa.String(length=255), nullable=True),
+        sa.Column('action', sa.String(length=50), nullable=False),
+        sa.Column('resource_type', sa.String(length=50), nullable=True),
+        sa.Column('resource_id', sa.Integer(), nullable=True),
+        sa.Column('resource_name', sa.String(length=255), nullable=True),
+        sa.Column('details_json', sa.Text(), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('ip_address', sa.String(length=45), nullable=True),
+        sa.Column('user_agent', sa.Text(), nullable=True),
+        sa.Column('success', sa.Boolean(), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('metadata', sa.JSON(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    ]
+
+
+def rename_to_legacy():
+    op.execute('ALTER TABLE audit_logs RENAME TO audit_logs_legacy')
+    op.execute('ALTER TABLE audit_logs_legacy RENAME CONSTRAINT audit_logs_pkey TO audit_logs_legacy_pkey')
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name='audit_logs_legacy', if_exists=True)
+
+
+def copy_from_legacy():
+    columns = ', '.join(f'"{column}"' for column in COLUMNS)
+    selected = columns.replace('"timestamp"', 'COALESCE("timestamp", now())')
+    op.execute(f'INSERT INTO audit_logs ({columns}) SELECT {selected} FROM audit_logs_legacy')
+    op.execute('ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id')
+    op.drop_table('audit_logs_legacy')
+
+
+def create_indexes():
+    for name, columns in INDEXES:
+        op.create_index(name, 'audit_logs', columns, unique=False)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        # SQLite (التطوير والاختبار): جدول عادي، والاحتفاظ بالحذف على دفعات في purge_audit_logs
+        op.execute('UPDATE audit_logs SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL')
+        with op.batch_alter_table('audit_logs') as batch_op:
+            batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=False)
+        return
+
+    # مفتاح التقسيم يجب أن يكون ضمن المفتاح الأساسي: (id, timestamp)
+    rename_to_legacy()
+    op.create_table(
+        'audit_logs',
+        *audit_log_columns(),
+        sa.PrimaryKeyConstraint('id', 'timestamp', name='audit_logs_pkey'),
+        postgresql_partition_by='RANGE (timestamp)'
+    )
+    create_indexes()
+
+    # كل السجلات تُنقل (بلا cutoff): partitions من شهر أقدم سجل حتى الأشهر القادمة
+    create_partitions(earliest_legacy_day())
+    copy_from_legacy()
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        with op.batch_alter_table('audit_logs') as batch_op:
+            batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=True)
+        return
+
+    rename_to_legacy()
+    columns = audit_log_columns()
+    columns[-1].nullable = True
+    op.create_table('audit_logs', *columns, sa.PrimaryKeyConstraint('id', name='audit_logs_pkey'))
+    create_indexes()
+    # drop_table للجدول المقسّم يحذف جميع الـ partitions
+    copy_from_legacy()
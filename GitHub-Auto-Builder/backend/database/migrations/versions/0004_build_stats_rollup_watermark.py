@@ -0,0 +1,37 @@
+"""build_stats_rollups watermark for build_daily_stats
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 13:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # قاعدة أنشأها create_tables (مسجّلة على 0001) قد تحتوي الجدول مسبقاً
+    if 'build_stats_rollups' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('build_stats_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('last_rolled_day', sa.Date(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    # العلامة السابقة كانت max(day) من الصفوف المجمّعة
+    op.execute(
+        'INSERT INTO build_stats_rollups (id, last_rolled_day) '
+        'SELECT 1, max(day) FROM build_daily_stats '
+        'HAVING max(day) IS NOT NULL AND NOT EXISTS (SELECT 1 FROM build_stats_rollups)'
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('build_stats_rollups')
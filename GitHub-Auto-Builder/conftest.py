@@ -10,9 +10,12 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.main import app
-from app.models.database import Base, get_db
+from app.models import get_async_db, get_async_read_db
+from app.models.database import Base
 
 # إعداد قاعدة بيانات الاختبار
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -20,18 +23,30 @@ engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 
-@pytest.fixture(scope="session")
-def setup_database():
-    """إعداد قاعدة بيانات الاختبار"""
+@pytest.fixture
+def tables():
+    """إنشاء جداول قاعدة بيانات الاختبار لكل اختبار (lifespan لا ينشئها، الـ migrations خطوة نشر)"""
     Base.metadata.create_all(bind=engine)
     yield
     Base.metadata.drop_all(bind=engine)
 
 
 @pytest.fixture
-def db_session(setup_database):
+def db(tables):
+    """session قاعدة بيانات للاختبار (التغييرات تُحفظ ويراها الـ client)"""
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def db_session(tables):
     """session قاعدة بيانات للاختبار"""
     connection = engine.connect()
     transaction = connection.begin()
@@ -45,15 +60,14 @@ def db_session(setup_database):
 
 
 @pytest.fixture
-def client(db_session):
+def client(tables):
     """عميل الاختبار مع override قاعدة البيانات"""
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
     
-    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_db
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
@@ -133,3 +147,33 @@ TEST_CONFIG = {
         "is_active": True
     }
 }
+
+
+class QueryCounter:
+    """عدّاد استعلامات SQL المنفذة على engine داخل كتلة with"""
+    
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+    
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+    
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+    
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+    
+    def __exit__(self, *exc_info):
+        from sqlalchemy import event
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+@pytest.fixture
+def count_queries():
+    """إنشاء عدّاد استعلامات، مثال: with count_queries(engine) as counter: ..."""
+    return QueryCounter
@@ -204,6 +204,19 @@ class GitHubBuilderRunner:
             print("⚠️  pytest غير متوفر - تخطي الاختبارات")
             return True
     
+    def run_migrations(self):
+        """تطبيق migrations قاعدة البيانات (مرة واحدة لكل نشر، قبل تشغيل الـ API)"""
+        print("🗄️  تطبيق migrations قاعدة البيانات...")
+        
+        try:
+            subprocess.run([sys.executable, "-m", "app.models.database"], cwd="backend", check=True)
+            print("✅ تم تحديث مخطط قاعدة البيانات")
+            return True
+            
+        except subprocess.CalledProcessError as e:
+            print(f"❌ فشل في تطبيق migrations: {e}")
+            return False
+    
     def show_status(self):
         """عرض حالة النظام"""
         print("📊 حالة النظام:")
@@ -238,6 +251,7 @@ def main():
   python run.py logs         # عرض اللوجات
   python run.py health       # فحص صحة النظام
   python run.py test         # تشغيل الاختبارات
+  python run.py migrate      # تطبيق migrations قاعدة البيانات
   python run.py status       # عرض حالة النظام
   python run.py urls         # عرض روابط النظام
         """
@@ -245,7 +259,7 @@ def main():
     
     parser.add_argument(
         "command",
-        choices=["start", "stop", "restart", "logs", "health", "test", "status", "urls"],
+        choices=["start", "stop", "restart", "logs", "health", "test", "migrate", "status", "urls"],
         help="الأمر المراد تنفيذه"
     )
     
@@ -296,6 +310,10 @@ def main():
         if runner.check_requirements():
             runner.run_tests()
     
+    elif args.command == "migrate":
+        if not runner.run_migrations():
+            sys.exit(1)
+    
     elif args.command == "status":
         runner.show_status()
     
@@ -2,48 +2,11 @@
 اختبارات أساسية للتطبيق
 """
 import pytest
-from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
-from app.main import app
-from app.models.database import Base, get_db
+from app.models.database import Base
 from app.config import settings
-
-# إعداد قاعدة بيانات الاختبار
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-
-@pytest.fixture
-def db():
-    """إنشاء قاعدة بيانات اختبار"""
-    Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-        Base.metadata.drop_all(bind=engine)
-
-
-@pytest.fixture
-def client():
-    """عميل الاختبار"""
-    def override_get_db():
-        try:
-            db = TestingSessionLocal()
-            yield db
-        finally:
-            db.close()
-    
-    app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as c:
-        yield c
-    app.dependency_overrides.clear()
+from conftest import TestingSessionLocal, async_engine, engine
 
 
 def test_read_root(client):
@@ -96,9 +59,39 @@ def test_list_repositories(client):
     assert "pagination" in data
 
 
-def test_github_webhook(client):
-    """اختبار webhook GitHub"""
-    webhook_data = {
+def sign_webhook(body: bytes) -> str:
+    """توقيع X-Hub-Signature-256 بـ github_webhook_secret"""
+    import hashlib
+    import hmac
+    return "sha256=" + hmac.new(settings.github_webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def test_github_webhook(client, monkeypatch):
+    """اختبار webhook GitHub: القبول، التكرار، التوقيع الخاطئ، وفشل صندوق الوارد"""
+    import json
+    from app.routers import github_webhooks
+    
+    appended, forgotten, seen = [], [], set()
+    
+    async def fake_is_duplicate(delivery_id):
+        if delivery_id in seen:
+            return True
+        seen.add(delivery_id)
+        return False
+    
+    async def fake_append(event_type, delivery_id, body):
+        appended.append((event_type, delivery_id, body))
+        return "1-0"
+    
+    async def fake_forget(delivery_id):
+        forgotten.append(delivery_id)
+        seen.discard(delivery_id)
+    
+    monkeypatch.setattr(github_webhooks, "is_duplicate_delivery", fake_is_duplicate)
+    monkeypatch.setattr(github_webhooks, "append_delivery", fake_append)
+    monkeypatch.setattr(github_webhooks, "forget_delivery", fake_forget)
+    
+    body = json.dumps({
         "action": "opened",
         "repository": {
             "full_name": "testuser/testrepo"
@@ -106,17 +99,46 @@ def test_github_webhook(client):
         "sender": {
             "login": "testuser"
         }
-    }
+    }).encode()
     
-    response = client.post(
-        "/api/webhooks/github",
-        json=webhook_data,
-        headers={"X-GitHub-Event": "pull_request"}
-    )
-    assert response.status_code == 200
+    def post(delivery_id, signature=None):
+        return client.post(
+            "/api/webhooks/github",
+            content=body,
+            headers={
+                "Content-Type": "application/json",
+                "X-GitHub-Event": "pull_request",
+                "X-GitHub-Delivery": delivery_id,
+                "X-Hub-Signature-256": signature or sign_webhook(body)
+            }
+        )
+    
+    response = post("delivery-1")
+    assert response.status_code == 202
     data = response.json()
-    assert "status" in data
-    assert data["status"] == "received"
+    assert data["status"] == "accepted"
+    assert data["inbox_id"] == "1-0"
+    assert appended == [("pull_request", "delivery-1", body)]
+    
+    # إعادة إرسال نفس التسليم لا تُضاف مرة ثانية
+    response = post("delivery-1")
+    assert response.status_code == 202
+    assert response.json()["status"] == "duplicate"
+    assert len(appended) == 1
+    
+    response = post("delivery-2", signature="sha256=" + "0" * 64)
+    assert response.status_code == 401
+    assert len(appended) == 1
+    
+    # فشل الحفظ: 503 وحذف معرّف التسليم حتى تُقبل إعادة إرساله
+    async def failing_append(event_type, delivery_id, body):
+        raise ConnectionError("redis down")
+    
+    monkeypatch.setattr(github_webhooks, "append_delivery", failing_append)
+    response = post("delivery-3")
+    assert response.status_code == 503
+    assert forgotten == ["delivery-3"]
+    assert "delivery-3" not in seen
 
 
 def test_build_statistics(client):
@@ -159,3 +181,944 @@ def test_create_integration(client):
     data = response.json()
     assert "message" in data
     assert data["integration"]["platform"] == "github_actions"
+
+
+def test_audit_log_writer_batches_and_drops(monkeypatch):
+    """اختبار كتابة سجلات المراجعة على دفعات وإسقاطها عند امتلاء الطابور"""
+    import asyncio
+    from app.middleware import audit_writer
+    
+    batches = []
+    monkeypatch.setattr(audit_writer, "write_audit_rows", lambda rows: batches.append(list(rows)))
+    
+    async def run():
+        writer = audit_writer.AuditLogWriter(batch_size=10, flush_interval=0.05, queue_size=25)
+        await writer.start()
+        accepted = sum(writer.submit({"action": "api_request", "n": i}) for i in range(30))
+        await writer.stop()
+        return writer, accepted
+    
+    writer, accepted = asyncio.run(run())
+    
+    assert accepted == 25
+    assert writer.dropped == 5
+    assert writer.written == 25
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert not writer.running
+
+
+def test_build_statistics_uses_daily_rollup(client, db):
+    """اختبار تطابق الإحصائيات قبل وبعد تجميع الجدول اليومي"""
+    from datetime import datetime, timedelta
+    from app.models.build import Build
+    from app.models.build_stat import BuildDailyStat
+    
+    now = datetime.utcnow()
+    for i, status in enumerate(["success", "failed", "success", "running"] * 3):
+        db.add(Build(
+            repository_id=1,
+            integration_id=1,
+            branch="main",
+            status=status,
+            trigger_type="push" if i % 2 else None,
+            duration_seconds=60 * i or None,
+            created_at=now - timedelta(days=i % 4, hours=1)
+        ))
+    db.commit()
+    
+    before = client.get("/api/builds/statistics/summary?days=7").json()
+    
+    BuildDailyStat.rollup(db, (now - timedelta(days=10)).date(), (now - timedelta(days=1)).date())
+    db.commit()
+    assert db.query(BuildDailyStat).count() > 0
+    
+    after = client.get("/api/builds/statistics/summary?days=7").json()
+    assert after["totals"] == before["totals"]
+    assert after["triggers"] == before["triggers"]
+    assert after["timing"] == before["timing"]
+    assert after["totals"]["total_builds"] == 12
+
+
+def test_build_stats_rollup_watermark_advances_without_builds(client, db):
+    """اختبار تقدم علامة التجميع في الأيام التي لا تحتوي عمليات بناء"""
+    from datetime import datetime, timedelta
+    from app.models.build import Build
+    from app.models.build_stat import BuildDailyStat
+
+    now = datetime.utcnow()
+    yesterday = (now - timedelta(days=1)).date()
+    db.add(Build(repository_id=1, integration_id=1, branch="main", status="success",
+                 trigger_type="push", created_at=now - timedelta(days=5)))
+    db.commit()
+
+    assert BuildDailyStat.last_rolled_day(db) is None
+    BuildDailyStat.rollup(db, (now - timedelta(days=10)).date(), yesterday)
+    db.commit()
+    # آخر صف مكتوب قبل 5 أيام، والعلامة على آخر يوم تم تجميعه
+    assert db.query(BuildDailyStat.day).scalar() == (now - timedelta(days=5)).date()
+    assert BuildDailyStat.last_rolled_day(db) == yesterday
+
+    # إعادة تجميع فترة أقدم لا تعيد العلامة إلى الخلف
+    BuildDailyStat.rollup(db, (now - timedelta(days=10)).date(), (now - timedelta(days=6)).date())
+    db.commit()
+    assert BuildDailyStat.last_rolled_day(db) == yesterday
+    assert client.get("/api/builds/statistics/summary?days=7").json()["totals"]["total_builds"] == 1
+
+
+def _seed_repositories(db, start: int, count: int):
+    """إنشاء مستودعات مع تكاملات وعمليات بناء للاختبار"""
+    from app.models.repository import Repository
+    from app.models.integration import Integration
+    from app.models.build import Build
+    
+    for i in range(start, start + count):
+        repository = Repository(
+            owner="owner",
+            name=f"repo{i}",
+            full_name=f"owner/repo{i}",
+            github_repo_id=100000 + i
+        )
+        db.add(repository)
+        db.flush()
+        integration = Integration(repository_id=repository.id, platform="github_actions")
+        db.add(integration)
+        db.flush()
+        db.add(Build(repository_id=repository.id, integration_id=integration.id, branch="main", status="success"))
+    db.commit()
+
+
+@pytest.mark.parametrize("path", ["/api/builds/", "/api/repositories/", "/api/integrations/"])
+def test_list_endpoints_constant_query_count(client, db, count_queries, path):
+    """اختبار أن عدد الاستعلامات لا يزداد مع عدد الصفوف (بدون N+1)"""
+    _seed_repositories(db, 0, 1)
+    with count_queries(async_engine.sync_engine) as few:
+        assert client.get(path).status_code == 200
+    
+    _seed_repositories(db, 1, 10)
+    with count_queries(async_engine.sync_engine) as many:
+        assert client.get(path).status_code == 200
+    
+    assert many.count == few.count, many.statements
+
+
+def test_list_builds_cursor_pagination(client, db):
+    """اختبار الترقيم بالمؤشر: كل الصفوف مرة واحدة بالترتيب"""
+    from datetime import datetime, timedelta
+    from app.models.build import Build
+    
+    from app.models.repository import Repository
+    
+    db.add(Repository(owner="owner", name="repo", full_name="owner/repo", github_repo_id=1))
+    now = datetime.utcnow()
+    for i in range(6):
+        # صفّان بنفس created_at لاختبار الترتيب الثانوي على id
+        db.add(Build(repository_id=1, integration_id=1, branch="main", status="success", created_at=now - timedelta(minutes=i // 2)))
+    db.commit()
+    
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 3, "include_total": True}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get("/api/builds/", params=params).json()
+        seen.extend(build["id"] for build in data["builds"])
+        assert data["pagination"]["total"] == 6
+        cursor = data["pagination"]["next_cursor"]
+        if not cursor:
+            break
+    
+    assert len(seen) == 6
+    assert len(set(seen)) == 6
+    
+    response = client.get("/api/builds/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_list_repositories_cursor_stable_on_update(client, db):
+    """اختبار ثبات الترقيم بالمؤشر عند تعديل مستودع بين الصفحات (الترتيب على created_at)"""
+    from datetime import datetime, timedelta
+    from app.models.repository import Repository
+    
+    now = datetime.utcnow()
+    for i in range(4):
+        db.add(Repository(
+            owner="owner", name=f"repo{i}", full_name=f"owner/repo{i}", github_repo_id=i + 1,
+            created_at=now - timedelta(minutes=i)
+        ))
+    db.commit()
+    
+    first = client.get("/api/repositories/", params={"limit": 2}).json()
+    seen = [repo["id"] for repo in first["repositories"]]
+    
+    # تعديل مستودع في الصفحة التالية لا ينقله إلى صفحة سابقة
+    repo = db.query(Repository).filter(Repository.id.notin_(seen)).first()
+    repo.updated_at = now + timedelta(hours=1)
+    db.commit()
+    
+    second = client.get(
+        "/api/repositories/", params={"limit": 2, "cursor": first["pagination"]["next_cursor"]}
+    ).json()
+    seen.extend(repo["id"] for repo in second["repositories"])
+    
+    assert sorted(seen) == [1, 2, 3, 4]
+    assert second["pagination"]["has_more"] is False
+
+
+def test_build_logs_chunked_storage(client, db, monkeypatch):
+    """اختبار تخزين اللوجات كأجزاء مضغوطة وقراءة النطاقات"""
+    from app import log_store
+    from app.models.build import Build
+    from app.models.build_log import BuildLogChunk
+    from app.models.integration import Integration
+    from app.models.repository import Repository
+    
+    monkeypatch.setattr(log_store, "LOG_CHUNK_SIZE", 1000)
+    
+    db.add(Repository(owner="owner", name="repo", full_name="owner/repo", github_repo_id=1))
+    db.add(Integration(repository_id=1, platform="github_actions"))
+    build = Build(repository_id=1, integration_id=1, branch="main", status="failed")
+    db.add(build)
+    db.commit()
+    
+    logs = "".join(f"step {i}: ok\n" for i in range(500))
+    response = client.post(f"/api/builds/{build.id}/logs", json={"logs_content": logs, "error_logs": "boom"})
+    assert response.status_code == 200
+    
+    size = len(logs.encode("utf-8"))
+    assert db.query(BuildLogChunk).filter(BuildLogChunk.stream == "logs").count() == -(-size // 1000)
+    
+    details = client.get(f"/api/builds/{build.id}").json()["results"]
+    assert details["logs"]["size"] == size
+    assert details["logs"]["head"] == logs[:log_store.LOG_HEAD_CHARS]
+    assert details["error_logs"] == "boom"
+    
+    response = client.get(f"/api/builds/{build.id}/logs")
+    assert response.status_code == 200
+    assert response.text == logs
+    
+    # نطاق يعبر حدود الأجزاء
+    response = client.get(f"/api/builds/{build.id}/logs", headers={"Range": "bytes=990-2009"})
+    assert response.status_code == 206
+    assert response.text == logs[990:2010]
+    assert response.headers["content-range"] == f"bytes 990-2009/{size}"
+    
+    response = client.get(f"/api/builds/{build.id}/logs", params={"start": size + 1})
+    assert response.status_code == 416
+    
+    # نطاق يقسم حرفاً متعدد البايتات: تُعاد البايتات كما هي بطول Content-Range
+    client.post(f"/api/builds/{build.id}/logs", json={"logs_content": "خطأ"})
+    response = client.get(f"/api/builds/{build.id}/logs", params={"start": 0, "end": 3})
+    assert response.status_code == 206
+    assert response.content == "خطأ".encode("utf-8")[:3]
+    assert response.headers["content-type"] == "text/plain; charset=utf-8"
+
+
+def test_append_build_logs_idempotent_offsets(client, db, monkeypatch):
+    """اختبار إضافة اللوجات على أجزاء: إعادة الإرسال بدون تكرار و409 عند الفجوات"""
+    from app import log_store
+    from app.models.build import Build
+    from app.models.repository import Repository
+    from app.routers import builds as builds_router
+    
+    monkeypatch.setattr(builds_router, "LOG_CHUNK_SIZE", 100)
+    monkeypatch.setattr(log_store, "LOG_CHUNK_SIZE", 100)
+    
+    db.add(Repository(owner="owner", name="repo", full_name="owner/repo", github_repo_id=1))
+    build = Build(repository_id=1, integration_id=1, branch="main", status="running")
+    db.add(build)
+    db.commit()
+    
+    url = f"/api/builds/{build.id}/logs/append"
+    first = "x" * 250
+    second = "line two\n"
+    
+    response = client.put(url, params={"offset": 0}, content=first)
+    assert response.status_code == 200
+    assert response.json()["size"] == 250
+    
+    # إعادة إرسال نفس الجزء لا تغير اللوج
+    response = client.put(url, params={"offset": 0}, content=first)
+    assert response.status_code == 200
+    assert response.json()["duplicate"] is True
+    
+    # نفس الموضع والطول بمحتوى مختلف ليس إعادة إرسال
+    response = client.put(url, params={"offset": 0}, content="y" * 250)
+    assert response.status_code == 409
+    
+    # فجوة أو تداخل غير مطابق
+    for offset, body in ((300, second), (100, second)):
+        response = client.put(url, params={"offset": offset}, content=body)
+        assert response.status_code == 409
+        assert response.json()["error"]["message"]["expected_offset"] == 250
+        assert response.headers["x-log-offset"] == "250"
+    
+    response = client.put(url, params={"offset": 250}, content=second)
+    assert response.json()["size"] == 259
+    
+    # الجسم الأكبر من الحد يُرفض قبل قفل البناء ولا يُكتب منه شيء
+    monkeypatch.setattr(builds_router.settings, "build_log_append_max_bytes", 200)
+    response = client.put(url, params={"offset": 259}, content="y" * 250)
+    assert response.status_code == 413
+    
+    response = client.get(f"/api/builds/{build.id}/logs")
+    assert response.text == first + second
+
+
+def test_error_scanner_single_pass():
+    """اختبار ماسح الأخطاء: أرقام الأسطر والحد الأقصى للتطابقات لكل قاعدة"""
+    from app.analysis.rules import DEFAULT_RULES_PATH, load_rule_catalog
+    from app.analysis.scanner import ErrorScanner, required_literal
+    
+    assert required_literal(r"JAVA_HOME.*not set") == "java_home"
+    assert required_literal(r"colou?r not found") == "r not found"
+    assert required_literal(r"a|b") is None
+    
+    logs = "\n".join([
+        "step 1",
+        "ModuleNotFoundError: No module named 'requests'",
+        "step 3",
+        "ERROR: version conflict in SyntaxError: bad",
+        "npm ERR! 404 not found",
+        "npm ERR! 404 not found",
+        "npm ERR! 404 not found",
+    ])
+    
+    rules = load_rule_catalog(DEFAULT_RULES_PATH)["rules"]
+    scanner = ErrorScanner(rules, max_matches_per_rule=2)
+    found = scanner.scan(logs)
+    by_rule = {}
+    for info in found:
+        by_rule.setdefault(info["rule_name"], []).append(info["line_number"])
+    
+    assert by_rule == {
+        "missing_python_package": [2],
+        "dependency_version_conflict": [4],
+        "npm_package_missing": [5, 6],
+        "syntax_error": [4],
+    }
+    assert found[0]["matched_text"] == "requests"
+    
+    stats = scanner.pop_stats()
+    assert stats["scans"] == 1
+    assert stats["rules"]["npm_package_missing"]["hits"] == 2
+    assert scanner.pop_stats()["scans"] == 0
+
+
+def test_error_scanner_quantified_and_multiline_patterns():
+    """اختبار أن محتوى {m,n} لا يُستخرج كنص حرفي، وأن الأنماط متعددة الأسطر تطابق"""
+    from app.analysis.scanner import ErrorScanner, required_literal, spans_lines
+    
+    assert required_literal(r"abc{2,4}def") == "def"
+    assert required_literal(r"x{3}yz") is None
+    assert required_literal(r"error\.log missing") == "error.log missing"
+    assert required_literal(r"\x41pple pie") is None
+    assert spans_lines(r"Task failed\n\s+at line") is True
+    assert spans_lines(r"JAVA_HOME.*not set") is False
+    
+    def rule(name, pattern):
+        return {"name": name, "pattern": pattern, "fix_type": "manual", "confidence": 50, "description": name}
+    
+    scanner = ErrorScanner([
+        rule("quantified", r"retrying{2,4} failed"),
+        rule("multiline", r"Execution failed for task\n\s+> (\w+) error"),
+    ])
+    logs = "step\nretryingg failed\nExecution failed for task\n   > Lint error\n"
+    found = {info["rule_name"]: info for info in scanner.scan(logs)}
+    
+    assert found["quantified"]["line_number"] == 2
+    assert found["multiline"]["line_number"] == 3
+    assert found["multiline"]["matched_text"] == "Lint"
+    assert scanner.scan("nothing to see\n") == []
+
+
+def test_error_rule_metrics_roundtrip(monkeypatch):
+    """اختبار حفظ مقاييس القواعد من الـ worker وقراءتها بالعميل غير المتزامن"""
+    import asyncio
+    import fakeredis
+    from app.analysis import rules
+    from app.analysis.scanner import ErrorScanner
+    
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(rules, "get_redis", lambda: fakeredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(rules, "get_async_redis", lambda: fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+    
+    scanner = ErrorScanner(rules.load_rule_catalog(rules.DEFAULT_RULES_PATH)["rules"], version="v1")
+    scanner.scan("npm ERR! 404 not found\nnpm ERR! 404 not found\n")
+    rules.flush_rule_metrics(scanner)
+    
+    metrics = asyncio.run(rules.get_rule_metrics("v1"))
+    by_name = {rule["name"]: rule for rule in metrics["rules"]}
+    assert metrics["scans"] == 1
+    assert by_name["npm_package_missing"]["hits"] == 2
+
+
+def test_error_rule_catalog_hot_reload(tmp_path):
+    """اختبار إعادة تحميل كتالوج القواعد عند تغير الإصدار والاحتفاظ بالإصدار السابق عند الخطأ"""
+    import json
+    import os
+    from app.analysis.rules import RuleCatalog
+    
+    path = tmp_path / "rules.json"
+    rule = {"name": "boom", "pattern": "boom", "fix_type": "syntax_fix", "confidence": 50, "description": "x"}
+    path.write_text(json.dumps({"version": 1, "rules": [rule]}))
+    
+    catalog = RuleCatalog(str(path), reload_interval=0)
+    first = catalog.get_scanner()
+    assert first.version == "1"
+    assert catalog.get_scanner() is first
+    
+    path.write_text(json.dumps({"version": 2, "rules": [rule, dict(rule, name="bang", pattern="bang")]}))
+    os.utime(path, (1, 1))
+    second = catalog.get_scanner()
+    assert second.version == "2"
+    assert [r["name"] for r in second.rules] == ["boom", "bang"]
+    
+    # ملف غير صالح: الاستمرار بالإصدار الحالي
+    path.write_text(json.dumps({"version": 3, "rules": [dict(rule, pattern="(")]}))
+    os.utime(path, (2, 2))
+    assert catalog.get_scanner() is second
+
+
+def test_failure_fingerprint_reuses_known_fix(db, monkeypatch):
+    """اختبار إعادة استخدام الإصلاح الناجح لنفس بصمة الخطأ في عملية بناء لاحقة"""
+    from app.log_store import write_log
+    from app.models.build import Build
+    from app.models.failure_fingerprint import FailureFingerprint
+    from app.models.fix_attempt import FixAttempt
+    from app.models.integration import Integration
+    from app.models.repository import Repository
+    from app.tasks import fix_handlers
+    
+    monkeypatch.setattr(fix_handlers, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(fix_handlers.analyze_build_failure, "update_state", lambda *args, **kwargs: None)
+    monkeypatch.setattr(fix_handlers.attempt_first_fix, "delay", lambda *args, **kwargs: None)
+    
+    db.add(Repository(owner="owner", name="repo", full_name="owner/repo", github_repo_id=1))
+    db.add(Integration(repository_id=1, platform="github_actions"))
+    builds = []
+    for timestamp in ("2024-01-01T10:00:00Z", "2024-01-02T11:30:00Z"):
+        build = Build(repository_id=1, integration_id=1, branch="main", status="failed")
+        db.add(build)
+        db.flush()
+        write_log(db, build, f"{timestamp} /home/runner/work/app/main.py\nModuleNotFoundError: No module named 'requests'\n")
+        builds.append(build)
+    db.commit()
+    
+    fix_handlers.analyze_build_failure.run(builds[0].id)
+    first = db.query(FixAttempt).filter(FixAttempt.build_id == builds[0].id).one()
+    fix_handlers.apply_fix_attempt(db, first)
+    db.commit()
+    
+    fix_handlers.analyze_build_failure.run(builds[1].id)
+    db.expire_all()
+    second = db.query(FixAttempt).filter(FixAttempt.build_id == builds[1].id).one()
+    fingerprint = db.query(FailureFingerprint).one()
+    
+    assert fingerprint.occurrences == 2
+    assert fingerprint.fixed_count == 1
+    assert fingerprint.token == "requests"
+    assert second.analysis_result["known_fix_attempt_id"] == first.id
+    assert second.confidence_score == fix_handlers.KNOWN_FIX_CONFIDENCE
+    assert second.fix_suggestion == first.fix_suggestion
+
+
+def test_failure_fingerprint_upsert_and_cross_repo(db):
+    """اختبار upsert البصمات مع قراءة قديمة، وعدم رفع الثقة لإصلاح من مستودع آخر"""
+    from app.analysis.fingerprint import fingerprint_pattern
+    from app.models.build import Build
+    from app.models.failure_fingerprint import FailureFingerprint
+    from app.models.fix_attempt import FixAttempt
+    from app.models.repository import Repository
+    from app.tasks import fix_handlers
+    
+    db.add(Repository(owner="owner", name="repo", full_name="owner/repo", github_repo_id=1))
+    db.add(Repository(owner="owner", name="other", full_name="owner/other", github_repo_id=2))
+    build = Build(repository_id=1, integration_id=1, branch="main", status="failed")
+    other_build = Build(repository_id=2, integration_id=1, branch="main", status="failed")
+    db.add_all([build, other_build])
+    db.commit()
+    
+    patterns = fix_handlers.analyze_error_patterns("SyntaxError: invalid syntax")
+    parts = fingerprint_pattern(patterns[0])
+    patterns[0]["fingerprint"] = parts["fingerprint"]
+    fingerprints = {parts["fingerprint"]: parts}
+    
+    # تحليلان متزامنان لم يجدا البصمة: الثاني يزيد العداد بدلاً من تعارض القيد الفريد
+    fix_handlers.record_fingerprints(db, build, patterns, fingerprints, {})
+    fix_handlers.record_fingerprints(db, build, patterns, fingerprints, {})
+    db.commit()
+    row = db.query(FailureFingerprint).one()
+    assert row.occurrences == 2
+    
+    row.record_fix(1)
+    db.commit()
+    
+    known = FailureFingerprint.lookup(db, other_build.repository_id, list(fingerprints))
+    fix_handlers.create_fix_attempts(db, other_build, patterns, known)
+    fix_handlers.record_fingerprints(db, other_build, patterns, fingerprints, known)
+    db.commit()
+    
+    attempt = db.query(FixAttempt).filter(FixAttempt.build_id == other_build.id).one()
+    assert attempt.confidence_score == patterns[0]["confidence"] == 70
+    assert attempt.requires_approval is True
+    assert "known_fix_attempt_id" not in attempt.analysis_result
+    assert attempt.fix_suggestion == row.fix_suggestion
+    assert db.query(FailureFingerprint).filter(FailureFingerprint.repository_id == 2).one().occurrences == 1
+
+
+def test_create_fix_attempts_bulk(db, count_queries):
+    """اختبار إنشاء محاولات الإصلاح باستعلامين مهما كان عدد الأخطاء المكتشفة"""
+    from app.models.build import Build
+    from app.models.fix_attempt import FixAttempt
+    from app.tasks.fix_handlers import analyze_error_patterns, create_fix_attempts
+    
+    build = Build(repository_id=1, integration_id=1, branch="main", status="failed")
+    db.add(build)
+    db.commit()
+    
+    logs = "\n".join(
+        [f"ModuleNotFoundError: No module named 'pkg{i}'" for i in range(200)] + ["Gradle sync failed"]
+    )
+    patterns = analyze_error_patterns(logs)
+    db.refresh(build)
+    
+    with count_queries(engine) as counter:
+        created = create_fix_attempts(db, build, patterns)
+    db.commit()
+    
+    assert created == 2
+    assert counter.count == 2
+    assert {a.error_pattern for a in db.query(FixAttempt).all()} == {"missing_python_package", "gradle_sync_failed"}
+    
+    # إعادة التحليل لا تنشئ محاولات مكررة
+    assert create_fix_attempts(db, build, patterns) == 0
+
+
+def test_task_dispatcher_outbox_fallback(db, monkeypatch):
+    """اختبار حفظ المهمة في الصندوق الصادر عند بطء الـ broker ثم إعادة إرسالها"""
+    import asyncio
+    import time
+    from app import dispatch
+    from app.models.task_outbox import TaskOutbox
+    from app.tasks.github_handlers import process_github_event
+    
+    sent = []
+    broker = {"down": True}
+    
+    def fake_publish(task_name, args, kwargs, task_id):
+        if broker["down"]:
+            time.sleep(0.3)
+            raise ConnectionError("broker down")
+        sent.append((task_name, args, task_id))
+    
+    monkeypatch.setattr(dispatch, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(dispatch, "publish_task", fake_publish)
+    monkeypatch.setattr(dispatch.settings, "task_outbox_relay_interval_seconds", 0)
+    
+    dispatcher = dispatch.TaskDispatcher(timeout=0.05)
+    
+    async def run():
+        started = time.perf_counter()
+        task_id = await dispatcher.dispatch(process_github_event, {"event_type": "push"})
+        return task_id, time.perf_counter() - started
+    
+    task_id, elapsed = asyncio.run(run())
+    assert elapsed < 0.3
+    assert db.query(TaskOutbox).filter(TaskOutbox.task_id == task_id).count() == 1
+    
+    broker["down"] = False
+    assert dispatch.relay_outbox() == (1, 0)
+    assert sent == [(process_github_event.name, [{"event_type": "push"}], task_id)]
+    db.expire_all()
+    assert db.query(TaskOutbox).count() == 0
+
+
+def test_push_debounce_builds_latest_commit(db, monkeypatch):
+    """اختبار تجميع دفعات push: يُبنى آخر commit فقط وتُلغى عمليات البناء المعلقة الأقدم"""
+    from app.models import Repository, Integration, Build
+    from app.tasks import github_handlers
+    
+    repo = Repository(owner="owner", name="repo", full_name="owner/repo", github_repo_id=1)
+    db.add(repo)
+    db.commit()
+    integration = Integration(repository_id=repo.id, platform="github_actions")
+    db.add(integration)
+    db.commit()
+    
+    triggered = []
+    latest = {"sequence": 2}
+    monkeypatch.setattr(github_handlers.trigger_build, "delay", triggered.append)
+    monkeypatch.setattr(github_handlers, "publish_build_status", lambda build: None)
+    monkeypatch.setattr(
+        github_handlers, "is_latest_push", lambda repo_id, branch, sequence: sequence == latest["sequence"]
+    )
+    
+    # push قديم تجاوزه push أحدث خلال نافذة التجميع
+    github_handlers.process_push_event(db, repo, {"branch": "main", "after": "aaa", "push_sequence": 1})
+    assert triggered == []
+    
+    stale = Build(repository_id=repo.id, integration_id=integration.id, branch="main",
+                  trigger_type="push", status="pending")
+    db.add(stale)
+    db.commit()
+    
+    github_handlers.process_push_event(db, repo, {"branch": "main", "after": "bbb", "push_sequence": 2})
+    
+    db.refresh(stale)
+    build = db.query(Build).filter(Build.commit_sha == "bbb").one()
+    assert stale.status == "cancelled"
+    assert build.status == "pending"
+    assert triggered == [build.id]
+    
+    # مهمة trigger_build التي أرسلها الـ push القديم ما زالت في الطابور: لا تعيد تشغيل الملغاة
+    from app.tasks import build_handlers
+    monkeypatch.setattr(build_handlers, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(build_handlers, "publish_build_status", lambda build: None)
+    monkeypatch.setattr(build_handlers.trigger_build, "update_state", lambda *args, **kwargs: None)
+    monkeypatch.setattr(build_handlers, "trigger_github_actions_build",
+                        lambda build, integration: {"status": "success", "platform_build_id": "gh-1"})
+    
+    assert build_handlers.trigger_build.run(stale.id) == {"status": "skipped", "build_status": "cancelled"}
+    assert build_handlers.trigger_build.run(build.id)["status"] == "success"
+    
+    db.expire_all()
+    assert db.get(Build, stale.id).status == "cancelled"
+    assert db.get(Build, stale.id).started_at is None
+    assert db.get(Build, build.id).status == "success"
+
+
+def test_webhook_inbox_batch_routing(db, monkeypatch):
+    """اختبار معالجة دفعة من صندوق وارد الـ webhooks باستعلام مستودعات واحد وإدراج سجلات واحد"""
+    import json
+    from app.models import Repository, AuditLog
+    from app.tasks import github_handlers
+    
+    db.add(Repository(owner="owner", name="repo", full_name="owner/repo", github_repo_id=1, auto_fix_enabled=True))
+    db.commit()
+    
+    sent = []
+    monkeypatch.setattr(github_handlers.process_github_event, "apply_async",
+                        lambda args, countdown=None: sent.append((args[0], countdown)))
+    monkeypatch.setattr(github_handlers, "next_push_sequence", lambda repo_id, branch: 7)
+    
+    def entry(event_type, payload, entry_id):
+        body = payload if isinstance(payload, str) else json.dumps(payload)
+        return (entry_id, {"event_type": event_type, "delivery_id": entry_id, "body": body})
+    
+    entries = [
+        entry("push", {"ref": "refs/heads/main", "after": "abc", "commits": [{"id": "abc"}],
+                       "repository": {"full_name": "owner/repo"}}, "1700000000000-0"),
+        entry("push", {"ref": "refs/heads/main", "repository": {"full_name": "other/repo"}}, "1700000000001-0"),
+        entry("issues", {"action": "opened", "issue": {"number": 3}, "repository": {"full_name": "owner/repo"}},
+              "1700000000002-0"),
+        entry("push", "{not json", "1700000000003-0"),
+    ]
+    
+    result = github_handlers.process_webhook_batch(db, entries)
+    
+    assert result == {"events": 3, "tasks": 1, "audit_rows": 7}
+    assert sent == [({
+        "event_type": "push", "repository_id": 1, "branch": "main", "commits": [{"id": "abc"}],
+        "after": "abc", "push_sequence": 7, "action": "trigger_build"
+    }, github_handlers.settings.push_debounce_seconds)]
+    
+    actions = [log.action for log in db.query(AuditLog).order_by(AuditLog.id).all()]
+    assert actions.count("webhook_received") == 3
+    assert {"push_received", "push_received_unregistered_repo", "issue_received", "webhook_error"} <= set(actions)
+
+
+def test_webhook_inbox_keeps_unacked_entries(monkeypatch):
+    """اختبار عدم قص صندوق الوارد: الرسائل غير المؤكدة تبقى وتظهر في التنبيه"""
+    import asyncio
+    import fakeredis
+    from app.github import inbox
+    
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(inbox, "get_redis", lambda: fakeredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(inbox, "get_async_redis", lambda: fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(inbox.settings, "webhook_inbox_alert_length", 3)
+    
+    async def append_all():
+        return [await inbox.append_delivery("push", f"d{i}", b"{}") for i in range(5)]
+    
+    ids = asyncio.run(append_all())
+    entries = inbox.read_inbox("worker", count=2)
+    assert [entry_id for entry_id, _ in entries] == ids[:2]
+    
+    stats = asyncio.run(inbox.get_inbox_stats())
+    assert stats["length"] == 5
+    assert stats["pending"] == 2
+    assert stats["backlogged"] is True
+    
+    inbox.ack_inbox(ids[:2])
+    stats = asyncio.run(inbox.get_inbox_stats())
+    assert stats["length"] == 3
+    assert stats["pending"] == 0
+
+
+def test_engine_options_pool_settings(monkeypatch):
+    """اختبار إعدادات الـ pool ومهلة الاستعلام لكل نوع قاعدة بيانات"""
+    from app import models
+    
+    monkeypatch.setattr(models.settings, "database_pool_size", 5)
+    monkeypatch.setattr(models.settings, "database_max_overflow", 2)
+    monkeypatch.setattr(models.settings, "database_statement_timeout_ms", 1500)
+    
+    sync_options = models.engine_options("postgresql://user:pass@db/app")
+    assert sync_options["pool_size"] == 5
+    assert sync_options["max_overflow"] == 2
+    assert sync_options["connect_args"] == {"options": "-c statement_timeout=1500"}
+    assert sync_options["echo"] is False
+    
+    async_options = models.engine_options("postgresql+asyncpg://user:pass@db/app")
+    assert async_options["connect_args"] == {"server_settings": {"statement_timeout": "1500"}}
+    
+    sqlite_options = models.engine_options("sqlite:///./test.db")
+    assert "pool_size" not in sqlite_options and "connect_args" not in sqlite_options
+    
+    stats = models.get_pool_stats()
+    assert {"sync", "async"} <= set(stats)
+    assert all("status" in info for info in stats.values())
+
+
+def test_health_monitor_cached_status(monkeypatch):
+    """اختبار أن /api/health يقرأ آخر نتيجة محفوظة بدون فحص المكونات في كل طلب"""
+    import asyncio
+    from app import health_monitor as monitor_module
+    
+    calls = {"database": 0, "redis": 0}
+    
+    async def fake_database():
+        calls["database"] += 1
+        return {"pool": {}}
+    
+    async def fake_redis():
+        calls["redis"] += 1
+        raise ConnectionError("redis down")
+    
+    monkeypatch.setattr(monitor_module, "check_database", fake_database)
+    monkeypatch.setattr(monitor_module, "check_redis", fake_redis)
+    
+    monitor = monitor_module.HealthMonitor(interval=60)
+    assert monitor.get_status()["stale"] is True
+    
+    asyncio.run(monitor.refresh())
+    for _ in range(5):
+        status = monitor.get_status()
+    
+    assert calls == {"database": 1, "redis": 1}
+    assert status["stale"] is False
+    assert status["status"] == "degraded"
+    assert status["components"]["database"]["healthy"] is True
+    assert status["components"]["redis"]["error"] == "redis down"
+
+
+def test_migrations_match_models(tmp_path):
+    """اختبار أن الـ migrations تنشئ نفس مخطط النماذج، وأن قاعدة create_all القديمة تُسجل ثم تُحدّث"""
+    from alembic.autogenerate import compare_metadata
+    from alembic.migration import MigrationContext
+    from app.models.database import run_migrations, get_schema_revision
+    
+    migrated = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    assert get_schema_revision(bind=migrated)["up_to_date"] is False
+    run_migrations(bind=migrated)
+    assert get_schema_revision(bind=migrated)["up_to_date"] is True
+    with migrated.connect() as conn:
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+    
+    legacy = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(bind=legacy)
+    with legacy.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_builds_status_created_at")
+    run_migrations(bind=legacy)
+    assert get_schema_revision(bind=legacy)["up_to_date"] is True
+    with legacy.connect() as conn:
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+
+
+def test_purge_audit_logs_retention(db, monkeypatch):
+    """اختبار حذف سجلات المراجعة الأقدم من log_retention_days على دفعات وحساب نطاقات الـ partitions"""
+    from datetime import date, datetime, timedelta
+    from sqlalchemy import insert
+    from app import audit_partitions
+    from app.models.audit_log import AuditLog
+    
+    now = datetime.utcnow()
+    rows = [
+        AuditLog.build_row(actor_type="system", action="webhook_received", timestamp=now - timedelta(days=age))
+        for age in (1, 5, 40, 45, 90)
+    ]
+    db.execute(insert(AuditLog.__table__), rows)
+    db.commit()
+    
+    monkeypatch.setattr(audit_partitions.settings, "audit_log_purge_batch_size", 2)
+    result = audit_partitions.purge_audit_logs(db, retention_days=30)
+    
+    assert result["partitioned"] is False
+    assert result["deleted_rows"] == 3
+    assert db.query(AuditLog).count() == 2
+    
+    assert audit_partitions.partition_name(date(2025, 12, 1), "month") == "audit_logs_p202512"
+    assert audit_partitions.partition_bounds("audit_logs_p202512") == (date(2025, 12, 1), date(2026, 1, 1))
+    assert audit_partitions.partition_bounds("audit_logs_p20251231") == (date(2025, 12, 31), date(2026, 1, 1))
+    assert audit_partitions.partition_bounds("audit_logs_default") is None
+
+
+def test_rate_limiter_client_ip(monkeypatch):
+    """اختبار أن X-Forwarded-For يُقبل فقط من proxy موثوق (أقرب عنوان غير موثوق من اليمين) في rate limiter والسجلات"""
+    from app.middleware import rate_limiter
+    
+    def scope(peer, forwarded_for=None):
+        headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+        return {"client": (peer, 12345), "headers": headers}
+    
+    limiter = rate_limiter.RateLimitMiddleware(app=None)
+    assert limiter.get_client_ip(scope("203.0.113.7", "1.1.1.1")) == "203.0.113.7"
+    
+    monkeypatch.setattr(rate_limiter.settings, "trusted_proxies", ["10.0.0.0/8", "not-an-ip"])
+    limiter = rate_limiter.RateLimitMiddleware(app=None)
+    # العميل زوّر 1.1.1.1، والـ proxy أضاف عنوانه الحقيقي 198.51.100.4 ثم proxy داخلي
+    assert limiter.get_client_ip(scope("10.0.0.1", "1.1.1.1, 198.51.100.4, 10.0.0.2")) == "198.51.100.4"
+    assert limiter.get_client_ip(scope("10.0.0.1")) == "10.0.0.1"
+    assert limiter.get_client_ip(scope("203.0.113.7", "1.1.1.1")) == "203.0.113.7"
+    
+    # سجلات الطلبات تستخدم نفس القواعد
+    from fastapi import Request
+    from app.middleware.logging import LoggingMiddleware
+    logging_middleware = LoggingMiddleware(app=None)
+    assert logging_middleware.get_client_ip(Request(dict(scope("203.0.113.7", "1.1.1.1"), type="http"))) == "203.0.113.7"
+    assert logging_middleware.get_client_ip(
+        Request(dict(scope("10.0.0.1", "1.1.1.1, 198.51.100.4"), type="http"))
+    ) == "198.51.100.4"
+
+
+def test_rate_limiter_sliding_window_and_leases(monkeypatch):
+    """اختبار نص Lua للنافذة المنزلقة وحجز الرموز على fakeredis"""
+    import asyncio
+    import time
+    import fakeredis
+    from app.middleware import rate_limiter
+    
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    limiter = rate_limiter.RateLimitMiddleware(app=None, redis=redis)
+    limiter.hourly_limit = 5
+    limiter.daily_limit = 100
+    limiter.lease_max = 4
+    limiter.lease_ttl = 60
+    
+    acquired = []
+    original_acquire = limiter.acquire
+    
+    async def counting_acquire(*args):
+        result = await original_acquire(*args)
+        acquired.append(result[0])
+        return result
+    
+    monkeypatch.setattr(limiter, "acquire", counting_acquire)
+    
+    async def scenario():
+        results = [await limiter.apply_limits("198.51.100.4", "default", 1) for _ in range(6)]
+        
+        # النافذة السابقة تُحسب بوزن الجزء المتبقي منها
+        now = 3600 * 1000 + 1800
+        await redis.set(f"ratelimit:builds:1.2.3.4:hour:{int(now // 3600) - 1}", 8)
+        granted, retry_after = await original_acquire("builds", "1.2.3.4", 1, 10, now)
+        return results, granted, retry_after
+    
+    results, granted, retry_after = asyncio.run(scenario())
+    
+    # 5 طلبات مسموحة من 3 رحلات إلى Redis (دفعات 1 ثم 2 ثم 4 لا يتبقى منها إلا 2)
+    assert [allowed for allowed, _ in results] == [True] * 5 + [False]
+    assert results[-1][1] >= 1
+    assert acquired == [1, 2, 2, 0]
+    # 8 * 0.5 = 4 من النافذة السابقة، يبقى 1 من 5
+    assert (granted, retry_after) == (1, 1)
+
+
+def test_build_events_publish_and_subscribe(monkeypatch):
+    """اختبار تنسيق أحداث SSE والنشر غير المتزامن والاشتراك في قناة البناء"""
+    import asyncio
+    import fakeredis
+    from app import events
+    
+    assert events.format_sse("log", {"text": "a\nb"}, "logs:3") == 'id: logs:3\nevent: log\ndata: {"text": "a\\nb"}\n\n'
+    assert events.parse_log_event_id("errors:120") == ("errors", 120)
+    assert events.parse_log_event_id("42") == ("logs", 42)
+    assert events.parse_log_event_id("bad") is None
+    
+    data = events.log_chunk_data(10, b"x" * (events.MAX_LOG_EVENT_BYTES + 5))
+    assert data["truncated"] is True
+    assert events.log_event_id(data) == f"logs:{10 + events.MAX_LOG_EVENT_BYTES + 5}"
+    
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(events, "get_async_redis", lambda: redis)
+    
+    async def scenario():
+        pubsub = await events.open_build_subscription(7)
+        await events.publish_log_chunk_async(7, 0, b"hello\n")
+        received = []
+        async for message in events.iter_build_events(pubsub, keepalive_seconds=0.1):
+            if message is not None:
+                received.append(message)
+                break
+        return received
+    
+    received = asyncio.run(scenario())
+    assert received == [{
+        "event": "log",
+        "build_id": 7,
+        "data": {"stream": "logs", "offset": 0, "size": 6, "text": "hello\n", "truncated": False}
+    }]
+
+
+def test_monitor_build_status_publishes_logs(db, monkeypatch):
+    """اختبار نشر أسطر اللوج قبل الحالة النهائية لعمليات البناء المراقبة من المنصة"""
+    from app import events
+    from app.models import Repository, Integration, Build
+    from app.tasks import build_handlers
+    
+    db.add(Repository(owner="owner", name="repo", full_name="owner/repo", github_repo_id=1))
+    db.add(Integration(repository_id=1, platform="github_actions"))
+    build = Build(repository_id=1, integration_id=1, branch="main", status="running")
+    db.add(build)
+    db.commit()
+    
+    published = []
+    monkeypatch.setattr(events, "publish_build_event", lambda build_id, event, data: published.append((event, data)))
+    monkeypatch.setattr(build_handlers, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(build_handlers, "check_github_actions_status",
+                        lambda build: {"status": "success", "logs": "step 1\nstep 2\n"})
+    
+    build_handlers.monitor_build_status.run(build.id)
+    
+    assert [event for event, _ in published] == ["log", "status"]
+    assert published[0][1] == {"stream": "logs", "offset": 0, "size": 14, "text": "step 1\nstep 2\n", "truncated": False}
+    assert published[1][1]["status"] == "success"
+
+
+def test_build_events_replay_after_reconnect(client, db, monkeypatch):
+    """اختبار إعادة إرسال أسطر اللوج الفائتة من Last-Event-ID"""
+    import fakeredis
+    from app import events
+    from app.log_store import write_log
+    from app.models.build import Build
+    from app.models.repository import Repository
+    
+    monkeypatch.setattr(events, "get_async_redis", lambda: fakeredis.FakeAsyncRedis(decode_responses=True))
+    monkeypatch.setattr(events, "MAX_LOG_EVENT_BYTES", 4)
+    
+    db.add(Repository(owner="owner", name="repo", full_name="owner/repo", github_repo_id=1))
+    build = Build(repository_id=1, integration_id=1, branch="main", status="success")
+    db.add(build)
+    db.flush()
+    write_log(db, build, "line1\nline2\n")
+    db.commit()
+    
+    response = client.get(f"/api/builds/{build.id}/events", headers={"Last-Event-ID": "logs:6"})
+    assert response.status_code == 200
+    
+    messages = [block for block in response.text.split("\n\n") if block]
+    assert messages[0].startswith("event: status")
+    assert [block.split("\n")[0] for block in messages[1:]] == ["id: logs:10", "id: logs:12"]
+    assert '"text": "line"' in messages[1] and '"text": "2\\n"' in messages[2]
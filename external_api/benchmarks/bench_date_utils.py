@@ -0,0 +1,59 @@
+"""
+日期格式化微基准：对比逐条 strptime 与 date_utils 缓存实现的单条耗时
+
+运行方式:
+    python -m external_api.benchmarks.bench_date_utils
+"""
+
+import random
+import timeit
+from datetime import datetime
+
+from external_api.data_sources.date_utils import clear_date_cache, format_date
+
+# 每个场景: (名称, 输入格式, 生成第 i 个时间戳的函数)
+CASES = [
+    ("twitter", "%a %b %d %H:%M:%S %z %Y", lambda i: f"Thu Mar 13 18:{i % 60:02d}:{i % 7:02d} +0000 2025"),
+    ("pinterest", "%a, %d %b %Y %H:%M:%S %z", lambda i: f"Tue, 04 Mar 2025 12:{i % 60:02d}:{i % 7:02d} +0000"),
+    ("tripadvisor", "%Y-%m-%dT%H:%M:%SZ", lambda i: f"2025-04-24T22:{i % 60:02d}:{i % 7:02d}Z"),
+    ("tripadvisor_photos", "%Y-%m-%dT%H:%M:%S.%fZ", lambda i: f"2021-02-26T00:{i % 60:02d}:50.{i % 1000:03d}Z"),
+]
+
+ITEMS = 10000
+DISTINCT = 500  # 列表中不同时间戳的数量
+REPEAT = 5
+
+
+def strptime_baseline(values, input_format):
+    for value in values:
+        datetime.strptime(value, input_format).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def cached(values, input_format):
+    for value in values:
+        format_date(value, input_format)
+
+
+def run_cold(values, input_format):
+    clear_date_cache()
+    cached(values, input_format)
+
+
+def main():
+    random.seed(0)
+    print(f"{ITEMS} items, {DISTINCT} distinct timestamps, best of {REPEAT}")
+    print(f"{'case':<20}{'strptime':>14}{'cached cold':>14}{'cached warm':>14}{'speedup':>10}")
+    for name, input_format, make in CASES:
+        distinct = [make(i) for i in range(DISTINCT)]
+        values = [random.choice(distinct) for _ in range(ITEMS)]
+
+        baseline = min(timeit.repeat(lambda: strptime_baseline(values, input_format), number=1, repeat=REPEAT))
+        cold = min(timeit.repeat(lambda: run_cold(values, input_format), number=1, repeat=REPEAT))
+        warm = min(timeit.repeat(lambda: cached(values, input_format), number=1, repeat=REPEAT))
+
+        per_item = lambda seconds: f"{seconds / ITEMS * 1e9:,.0f} ns"
+        print(f"{name:<20}{per_item(baseline):>14}{per_item(cold):>14}{per_item(warm):>14}{baseline / cold:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
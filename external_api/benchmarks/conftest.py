@@ -0,0 +1,134 @@
+"""
+数据源解析基准测试的公共 fixture
+
+本地 aiohttp 存根服务器在后台线程中回放 fixtures/ 下录制的上游响应，
+数据源通过 proxy_url 指向该服务器，因此端到端基准只包含本机网络开销和解析开销。
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict
+
+import pytest
+from aiohttp import web
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# (method, path) -> fixture 文件名
+ROUTES = {
+    ("GET", "/search/search"): "twitter_search.json",
+    ("GET", "/stock/v3/get-chart"): "yahoo_chart.json",
+    ("GET", "/api/v1/location/{location_id}/details"): "tripadvisor_location_details.json",
+    ("GET", "/api/v1/location/{location_id}/reviews"): "tripadvisor_reviews.json",
+    ("POST", "/pinterest/pins/advance"): "pinterest_pins.json",
+    ("GET", "/api/v1/hotels/getHotelDetails"): "booking_hotel_detail.json",
+}
+
+
+def load_fixture(name: str) -> Any:
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class StubServer:
+    """在独立线程的事件循环中运行的 aiohttp 存根服务器"""
+
+    def __init__(self):
+        self.url = ""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="benchmark-stub-server", daemon=True)
+        self._runner = None
+
+    def start(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result(timeout=10)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+        self._loop.close()
+
+    async def _start(self):
+        app = web.Application()
+        for (method, path), name in ROUTES.items():
+            # 响应体预先序列化，避免服务端开销计入基准
+            body = json.dumps(load_fixture(name)).encode("utf-8")
+            app.router.add_route(method, path, self._handler(body))
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+
+    @staticmethod
+    def _handler(body: bytes):
+        async def handle(request: web.Request) -> web.Response:
+            return web.Response(body=body, content_type="application/json")
+
+        return handle
+
+
+@pytest.fixture(scope="session")
+def stub_server():
+    server = StubServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def source_config(stub_server) -> Dict[str, Any]:
+    from external_api.data_sources.client import config
+
+    return {**config, "external_api_proxy_url": stub_server.url}
+
+
+@pytest.fixture
+def event_loop_runner():
+    """在同一个事件循环中重复执行协程，避免每轮都创建事件循环"""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+def run_benchmark(benchmark, func: Callable[[], Any], items: Callable[[Any], int]) -> Any:
+    """运行基准并在 extra_info 中记录内存分配与吞吐量
+
+    内存分配在计时之外单独执行一次并用 tracemalloc 统计，避免追踪开销影响耗时结果。
+
+    Args:
+        benchmark: pytest-benchmark 的 benchmark fixture
+        func: 被测的无参函数
+        items: 从 func 的返回值中取出处理条目数的函数
+
+    Returns:
+        Any: func 最后一次执行的返回值
+    """
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    finally:
+        tracemalloc.stop()
+
+    benchmark.extra_info["items"] = items(result)
+    benchmark.extra_info["alloc_peak_kib"] = round(peak / 1024, 1)
+    benchmark.extra_info["alloc_retained_blocks"] = blocks
+    benchmark.extra_info["traced_call_ms"] = round(elapsed * 1000, 3)
+
+    result = benchmark(func)
+
+    if benchmark.stats is not None:
+        mean = benchmark.stats.stats.mean
+        benchmark.extra_info["items_per_sec"] = round(benchmark.extra_info["items"] / mean, 1) if mean else None
+    return result
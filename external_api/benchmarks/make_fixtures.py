@@ -0,0 +1,265 @@
+"""
+生成基准测试使用的上游响应 fixture
+
+fixture 的结构与各上游 API 的真实响应一致（字段取自线上录制的响应），数据量固定、内容确定，
+以便不同提交之间的基准结果可以直接比较。需要用真实录制替换时，保持文件名不变即可。
+
+运行方式:
+    python -m external_api.benchmarks.make_fixtures
+"""
+
+import json
+import os
+import random
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+TWEETS = 100
+REVIEWS = 50
+PINS = 50
+ROOMS = 20
+BARS = 250
+
+
+def twitter_search():
+    results = []
+    for i in range(TWEETS):
+        results.append(
+            {
+                "tweet_id": str(1903001084357947836 - i * 7919),
+                "creation_date": f"Thu Mar 13 18:{i % 60:02d}:{i % 7:02d} +0000 2025",
+                "text": f"Tesla launch event #{i} was amazing! https://t.co/{i:06d}",
+                "media_urls": [f"https://pbs.twimg.com/media/{i}.jpg"] if i % 3 == 0 else None,
+                "video_urls": None,
+                "user": {
+                    "user_id": str(44196397 + i % 40),
+                    "name": f"User {i % 40}",
+                    "username": f"user{i % 40}",
+                    "follower_count": 1000 + i,
+                    "is_verified": i % 10 == 0,
+                    "is_blue_verified": i % 4 == 0,
+                },
+                "retweet_count": i * 3,
+                "reply_count": i,
+                "favorite_count": i * 11,
+                "quote_count": i % 5,
+                "views": i * 997,
+                "bookmark_count": i % 9,
+            }
+        )
+    return {"results": results, "continuation_token": "DAACCgACGRElMJcAJxAKAAMZESUwlv_Y8AgABAAAAAIAAA"}
+
+
+def yahoo_chart():
+    start = 1704153600  # 2024-01-02
+    timestamps = [start + i * 86400 for i in range(BARS)]
+    prices = [182.15 + (i % 17) * 0.37 for i in range(BARS)]
+    return {
+        "chart": {
+            "result": [
+                {
+                    "meta": {"currency": "USD", "symbol": "AAPL", "exchangeName": "NMS", "dataGranularity": "1d"},
+                    "timestamp": timestamps,
+                    "indicators": {
+                        "quote": [
+                            {
+                                "open": prices,
+                                "high": [p + 1.2 for p in prices],
+                                "low": [p - 0.9 for p in prices],
+                                "close": [p + 0.3 for p in prices],
+                                "volume": [32456789 + i * 1013 for i in range(BARS)],
+                            }
+                        ],
+                        "adjclose": [{"adjclose": [p + 0.3 for p in prices]}],
+                    },
+                }
+            ],
+            "error": None,
+        }
+    }
+
+
+def tripadvisor_location_details():
+    return {
+        "location_id": "13189438",
+        "name": "Sample Hotel",
+        "description": "A quiet hotel close to the old town. " * 10,
+        "web_url": "https://www.tripadvisor.com/Hotel_Review-g1-d13189438",
+        "address_obj": {
+            "street1": "1 Sample Street",
+            "city": "Macau",
+            "state": "",
+            "country": "China",
+            "postalcode": "999078",
+            "address_string": "1 Sample Street, Macau China",
+        },
+        "ancestors": [{"level": level, "name": f"{level} name", "location_id": str(i)} for i, level in enumerate(["City", "Region", "Country"])],
+        "latitude": "22.08",
+        "longitude": "113.49",
+        "timezone": "Asia/Macau",
+        "phone": "+853 0000 0000",
+        "ranking_data": {
+            "geo_location_id": "664891",
+            "ranking_string": "#3 of 120 hotels in Macau",
+            "geo_location_name": "Macau",
+            "ranking_out_of": "120",
+            "ranking": "3",
+        },
+        "rating": "4.5",
+        "num_reviews": "2450",
+        "review_rating_count": {str(i): str(100 * i) for i in range(1, 6)},
+        "subratings": {
+            str(i): {"name": f"rate_{name}", "localized_name": name.title(), "value": "4.5"}
+            for i, name in enumerate(["location", "sleep", "room", "service", "value", "cleanliness"])
+        },
+        "photo_count": "1200",
+        "see_all_photos": "https://www.tripadvisor.com/Hotel_Review-g1-d13189438#photos",
+        "price_level": "$$$",
+        "amenities": [f"Amenity {i}" for i in range(60)],
+        "category": {"name": "hotel", "localized_name": "Hotel"},
+        "subcategory": [{"name": "hotel", "localized_name": "Hotel"}],
+        "styles": ["Family", "Business"],
+        "neighborhood_info": [],
+        "trip_types": [{"name": name, "localized_name": name.title(), "value": "120"} for name in ["business", "couples", "solo", "family", "friends"]],
+        "awards": [{"award_type": "Travelers Choice", "year": str(2015 + i)} for i in range(8)],
+    }
+
+
+def tripadvisor_reviews():
+    data = []
+    for i in range(REVIEWS):
+        data.append(
+            {
+                "id": 900000000 + i,
+                "lang": "en",
+                "location_id": 13189438,
+                "published_date": f"2025-04-{1 + i % 28:02d}T22:29:{i % 60:02d}Z",
+                "rating": 1 + i % 5,
+                "helpful_votes": i % 7,
+                "url": f"https://www.tripadvisor.com/ShowUserReviews-d13189438-r{900000000 + i}",
+                "text": "Great stay, friendly staff and clean rooms. " * 5,
+                "title": f"Review {i}",
+                "trip_type": "Couples",
+                "travel_date": "2025-03",
+                "user": {"username": f"traveler{i}", "avatar": {"original": f"https://media-cdn.tripadvisor.com/avatar/{i}.jpg"}},
+                "subratings": {
+                    str(k): {"name": f"RATE_{k}", "value": 4, "localized_name": f"Rating {k}"} for k in range(4)
+                },
+                "owner_response": {
+                    "id": 100000 + i,
+                    "title": "Response from management",
+                    "text": "Thank you for your review!",
+                    "lang": "en",
+                    "author": "Manager",
+                    "published_date": f"2025-04-{1 + i % 28:02d}T23:00:00Z",
+                },
+            }
+        )
+    return {"data": data}
+
+
+def pinterest_pins():
+    data = []
+    for i in range(PINS):
+        pin = {
+            "id": str(5559199536733192 + i),
+            "title": f"cat {i}",
+            "description": "A very cute cat " * 3,
+            "alt_text": "cat",
+            "auto_alt_text": "a cat sitting on a sofa",
+            "images": {"orig": {"url": f"https://i.pinimg.com/originals/{i}.jpg", "width": 736, "height": 1104}},
+            "reaction_counts": {"1": 600 + i},
+            "pinner": {
+                "id": str(750412494069279813 + i % 10),
+                "image_large_url": f"https://i.pinimg.com/140x140_RS/{i % 10}.jpg",
+                "follower_count": 2379 + i,
+                "username": f"pinner{i % 10}",
+                "full_name": f"Pinner {i % 10}",
+            },
+        }
+        if i % 4 == 0:
+            pin["videos"] = {
+                "video_list": {
+                    "V_HLSV4": {"url": f"https://v1.pinimg.com/videos/{i}.m3u8", "duration": 7000},
+                    "V_720P": {"url": f"https://v1.pinimg.com/videos/{i}.mp4", "duration": 7000},
+                }
+            }
+        data.append(pin)
+    return {"data": data, "nextPageCursor": "Y2JVSG81V2sxcmNHRlpWM1J5"}
+
+
+def booking_hotel_detail():
+    rooms = {}
+    for i in range(ROOMS):
+        rooms[str(19160501 + i)] = {
+            "photos": [{"url_max1280": f"https://cf.bstatic.com/xdata/images/hotel/max1280/{i}_{k}.jpg"} for k in range(8)],
+            "children_and_beds_text": {
+                "allow_children": 1,
+                "cribs_and_extra_beds": [{"text": "Cribs are available on request."}],
+                "children_at_the_property": [{"text": "Children of all ages are welcome."}, {"text": ""}],
+            },
+            "description": "Air-conditioned room with a flat-screen TV. " * 4,
+            "bed_configurations": [
+                {"bed_types": [{"name_with_count": "2 twin beds", "description": "90-130 cm wide"}, {"name_with_count": "1 sofa bed", "description": ""}]}
+            ],
+        }
+    return {
+        "status": True,
+        "message": "Success",
+        "data": {
+            "hotel_id": 191605,
+            "hotel_name": "Sample Hotel",
+            "url": "https://www.booking.com/hotel/in/sample.html",
+            "review_nr": 2450,
+            "raw_data": {"reviewScore": 8.4},
+            "arrival_date": "2025-04-26",
+            "departure_date": "2025-04-27",
+            "latitude": 19.07,
+            "longitude": 72.87,
+            "address": "1 Sample Road",
+            "city": "Mumbai",
+            "district": "Andheri",
+            "countrycode": "in",
+            "country_trans": "India",
+            "currency_code": "INR",
+            "zip": "400059",
+            "timezone": "Asia/Kolkata",
+            "soldout": 0,
+            "available_rooms": 7,
+            "max_rooms_in_reservation": 7,
+            "average_room_size_for_ufi_m2": "14.07",
+            "is_family_friendly": 0,
+            "is_closed": 0,
+            "is_cash_accepted_check_enabled": 1,
+            "hotel_include_breakfast": 1,
+            "family_facilities": ["Family rooms"],
+            "facilities_block": {"facilities": [{"name": f"Facility {i}"} for i in range(40)]},
+            "spoken_languages": ["en-gb", "hi"],
+            "hotel_important_information_with_codes": [{"phrase": f"Notice {i}"} for i in range(6)],
+            "rooms": rooms,
+        },
+    }
+
+
+FIXTURES = {
+    "twitter_search.json": twitter_search,
+    "yahoo_chart.json": yahoo_chart,
+    "tripadvisor_location_details.json": tripadvisor_location_details,
+    "tripadvisor_reviews.json": tripadvisor_reviews,
+    "pinterest_pins.json": pinterest_pins,
+    "booking_hotel_detail.json": booking_hotel_detail,
+}
+
+
+def main():
+    random.seed(0)
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for name, build in FIXTURES.items():
+        path = os.path.join(FIXTURES_DIR, name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(build(), f, ensure_ascii=False, indent=1)
+        print(f"wrote {path} ({os.path.getsize(path) // 1024} KiB)")
+
+
+if __name__ == "__main__":
+    main()
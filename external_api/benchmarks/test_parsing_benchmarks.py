@@ -0,0 +1,94 @@
+"""
+数据源解析路径的基准测试
+
+运行方式（在仓库根目录）:
+    python -m pytest external_api/benchmarks --benchmark-only
+保存基线并在之后的提交中对比，平均耗时退化超过 10% 即失败:
+    python -m pytest external_api/benchmarks --benchmark-only --benchmark-autosave
+    python -m pytest external_api/benchmarks --benchmark-only --benchmark-compare --benchmark-compare-fail=mean:10%
+
+extra_info 中记录了每次调用处理的条目数 (items)、吞吐量 (items_per_sec)
+以及 tracemalloc 统计的峰值内存 (alloc_peak_kib) 和调用结束后仍存活的分配块数 (alloc_retained_blocks)。
+fixture 由 make_fixtures.py 生成。
+"""
+
+import pytest
+
+from external_api.benchmarks.conftest import load_fixture, run_benchmark
+from external_api.data_sources.booking_source import BookingSource
+from external_api.data_sources.date_utils import clear_date_cache
+from external_api.data_sources.pinterest_source import PinterestSource
+from external_api.data_sources.tripadvisor_source import TripAdvisorSource
+from external_api.data_sources.twitter_source import TwitterSource
+from external_api.data_sources.yahoo_source import YahooFinanceSource
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.fixture(autouse=True)
+def _cold_date_cache():
+    # 每个基准从空的日期缓存开始，结果不受执行顺序影响
+    clear_date_cache()
+    yield
+
+
+def test_booking_parse_hotel_detail(benchmark, source_config):
+    source = BookingSource(source_config)
+    data = load_fixture("booking_hotel_detail.json")["data"]
+
+    result = run_benchmark(benchmark, lambda: source._parse_hotel_detail(data), lambda detail: len(detail["data"]["rooms"]))
+
+    assert len(result["data"]["rooms"]) == len(data["rooms"])
+
+
+def test_tripadvisor_parse_location_details(benchmark, source_config):
+    source = TripAdvisorSource(source_config)
+    data = load_fixture("tripadvisor_location_details.json")
+
+    result = run_benchmark(benchmark, lambda: source._parse_location_details(data), lambda details: 1)
+
+    assert result["location_id"] == data["location_id"]
+
+
+def test_tripadvisor_parse_reviews(benchmark, source_config):
+    source = TripAdvisorSource(source_config)
+    data = load_fixture("tripadvisor_reviews.json")
+
+    result = run_benchmark(benchmark, lambda: source._parse_reviews(data), len)
+
+    assert len(result) == len(data["data"])
+
+
+def test_pinterest_parse_pins(benchmark, source_config):
+    source = PinterestSource(source_config)
+    data = load_fixture("pinterest_pins.json")
+
+    result = run_benchmark(benchmark, lambda: source._parse_pins(data), len)
+
+    assert len(result) == len(data["data"])
+
+
+def test_twitter_search_tweets_end_to_end(benchmark, source_config, event_loop_runner):
+    source = TwitterSource(source_config)
+
+    result = run_benchmark(
+        benchmark,
+        lambda: event_loop_runner(source.search_tweets("Tesla", limit=100)),
+        lambda response: response["data"]["count"],
+    )
+
+    assert result["success"], result.get("error")
+    assert result["data"]["count"] == len(load_fixture("twitter_search.json")["results"])
+
+
+def test_yahoo_get_stock_price_end_to_end(benchmark, source_config, event_loop_runner):
+    source = YahooFinanceSource(source_config)
+
+    result = run_benchmark(
+        benchmark,
+        lambda: event_loop_runner(source.get_stock_price("AAPL", "2024-01-02", "2024-12-31")),
+        lambda response: len(response["data"]["prices"]),
+    )
+
+    assert result["success"], result.get("error")
+    assert len(result["data"]["prices"]) == len(load_fixture("yahoo_chart.json")["chart"]["result"][0]["timestamp"])
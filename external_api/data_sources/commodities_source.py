@@ -5,7 +5,7 @@ Commodities data source implementation
 import asyncio
 import json
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import aiohttp
 
@@ -17,6 +17,10 @@ logger = logging.getLogger("commodities_source")
 class CommoditiesSource(BaseAPI):
     """Commodity price data source"""
 
+    # Upper bound of symbols the upstream /v1/market-data endpoint accepts in one call
+    MAX_SYMBOLS_PER_REQUEST = 10
+    PRICE_FIELDS = ("open", "high", "low", "prev", "current")
+
     def __init__(self, config: Dict[str, Any], proxy_url: Optional[str] = None):
         """Initialize Commodities price data source
 
@@ -165,27 +169,9 @@ class CommoditiesSource(BaseAPI):
         #     ...     print(f"Failed to get commodity price: {result['error']}")
         # """
         try:
-            # Build query parameters
-            params = {"symbols": commodity_code, "base": currency_code}
-
-            request_url = f"{self.proxy_url}/v1/market-data"
-
             # Send request using aiohttp
             async with aiohttp.ClientSession(trust_env=True) as session:
-                async with session.get(request_url, headers=self._headers, params=params, timeout=self._timeout) as response:
-                    response.raise_for_status()
-
-                    # Parse the response
-                    data = await response.json(content_type=None)
-
-            if isinstance(data, str):
-                data = json.loads(data)
-
-            if not isinstance(data, dict):
-                raise ValueError(f"Invalid API response format: {data}")
-
-            if not data.get("success", False):
-                raise ValueError(f"API response failed: {data}")
+                data = await self._fetch_market_data(session, commodity_code, currency_code)
 
             return {"success": True, "data": {"base_currency": data.get("base_currency", ""), "rates": data.get("rates", {})}}
 
@@ -203,6 +189,130 @@ class CommoditiesSource(BaseAPI):
             logger.exception(e)
             return {"success": False, "error": error_msg}
 
+    async def get_commodities_price_bulk(
+        self,
+        commodity_codes: List[str],
+        currency_codes: Optional[List[str]] = None,
+        max_concurrency: int = 5,
+    ) -> Dict[str, Any]:
+        """
+        Get prices for many commodities and currencies in as few requests as possible.
+
+        Symbols are grouped per currency and packed into batches of at most
+        MAX_SYMBOLS_PER_REQUEST, and the batches are fetched concurrently.
+
+        Args:
+            commodity_codes(List[str]): Commodity codes, e.g. ["COCOA", "CORN", "OIL"], obtained from get_supported_commodities()
+            currency_codes(Optional[List[str]]): Currency codes, e.g. ["USD", "EUR"], default is ["USD"]
+            max_concurrency(int): Maximum number of requests in flight at the same time, default is 5
+
+        Returns:
+            Dict[str, Any]: Dictionary containing the prices in columnar form, one row per (commodity, currency), e.g.
+            {
+                "success": True,               # Whether at least one batch succeeded
+                "data": {
+                    "columns": ["commodity_code", "currency_code", "open", "high", "low", "prev", "current"],
+                    "commodity_code": ["COCOA", "CORN"], # Commodity code of each row
+                    "currency_code": ["USD", "USD"], # Currency code of each row
+                    "open": [9270, 460], # Opening price of each row
+                    "high": [9633, 465], # Highest price of each row
+                    "low": [9201, 455], # Lowest price of each row
+                    "prev": [9288, 458], # Previous day's closing price of each row
+                    "current": [9590, 462], # Current price of each row
+                    "requests": 1, # Number of upstream requests made
+                    "errors": [] # Failed batches, e.g. [{"currency_code": "EUR", "symbols": ["OIL"], "error": "..."}]
+                }
+            }
+        """
+        currencies = self._normalize_codes(currency_codes or ["USD"])
+        symbols = self._normalize_codes(commodity_codes)
+
+        if not symbols:
+            return {"success": False, "error": "No commodity codes provided"}
+
+        batches = [
+            (currency, symbols[i : i + self.MAX_SYMBOLS_PER_REQUEST])
+            for currency in currencies
+            for i in range(0, len(symbols), self.MAX_SYMBOLS_PER_REQUEST)
+        ]
+
+        result: Dict[str, Any] = {"columns": ["commodity_code", "currency_code", *self.PRICE_FIELDS]}
+        for column in result["columns"]:
+            result[column] = []
+        result["requests"] = len(batches)
+        result["errors"] = []
+
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def fetch_batch(session: aiohttp.ClientSession, currency: str, batch: List[str]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._fetch_market_data(session, ",".join(batch), currency)
+
+        connector = aiohttp.TCPConnector(limit=max(1, max_concurrency))
+        async with aiohttp.ClientSession(trust_env=True, connector=connector) as session:
+            responses = await asyncio.gather(
+                *(fetch_batch(session, currency, batch) for currency, batch in batches), return_exceptions=True
+            )
+
+        for (currency, batch), response in zip(batches, responses):
+            if isinstance(response, BaseException):
+                if isinstance(response, asyncio.TimeoutError):
+                    error_msg = f"Request timeout (timeout={self._timeout}s)"
+                elif isinstance(response, aiohttp.ClientError):
+                    error_msg = f"HTTP request error: {str(response)}"
+                else:
+                    error_msg = f"Error occurred while getting commodity price: {str(response)}"
+                logger.error(f"{error_msg} (currency={currency}, symbols={batch})")
+                result["errors"].append({"currency_code": currency, "symbols": batch, "error": error_msg})
+                continue
+
+            rates = response.get("rates", {})
+            for symbol in batch:
+                rate = rates.get(symbol)
+                if not isinstance(rate, dict):
+                    continue
+                result["commodity_code"].append(symbol)
+                result["currency_code"].append(response.get("base_currency") or currency)
+                for field in self.PRICE_FIELDS:
+                    result[field].append(rate.get(field))
+
+        if len(result["errors"]) == len(batches):
+            return {"success": False, "error": result["errors"][0]["error"], "data": result}
+
+        return {"success": True, "data": result}
+
+    async def _fetch_market_data(self, session: aiohttp.ClientSession, symbols: str, currency_code: str) -> Dict[str, Any]:
+        """Request /v1/market-data for a comma separated list of symbols and validate the response"""
+        params = {"symbols": symbols, "base": currency_code}
+        request_url = f"{self.proxy_url}/v1/market-data"
+
+        async with session.get(request_url, headers=self._headers, params=params, timeout=self._timeout) as response:
+            response.raise_for_status()
+
+            # Parse the response
+            data = await response.json(content_type=None)
+
+        if isinstance(data, str):
+            data = json.loads(data)
+
+        if not isinstance(data, dict):
+            raise ValueError(f"Invalid API response format: {data}")
+
+        if not data.get("success", False):
+            raise ValueError(f"API response failed: {data}")
+
+        return data
+
+    def _normalize_codes(self, codes: List[str]) -> List[str]:
+        """Split comma separated codes, upper-case them and drop duplicates while keeping order"""
+        normalized: List[str] = []
+        for code in codes:
+            for part in str(code).split(","):
+                part = part.strip().upper()
+                if part and part not in normalized:
+                    normalized.append(part)
+        return normalized
+
 
 if __name__ == "__main__":
     from external_api.data_sources.client import get_client
@@ -214,5 +324,8 @@ if __name__ == "__main__":
         print("\n")
         result2 = await client.commodities.get_commodities_price(commodity_code="COCOA,CORN,OIL", currency_code="USD")  # type: ignore
         print(result2)
+        print("\n")
+        result3 = await client.commodities.get_commodities_price_bulk(commodity_codes=["COCOA", "CORN", "OIL"], currency_codes=["USD", "EUR"])  # type: ignore
+        print(result3)
 
     asyncio.run(main())
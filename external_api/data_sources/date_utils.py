@@ -0,0 +1,79 @@
+"""
+数据源共用的日期格式化工具
+
+各数据源返回的列表中大量条目共享相同的时间戳，这里对原始字符串做有界 LRU 缓存，
+并对 ISO 8601 UTC 格式使用 fromisoformat 快速路径，避免每个条目都执行 strptime。
+"""
+
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+DEFAULT_OUTPUT_FORMAT = "%Y-%m-%d %H:%M:%S"
+DATE_CACHE_SIZE = 4096
+
+# 可以走 fromisoformat 快速路径的 strptime 格式 -> 是否带小数秒
+_ISO_UTC_FORMATS = {
+    "%Y-%m-%dT%H:%M:%SZ": False,
+    "%Y-%m-%dT%H:%M:%S.%fZ": True,
+}
+
+
+def format_date(date_str: Optional[str], input_format: str, output_format: str = DEFAULT_OUTPUT_FORMAT) -> Optional[str]:
+    """Convert a date string between formats, returning it unchanged when it cannot be parsed
+
+    Args:
+        date_str: Raw date string from the upstream API
+        input_format: strptime format of date_str, e.g. "%Y-%m-%dT%H:%M:%SZ"
+        output_format: strftime format of the result, default "%Y-%m-%d %H:%M:%S"
+
+    Returns:
+        Optional[str]: The formatted date, or date_str itself if it is empty or invalid
+    """
+    if not date_str or not isinstance(date_str, str):
+        return date_str
+    converted = _convert(date_str, input_format, output_format)
+    return date_str if converted is None else converted
+
+
+def parse_date(date_str: str, input_format: str, output_format: str = DEFAULT_OUTPUT_FORMAT) -> str:
+    """Convert a date string between formats, raising ValueError when it cannot be parsed"""
+    converted = _convert(date_str, input_format, output_format) if isinstance(date_str, str) else None
+    if converted is None:
+        raise ValueError(f"time data {date_str!r} does not match format {input_format!r}")
+    return converted
+
+
+def clear_date_cache():
+    """清空日期缓存（主要用于基准测试）"""
+    _convert.cache_clear()
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _convert(date_str: str, input_format: str, output_format: str) -> Optional[str]:
+    # 解析失败同样缓存为 None，避免重复解析无效字符串
+    try:
+        dt = None
+        if input_format in _ISO_UTC_FORMATS:
+            dt = _parse_iso_utc(date_str, _ISO_UTC_FORMATS[input_format])
+        if dt is None:
+            dt = datetime.strptime(date_str, input_format)
+        return dt.strftime(output_format)
+    except (ValueError, TypeError):
+        return None
+
+
+def _parse_iso_utc(date_str: str, has_fraction: bool) -> Optional[datetime]:
+    """Fast path for "YYYY-MM-DDTHH:MM:SS[.ffffff]Z", returns None to fall back to strptime"""
+    if len(date_str) < 20 or date_str[10] != "T" or date_str[-1] != "Z":
+        return None
+    if has_fraction:
+        fraction = date_str[20:-1]
+        if date_str[19] != "." or not (1 <= len(fraction) <= 6) or not fraction.isdigit():
+            return None
+    elif len(date_str) != 20:
+        return None
+    try:
+        return datetime.fromisoformat(date_str[:-1])
+    except ValueError:
+        return None
@@ -5,12 +5,12 @@ Metal data source implementation
 import asyncio
 import json
 import logging
-from datetime import datetime
 from typing import Any, Dict, Optional
 
 import aiohttp
 
 from .base import BaseAPI
+from .date_utils import parse_date
 
 logger = logging.getLogger("metal_source")
 
@@ -148,7 +148,7 @@ class MetalSource(BaseAPI):
         """Parse time string"""
         # "2025-04-25T17:00:00Z"
         # Convert to "2025-04-25 17:00:00"
-        return datetime.strptime(time_str, "%Y-%m-%dT%H:%M:%SZ").strftime("%Y-%m-%d %H:%M:%S")
+        return parse_date(time_str, "%Y-%m-%dT%H:%M:%SZ")
 
 
 if __name__ == "__main__":
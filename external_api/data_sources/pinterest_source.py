@@ -5,12 +5,12 @@ Pinterest data source implementation
 import asyncio
 import json
 import logging
-from datetime import datetime
 from typing import Any, Dict, Optional
 
 import aiohttp
 
 from .base import BaseAPI
+from .date_utils import format_date
 
 logger = logging.getLogger("pinterest_source")
 
@@ -229,18 +229,10 @@ class PinterestSource(BaseAPI):
         """Format date string"""
         if not date_str:
             return None
-        try:
-            # New API date format example: "Thu Mar 13 18:08:35 +0000 2025"
-            # New API date format example: "Tue, 04 Mar 2025 12:26:23 +0000",
-            dt = datetime.strptime(date_str, "%a, %d %b %Y %H:%M:%S %z")
-            return dt.strftime("%Y-%m-%d %H:%M:%S")
-        except Exception:
-            return date_str
+        # New API date format example: "Tue, 04 Mar 2025 12:26:23 +0000",
+        return format_date(date_str, "%a, %d %b %Y %H:%M:%S %z")
 
     def _parse_pins(self, data: dict[str, Any]) -> list[dict[str, Any]]:
-        print(f"xwy-pins, {data}")
-        print("-" * 100)
-        print("\n")
         pins = []
         for pin_data in data.get("data", []):
             if not isinstance(pin_data, dict):
@@ -296,9 +288,6 @@ class PinterestSource(BaseAPI):
 
     def _parse_user_info(self, resp: dict[str, Any]) -> dict[str, Any]:
         data = resp.get("data", [])
-        print(f"xwy-user, {data}")
-        print("-" * 100)
-        print("\n")
         if len(data) <= 0:
             return {}
 
@@ -3,12 +3,12 @@ TripAdvisor Officical API data source implementation
 """
 
 import logging
-from datetime import datetime
 from typing import Any, Dict, List, Optional
 
 import httpx
 
 from .base import BaseAPI
+from .date_utils import format_date
 
 logger = logging.getLogger("tripadvisor_official_source")
 
@@ -561,18 +561,12 @@ class TripAdvisorSource(BaseAPI):
     def _parse_date(self, date_str: str) -> str:
         """解析日期字符串"""
         # 新 API 日期格式：2025-04-24T22:29:34Z
-        try:
-            return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%SZ").strftime("%Y-%m-%d %H:%M:%S")
-        except ValueError:
-            return date_str
+        return format_date(date_str, "%Y-%m-%dT%H:%M:%SZ")
 
     def _parse_date2(self, date_str: str) -> str:
         """解析日期字符串"""
         # 新 API 日期格式：2021-02-26T00:50:50.206Z
-        try:
-            return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%fZ").strftime("%Y-%m-%d %H:%M:%S")
-        except ValueError:
-            return date_str
+        return format_date(date_str, "%Y-%m-%dT%H:%M:%S.%fZ")
 
 
 async def main():
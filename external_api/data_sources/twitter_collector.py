@@ -0,0 +1,256 @@
+"""
+Incremental tweet collection built on top of TwitterSource.search_tweets
+
+Monitoring jobs run the same search every few minutes. The collector keeps a small
+state file per query (last seen tweet id, continuation token and a compact set of
+already emitted tweet ids) so each run only returns tweets that were not seen before.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from .twitter_source import TwitterSource
+
+logger = logging.getLogger("twitter_collector")
+
+DEFAULT_MAX_SEEN_IDS = 10000
+
+
+class SeenTweetIds:
+    """Set of tweet ids stored as a sorted array of signed 64-bit integers
+
+    Tweet ids are snowflakes that grow over time, so when the set is full the
+    smallest (oldest) ids are evicted first.
+    """
+
+    def __init__(self, ids: Optional[Iterable[int]] = None, max_size: int = DEFAULT_MAX_SEEN_IDS):
+        self._max_size = max_size
+        self._ids = array("q", sorted(set(ids or [])))
+        self._evict()
+
+    def __contains__(self, tweet_id: int) -> bool:
+        index = bisect_left(self._ids, tweet_id)
+        return index < len(self._ids) and self._ids[index] == tweet_id
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, tweet_id: int) -> bool:
+        """Add an id, returns False if it was already present"""
+        index = bisect_left(self._ids, tweet_id)
+        if index < len(self._ids) and self._ids[index] == tweet_id:
+            return False
+        self._ids.insert(index, tweet_id)
+        self._evict()
+        return True
+
+    def max(self) -> Optional[int]:
+        return self._ids[-1] if self._ids else None
+
+    def to_list(self) -> List[int]:
+        return self._ids.tolist()
+
+    def _evict(self):
+        overflow = len(self._ids) - self._max_size
+        if overflow > 0:
+            del self._ids[:overflow]
+
+
+class TwitterIncrementalCollector:
+    """Collect only new tweets for a query across runs, persisting cursors on disk"""
+
+    def __init__(
+        self,
+        source: TwitterSource,
+        state_dir: str,
+        page_size: int = 100,
+        max_pages: int = 5,
+        max_seen_ids: int = DEFAULT_MAX_SEEN_IDS,
+    ):
+        """Initialize the collector
+
+        Args:
+            source: TwitterSource used to run the searches
+            state_dir: Directory holding one state file per query
+            page_size: Number of tweets requested per page (API maximum is 100)
+            max_pages: Maximum number of pages fetched per run
+            max_seen_ids: Maximum number of tweet ids remembered per query
+        """
+        self.source = source
+        self.state_dir = state_dir
+        self.page_size = min(page_size, 100)
+        self.max_pages = max_pages
+        self.max_seen_ids = max_seen_ids
+        self._locks: Dict[str, asyncio.Lock] = {}
+        os.makedirs(state_dir, exist_ok=True)
+
+    async def collect(self, query: str, **search_kwargs: Any) -> Dict[str, Any]:
+        """
+        Fetch the tweets for a query that were not returned by previous runs.
+
+        Args:
+            query (str): Search keyword, e.g. "Tesla" or "#TSLA"
+            **search_kwargs: Extra filters forwarded to search_tweets (lang, min_likes, ...)
+
+        Returns:
+            Dict[str, Any]: Same shape as search_tweets, with only the new tweets, e.g.
+            {
+                "success": True,
+                "data": {
+                    "query": "Tesla",
+                    "count": 3,                 # Number of new tweets
+                    "tweets": [...],            # New tweets, same format as search_tweets
+                    "last_tweet_id": "190300",  # Newest tweet id seen so far
+                    "cursor": "cursor123"       # Saved continuation token, None if fully drained
+                }
+            }
+        """
+        # 不同过滤条件的同一查询使用各自的状态，互不抑制
+        key = self._state_key(query, search_kwargs)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            state = self._load_state(key)
+            seen = SeenTweetIds(state.get("seen_ids"), max_size=self.max_seen_ids)
+
+            # 按时间倒序获取：遇到全部已见过的页面即可停止，相关性排序(top)下更新的推文可能在后面的页
+            search_kwargs.setdefault("section", "latest")
+
+            # 只请求上次最新推文当天及之后的结果
+            if state.get("last_created_at") and "start_date" not in search_kwargs:
+                search_kwargs["start_date"] = state["last_created_at"][:10]
+
+            delta: List[Dict[str, Any]] = []
+            pages_left = self.max_pages
+
+            # 先从头部获取最新结果，遇到全部已见过的页面即停止
+            head = await self._drain(query, None, pages_left, seen, delta, search_kwargs)
+            if head["error"] and head["pages"] == 0:
+                return {"success": False, "error": head["error"]}
+            pages_left -= head["pages"]
+
+            continuation_token = state.get("continuation_token")
+            if head["cursor"]:
+                # 页数用完但仍有新结果，保存游标供下次继续
+                continuation_token = head["cursor"]
+            elif continuation_token and pages_left > 0:
+                # 继续上次未处理完的结果
+                backlog = await self._drain(query, continuation_token, pages_left, seen, delta, search_kwargs)
+                continuation_token = backlog["cursor"]
+
+            last_created_at = state.get("last_created_at")
+            newest = max(delta, key=lambda tweet: self._tweet_id(tweet) or 0, default=None)
+            if newest is not None and (self._tweet_id(newest) or 0) >= (state.get("last_tweet_id") or 0):
+                last_created_at = newest.get("created_at") or last_created_at
+
+            last_tweet_id = seen.max()
+            self._save_state(
+                key,
+                {
+                    "query": query,
+                    "last_tweet_id": last_tweet_id,
+                    "last_created_at": last_created_at,
+                    "continuation_token": continuation_token,
+                    "seen_ids": seen.to_list(),
+                    "updated_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+                },
+            )
+
+            return {
+                "success": True,
+                "data": {
+                    "query": query,
+                    "count": len(delta),
+                    "tweets": delta,
+                    "last_tweet_id": str(last_tweet_id) if last_tweet_id is not None else None,
+                    "cursor": continuation_token,
+                },
+            }
+
+    async def _drain(
+        self,
+        query: str,
+        cursor: Optional[str],
+        max_pages: int,
+        seen: SeenTweetIds,
+        delta: List[Dict[str, Any]],
+        search_kwargs: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Page through newest-first results from cursor until a page has nothing new, returns the cursor to resume from"""
+        pages = 0
+        while pages < max_pages:
+            result = await self.source.search_tweets(query, limit=self.page_size, cursor=cursor, **search_kwargs)
+            if not result.get("success"):
+                logger.error(f"Incremental search for {query!r} failed: {result.get('error')}")
+                return {"pages": pages, "cursor": cursor if pages else None, "error": result.get("error")}
+            pages += 1
+
+            new_tweets = 0
+            for tweet in result["data"]["tweets"]:
+                tweet_id = self._tweet_id(tweet)
+                if tweet_id is None or seen.add(tweet_id):
+                    delta.append(tweet)
+                    new_tweets += 1
+
+            cursor = result["data"].get("cursor")
+            if new_tweets == 0 or not cursor:
+                return {"pages": pages, "cursor": None, "error": None}
+
+        return {"pages": pages, "cursor": cursor, "error": None}
+
+    def _tweet_id(self, tweet: Dict[str, Any]) -> Optional[int]:
+        tweet_id = tweet.get("id")
+        if isinstance(tweet_id, str) and tweet_id.isdigit():
+            return int(tweet_id)
+        return None
+
+    def _state_key(self, query: str, search_kwargs: Dict[str, Any]) -> str:
+        """State file name for a query and its filters (query only when there are no filters)"""
+        raw = query
+        if search_kwargs:
+            raw += "\n" + json.dumps(search_kwargs, sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _state_path(self, key: str) -> str:
+        return os.path.join(self.state_dir, f"{key}.json")
+
+    def _load_state(self, key: str) -> Dict[str, Any]:
+        path = self._state_path(key)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable collector state {path}: {e}")
+            return {}
+
+    def _save_state(self, key: str, state: Dict[str, Any]):
+        # 先写入临时文件再替换，避免中断时留下损坏的状态文件
+        fd, tmp_path = tempfile.mkstemp(dir=self.state_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, self._state_path(key))
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+
+if __name__ == "__main__":
+    from external_api.data_sources.client import get_client
+
+    async def main():
+        client = get_client()
+        collector = TwitterIncrementalCollector(client.twitter, state_dir=".twitter_collector")  # type: ignore
+        result = await collector.collect("Tesla", lang="en")
+        print(f"New tweets: {result['data']['count'] if result['success'] else result['error']}")
+
+    asyncio.run(main())
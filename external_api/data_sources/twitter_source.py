@@ -5,12 +5,13 @@ Twitter data source implementation
 import asyncio
 import json
 import logging
-from datetime import datetime
-from typing import Any, Dict, Optional
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
 import aiohttp
 
 from .base import BaseAPI
+from .date_utils import format_date
 
 logger = logging.getLogger("twitter_source")
 
@@ -18,9 +19,15 @@ logger = logging.getLogger("twitter_source")
 class TwitterSource(BaseAPI):
     """Twitter data source"""
 
+    USER_INFO_CACHE_TTL = 3600
+    USER_INFO_CACHE_MAX_SIZE = 5000
+
     def __init__(self, config: Dict[str, Any], proxy_url: Optional[str] = None):
         """Initialize Twitter data source"""
         self._timeout = config["timeout"]
+        self._user_info_ttl = config.get("twitter_user_info_ttl", self.USER_INFO_CACHE_TTL)
+        # username(小写) -> (过期时间, 用户信息)
+        self._user_info_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
         self.proxy_url = config["external_api_proxy_url"]
         if proxy_url:
             self.proxy_url = proxy_url
@@ -52,6 +59,7 @@ class TwitterSource(BaseAPI):
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
         cursor: Optional[str] = None,
+        section: str = "top",
     ) -> Dict[str, Any]:
         """
         Search for tweets.
@@ -66,6 +74,7 @@ class TwitterSource(BaseAPI):
             start_date (Optional[str]): Start date, format: YYYY-MM-DD, default is None
             end_date (Optional[str]): End date, format: YYYY-MM-DD, default is None
             cursor (Optional[str]): Pagination cursor, used to get next page results, default is None for first page
+            section (str): Result ordering, "top" for relevance or "latest" for newest first, default is "top"
 
         Returns:
             Dict[str, Any]: Dictionary containing tweet search results, e.g.
@@ -127,7 +136,7 @@ class TwitterSource(BaseAPI):
             # 构建查询参数
             params = {
                 "query": query,
-                "section": "top",
+                "section": section,
                 "limit": min(limit, 100),  # API限制最大100条
             }
 
@@ -263,31 +272,12 @@ class TwitterSource(BaseAPI):
         #     ...     print(f"Failed to get user info: {result['error']}")
         # """
         try:
-            # 构建请求URL
-            request_url = f"{self.proxy_url}/user/details"
-
-            # 设置请求参数
-            params = {"username": username}
-
-            if user_id:
-                params["user_id"] = user_id
-
             # 使用aiohttp发送异步请求
             async with aiohttp.ClientSession(trust_env=True) as session:
-                async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
-                    response.raise_for_status()
-                    # 解析响应
-                    data = await response.json(content_type=None)
-
-            # 解析响应数据
-            if isinstance(data, str):
-                data = json.loads(data)
-
-            if not isinstance(data, dict):
-                raise ValueError(f"Invalid API response format: {data}")
+                user_info = await self._fetch_user_info(session, username, user_id)
 
             # 构建返回数据
-            return {"success": True, "data": self._parse_user_info(data)}
+            return {"success": True, "data": user_info}
 
         except asyncio.TimeoutError:
             error_msg = f"Request timeout (timeout={self._timeout}s)"
@@ -303,6 +293,95 @@ class TwitterSource(BaseAPI):
             logger.exception(e)
             return {"success": False, "error": error_msg}
 
+    async def enrich_tweets_with_user_info(self, tweets: List[Dict[str, Any]], max_concurrency: int = 10) -> Dict[str, Any]:
+        """
+        Attach the full user profile of each tweet author to a list of tweets.
+
+        Distinct authors are looked up once, concurrently, and profiles are cached for a while,
+        so enriching hundreds of tweets only costs one request per new author.
+
+        Args:
+            tweets (List[Dict[str, Any]]): Tweets returned by search_tweets or get_user_tweets
+            max_concurrency (int): Maximum number of user lookups in flight at the same time, default is 10
+
+        Returns:
+            Dict[str, Any]: Dictionary containing the enriched tweets, e.g.
+            {
+                "success": True,               # Whether successful
+                "data": {
+                    "count": 2,                # Number of tweets
+                    "tweets": [                # Same tweets, each with an extra "author_profile" field
+                        {
+                            "id": "1234567890",
+                            ...,
+                            "author_profile": {...}  # Same format as get_user_info data, None if lookup failed
+                        }
+                    ],
+                    "users_fetched": 1,        # Number of profiles requested from the API
+                    "users_cached": 1,         # Number of profiles served from cache
+                    "errors": {"someuser": "HTTP request error: ..."}  # Failed lookups by username
+                }
+            }
+        """
+        # Usernames are case-insensitive: dedupe on the lowercased name, keep the first spelling seen
+        usernames: Dict[str, str] = {}
+        for tweet in tweets:
+            username = self._tweet_author_username(tweet)
+            if username:
+                usernames.setdefault(username.lower(), username)
+
+        profiles: Dict[str, Optional[Dict[str, Any]]] = {}
+        to_fetch: List[str] = []
+        now = time.monotonic()
+        for key, username in usernames.items():
+            cached = self._user_info_cache.get(key)
+            if cached and cached[0] > now:
+                profiles[key] = cached[1]
+            else:
+                to_fetch.append(username)
+
+        errors: Dict[str, str] = {}
+        if to_fetch:
+            semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+            async def fetch(session: aiohttp.ClientSession, username: str) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self._fetch_user_info(session, username)
+
+            connector = aiohttp.TCPConnector(limit=max(1, max_concurrency))
+            async with aiohttp.ClientSession(trust_env=True, connector=connector) as session:
+                results = await asyncio.gather(*(fetch(session, username) for username in to_fetch), return_exceptions=True)
+
+            expires_at = time.monotonic() + self._user_info_ttl
+            for username, result in zip(to_fetch, results):
+                if isinstance(result, BaseException):
+                    if isinstance(result, asyncio.TimeoutError):
+                        errors[username] = f"Request timeout (timeout={self._timeout}s)"
+                    elif isinstance(result, aiohttp.ClientError):
+                        errors[username] = f"HTTP request error: {str(result)}"
+                    else:
+                        errors[username] = f"Error occurred while getting user info: {str(result)}"
+                    logger.warning(f"Failed to enrich tweets with user {username}: {errors[username]}")
+                    profiles[username.lower()] = None
+                    continue
+                profiles[username.lower()] = result
+                self._cache_user_info(username, result, expires_at)
+
+        for tweet in tweets:
+            username = self._tweet_author_username(tweet)
+            tweet["author_profile"] = profiles.get(username.lower()) if username else None
+
+        return {
+            "success": True,
+            "data": {
+                "count": len(tweets),
+                "tweets": tweets,
+                "users_fetched": len(to_fetch),
+                "users_cached": len(usernames) - len(to_fetch),
+                "errors": errors,
+            },
+        }
+
     async def get_user_tweets(
         self, username: str, limit: int = 10, user_id: Optional[str] = None, include_replies: bool = False, include_pinned: bool = False
     ) -> Dict[str, Any]:
@@ -425,16 +504,52 @@ class TwitterSource(BaseAPI):
             logger.exception(e)
             return {"success": False, "error": error_msg}
 
+    async def _fetch_user_info(self, session: aiohttp.ClientSession, username: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Request /user/details with an existing session and parse the profile"""
+        # 构建请求URL
+        request_url = f"{self.proxy_url}/user/details"
+
+        # 设置请求参数
+        params = {"username": username}
+
+        if user_id:
+            params["user_id"] = user_id
+
+        async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
+            response.raise_for_status()
+            # 解析响应
+            data = await response.json(content_type=None)
+
+        # 解析响应数据
+        if isinstance(data, str):
+            data = json.loads(data)
+
+        if not isinstance(data, dict):
+            raise ValueError(f"Invalid API response format: {data}")
+
+        return self._parse_user_info(data)
+
+    def _tweet_author_username(self, tweet: Dict[str, Any]) -> Optional[str]:
+        """search_tweets 使用 author 字段，get_user_tweets 使用 user 字段"""
+        author = tweet.get("author") or tweet.get("user") or {}
+        return author.get("username") or None
+
+    def _cache_user_info(self, username: str, user_info: Dict[str, Any], expires_at: float):
+        if len(self._user_info_cache) >= self.USER_INFO_CACHE_MAX_SIZE:
+            # 先清理过期条目，仍然超限时淘汰最早写入的条目
+            now = time.monotonic()
+            for key in [key for key, (expiry, _) in self._user_info_cache.items() if expiry <= now]:
+                del self._user_info_cache[key]
+            while len(self._user_info_cache) >= self.USER_INFO_CACHE_MAX_SIZE:
+                del self._user_info_cache[next(iter(self._user_info_cache))]
+        self._user_info_cache[username.lower()] = (expires_at, user_info)
+
     def _format_date(self, date_str: Optional[str]) -> Optional[str]:
         """Format date string"""
         if not date_str:
             return None
-        try:
-            # 新API的日期格式示例: "Thu Mar 13 18:08:35 +0000 2025"
-            dt = datetime.strptime(date_str, "%a %b %d %H:%M:%S %z %Y")
-            return dt.strftime("%Y-%m-%d %H:%M:%S")
-        except Exception:
-            return date_str
+        # 新API的日期格式示例: "Thu Mar 13 18:08:35 +0000 2025"
+        return format_date(date_str, "%a %b %d %H:%M:%S %z %Y")
 
     def _parse_user_info(self, data: dict[str, Any]) -> dict[str, Any]:
         return {